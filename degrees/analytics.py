@@ -0,0 +1,197 @@
+import argparse
+import heapq
+import json
+import multiprocessing
+import os
+import random
+import sys
+import time
+
+import degrees
+
+
+def bfs_levels(source):
+    """
+    Return a list whose i-th entry is the number of people exactly
+    i degrees of separation from `source` (entry 0 is the source).
+    """
+    counts = [1]
+    seen = {source}
+    frontier = [source]
+    while frontier:
+        next_frontier = []
+        for person_id in frontier:
+            for movie_id in degrees.people[person_id]["movies"]:
+                for neighbor_id in degrees.movies[movie_id]["stars"]:
+                    if neighbor_id not in seen:
+                        seen.add(neighbor_id)
+                        next_frontier.append(neighbor_id)
+        if next_frontier:
+            counts.append(len(next_frontier))
+        frontier = next_frontier
+    return counts
+
+
+def source_stats(source):
+    """
+    Run one BFS and summarize it as a JSON-serializable dict.
+    """
+    counts = bfs_levels(source)
+    return {
+        "source": source,
+        "levels": counts,
+        "reachable": sum(counts),
+        "eccentricity": len(counts) - 1,
+        "total_distance": sum(d * n for d, n in enumerate(counts)),
+    }
+
+
+def top_people(count):
+    """
+    Return the `count` people with the most co-stars.
+    """
+    def costars(person_id):
+        return sum(len(degrees.movies[movie_id]["stars"]) - 1
+                   for movie_id in degrees.people[person_id]["movies"])
+    return heapq.nlargest(count, degrees.people, key=costars)
+
+
+def choose_sources(sample=None, top=0, seed=0):
+    """
+    Return the people to run BFS from: the `top` best-connected people,
+    then a random sample of `sample` others (everyone if None).
+    """
+    sources = top_people(top) if top else []
+    chosen = set(sources)
+    rest = [person_id for person_id in degrees.people if person_id not in chosen]
+    if sample is not None and sample < len(rest):
+        rest = random.Random(seed).sample(rest, sample)
+    return sources + rest
+
+
+def completed_sources(output):
+    """
+    Return the sources already recorded in `output`, truncating any
+    partially written last line left by an interrupted run.
+    """
+    done = set()
+    if not os.path.exists(output):
+        return done
+    with open(output, "rb+") as f:
+        end = 0
+        for line in f:
+            if not line.endswith(b"\n"):
+                break
+            done.add(json.loads(line)["source"])
+            end += len(line)
+        f.truncate(end)
+    return done
+
+
+def run(sources, output, workers=None, progress=None):
+    """
+    Run BFS from every source not already in `output`, appending one
+    JSON line per source as results arrive.
+
+    The file doubles as the checkpoint: rerunning with the same output
+    resumes where an interrupted job stopped.
+    """
+    done = completed_sources(output)
+    todo = [source for source in sources if source not in done]
+    if not todo:
+        return 0
+
+    # Forked workers share the loaded people and movies dicts
+    methods = multiprocessing.get_all_start_methods()
+    context = multiprocessing.get_context("fork" if "fork" in methods else None)
+    start = time.perf_counter()
+    with context.Pool(workers) as pool, open(output, "a", encoding="utf-8") as f:
+        for i, stats in enumerate(pool.imap_unordered(source_stats, todo, chunksize=4), 1):
+            f.write(json.dumps(stats) + "\n")
+            f.flush()
+            if progress is not None:
+                progress(i, len(todo), time.perf_counter() - start)
+    return len(todo)
+
+
+def summarize(output, top=()):
+    """
+    Aggregate the results in `output`.
+
+    Returns a dict with the distribution of degrees of separation over
+    every sampled (source, target) pair, the eccentricity of each
+    person in `top`, and the graph "center": the sampled person with
+    the lowest eccentricity in the largest component, ties broken by
+    mean distance.
+    """
+    distribution = {}
+    eccentricity = {}
+    center = None
+    with open(output, encoding="utf-8") as f:
+        for line in f:
+            stats = json.loads(line)
+            for d, n in enumerate(stats["levels"][1:], 1):
+                distribution[d] = distribution.get(d, 0) + n
+            eccentricity[stats["source"]] = stats["eccentricity"]
+            if stats["reachable"] > 1:
+                key = (-stats["reachable"], stats["eccentricity"],
+                       stats["total_distance"] / (stats["reachable"] - 1))
+                if center is None or key < center[0]:
+                    center = (key, stats["source"])
+
+    pairs = sum(distribution.values())
+    return {
+        "pairs": pairs,
+        "distribution": distribution,
+        "mean_degrees": sum(d * n for d, n in distribution.items()) / pairs if pairs else None,
+        "eccentricity": {person_id: eccentricity.get(person_id) for person_id in top},
+        "center": None if center is None else {
+            "person_id": center[1],
+            "eccentricity": center[0][1],
+            "mean_degrees": center[0][2],
+        },
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Graph-wide degrees of separation statistics.")
+    parser.add_argument("directory", nargs="?", default="small")
+    parser.add_argument("--output", default="analytics.jsonl",
+                        help="per-source results, also used to resume")
+    parser.add_argument("--sample", type=int, help="number of random sources (default all)")
+    parser.add_argument("--top", type=int, default=10,
+                        help="best-connected people to always include")
+    parser.add_argument("--workers", type=int, default=os.cpu_count())
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    # Every source walks the whole graph, which is faster over dicts
+    # than over the snapshot's views
+    degrees.load_data(args.directory, use_snapshot=False)
+    sources = choose_sources(args.sample, args.top, args.seed)
+
+    def progress(i, total, elapsed):
+        print(f"\r{i}/{total} sources, {i / elapsed:.1f}/s", end="", file=sys.stderr, flush=True)
+
+    ran = run(sources, args.output, args.workers, progress)
+    if ran:
+        print(file=sys.stderr)
+
+    summary = summarize(args.output, top=sources[:args.top])
+    if not summary["pairs"]:
+        sys.exit("No connected pairs sampled.")
+    print(f"{summary['pairs']} pairs, mean {summary['mean_degrees']:.2f} degrees")
+    for d, n in sorted(summary["distribution"].items()):
+        print(f"  {d}: {n} ({100 * n / summary['pairs']:.2f}%)")
+    print("Eccentricity of top people:")
+    for person_id, value in summary["eccentricity"].items():
+        print(f"  {degrees.people[person_id]['name']}: {value}")
+    center = summary["center"]
+    if center is not None:
+        print(f"Center: {degrees.people[center['person_id']]['name']} "
+              f"(eccentricity {center['eccentricity']}, "
+              f"mean {center['mean_degrees']:.2f} degrees)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,424 @@
+import argparse
+import csv
+import gc
+import os
+import random
+import tempfile
+import time
+import tracemalloc
+
+import degrees
+import graph
+import landmarks
+import nameindex
+from util import Node, StackFrontier, QueueFrontier, DequeStackFrontier, DequeQueueFrontier
+
+
+def generate_graph(num_people, cast_size=5, seed=0):
+    """
+    Fill `degrees.people` and `degrees.movies` with a synthetic
+    IMDB-like graph of `num_people` people.
+
+    Each movie gets `cast_size` stars. Casting is skewed so that a
+    small number of prolific actors appear in many movies, like the
+    real dataset.
+    """
+    rng = random.Random(seed)
+    degrees.names.clear()
+    degrees.people.clear()
+    degrees.movies.clear()
+
+    person_ids = [str(i) for i in range(num_people)]
+    for person_id in person_ids:
+        name = f"person {person_id}"
+        degrees.people[person_id] = {
+            "name": name,
+            "birth": "",
+            "movies": set()
+        }
+        degrees.names[name] = {person_id}
+
+    num_movies = num_people * 2 // cast_size
+    for i in range(num_movies):
+        movie_id = f"m{i}"
+        stars = set()
+        while len(stars) < cast_size:
+            # Squaring a uniform sample favours low (prolific) indices
+            stars.add(person_ids[int(rng.random() ** 2 * num_people)])
+        degrees.movies[movie_id] = {
+            "title": movie_id,
+            "year": "",
+            "stars": stars
+        }
+        for person_id in stars:
+            degrees.people[person_id]["movies"].add(movie_id)
+    return person_ids
+
+
+def generate_clusters(num_clusters, cluster_size, movies_per_cluster, cast_size=6, seed=0):
+    """
+    Fill `degrees.people` and `degrees.movies` with a chain of dense
+    co-star clusters, each joined to the next by bridge movies.
+    The number of shortest paths grows exponentially along the chain.
+
+    Return (first person, last person).
+    """
+    rng = random.Random(seed)
+    degrees.names.clear()
+    degrees.people.clear()
+    degrees.movies.clear()
+
+    clusters = [[f"c{c}p{i}" for i in range(cluster_size)] for c in range(num_clusters)]
+    for cluster in clusters:
+        for person_id in cluster:
+            degrees.people[person_id] = {"name": person_id, "birth": "", "movies": set()}
+
+    def add_movie(movie_id, stars):
+        degrees.movies[movie_id] = {"title": movie_id, "year": "", "stars": set(stars)}
+        for person_id in stars:
+            degrees.people[person_id]["movies"].add(movie_id)
+
+    for c, cluster in enumerate(clusters):
+        for m in range(movies_per_cluster):
+            add_movie(f"c{c}m{m}", rng.sample(cluster, cast_size))
+        if c + 1 < num_clusters:
+            for m in range(movies_per_cluster // 2):
+                add_movie(f"c{c}b{m}", rng.sample(cluster, cast_size // 2)
+                          + rng.sample(clusters[c + 1], cast_size // 2))
+    return clusters[0][0], clusters[-1][-1]
+
+
+def random_pairs(person_ids, count, seed=0):
+    """
+    Return `count` random (source, target) pairs of people who
+    starred in at least one movie.
+    """
+    rng = random.Random(seed)
+    cast = [p for p in person_ids if degrees.people[p]["movies"]]
+    return [(rng.choice(cast), rng.choice(cast)) for _ in range(count)]
+
+
+def write_dataset(directory, num_stars, cast_size=5, seed=0):
+    """
+    Write synthetic people.csv, movies.csv and stars.csv files with
+    `num_stars` star rows into `directory`.
+    """
+    rng = random.Random(seed)
+    num_movies = num_stars // cast_size
+    num_people = num_stars // 4
+
+    with open(os.path.join(directory, "people.csv"), "w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        writer.writerow(["id", "name", "birth"])
+        for i in range(num_people):
+            writer.writerow([i, f"Person {i}", 1900 + i % 100])
+
+    with open(os.path.join(directory, "movies.csv"), "w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        writer.writerow(["id", "title", "year"])
+        for i in range(num_movies):
+            writer.writerow([i, f"Movie {i}", 1900 + i % 120])
+
+    with open(os.path.join(directory, "stars.csv"), "w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        writer.writerow(["person_id", "movie_id"])
+        for movie in range(num_movies):
+            stars = set()
+            while len(stars) < cast_size:
+                stars.add(int(rng.random() ** 2 * num_people))
+            for person in stars:
+                writer.writerow([person, movie])
+
+
+def measure(load, trace_memory=True):
+    """
+    Call `load()` and return (seconds, peak traced bytes or None).
+    """
+    gc.collect()
+    start = time.perf_counter()
+    load()
+    elapsed = time.perf_counter() - start
+    peak = None
+    if trace_memory:
+        gc.collect()
+        tracemalloc.start()
+        load()
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+    return elapsed, peak
+
+
+def load_dicts(directory):
+    degrees.load_data(directory, use_snapshot=False)
+
+
+def bench_load(args):
+    """
+    Compare load time and peak memory of the dict-of-sets loader
+    and the compact CSR loader on a synthetic dataset.
+    """
+    with tempfile.TemporaryDirectory() as directory:
+        start = time.perf_counter()
+        write_dataset(directory, args.stars, seed=args.seed)
+        print(f"{args.stars} star rows written in {time.perf_counter() - start:.2f}s")
+
+        loaders = [
+            ("load_data", lambda: load_dicts(directory)),
+            ("load_compact", lambda: graph.load_compact(directory)),
+        ]
+        for label, load in loaders:
+            elapsed, peak = measure(load, trace_memory=not args.no_memory)
+            memory = "" if peak is None else f"  peak {peak / 2 ** 20:10.1f} MiB"
+            print(f"{label:>14}: {elapsed:8.2f}s{memory}")
+
+
+def bench_snapshot(args):
+    """
+    Time `load_data` parsing the CSVs (and writing a snapshot) against
+    reopening the snapshot, including a first lookup and search.
+    """
+    with tempfile.TemporaryDirectory() as directory:
+        write_dataset(directory, args.stars, seed=args.seed)
+        for label in ("cold (parse + write)", "warm (mmap)"):
+            start = time.perf_counter()
+            degrees.load_data(directory)
+            loaded = time.perf_counter() - start
+            source, = degrees.names["person 1"]
+            target, = degrees.names[f"person {len(degrees.people) - 1}"]
+            path = degrees.shortest_path(source, target, bidirectional=True)
+            total = time.perf_counter() - start
+            print(f"{label:>22}: load {loaded:8.3f}s  first query done {total:8.3f}s "
+                  f"({'no path' if path is None else f'{len(path)} degrees'})")
+
+
+def bench_search(args):
+    """
+    Compare one-sided and bidirectional BFS on a generated graph.
+    """
+    for num_people in args.people:
+        start = time.perf_counter()
+        person_ids = generate_graph(num_people, seed=args.seed)
+        print(f"{num_people} people, {len(degrees.movies)} movies "
+              f"(generated in {time.perf_counter() - start:.2f}s)")
+        pairs = random_pairs(person_ids, args.queries, seed=args.seed)
+
+        for label, bidirectional in (("bfs", False), ("bidirectional", True)):
+            stats = {}
+            lengths = []
+            start = time.perf_counter()
+            for source, target in pairs:
+                path = degrees.shortest_path(
+                    source, target, bidirectional=bidirectional, stats=stats
+                )
+                lengths.append(None if path is None else len(path))
+            elapsed = time.perf_counter() - start
+            print(f"  {label:>14}: {stats.get('expanded', 0) / len(pairs):12.1f} "
+                  f"expanded/query  {1000 * elapsed / len(pairs):10.2f} ms/query")
+            if bidirectional and lengths != baseline:
+                raise RuntimeError("path lengths differ between searches")
+            baseline = lengths
+
+
+def bench_frontier(args):
+    """
+    Measure frontier throughput: add `--nodes` nodes, checking
+    contains_state before each add as BFS does, then remove them all.
+    """
+    classes = [DequeStackFrontier, DequeQueueFrontier]
+    if args.nodes <= 20000:
+        # The list-backed frontiers are quadratic, so only try small sizes
+        classes = [StackFrontier, QueueFrontier] + classes
+
+    for frontier_class in classes:
+        frontier = frontier_class()
+        start = time.perf_counter()
+        for i in range(args.nodes):
+            if not frontier.contains_state(i):
+                frontier.add(Node(state=i, parent=None, action=None))
+        while not frontier.empty():
+            frontier.remove()
+        elapsed = time.perf_counter() - start
+        print(f"{frontier_class.__name__:>20}: {args.nodes / elapsed:14,.0f} nodes/s "
+              f"({elapsed:.2f}s for {args.nodes} nodes)")
+
+
+def bench_landmarks(args):
+    """
+    Compare landmark A* and estimate_degrees against plain and
+    bidirectional BFS on a generated graph.
+    """
+    person_ids = generate_graph(args.people[0], seed=args.seed)
+    start = time.perf_counter()
+    index = landmarks.LandmarkIndex.build(args.landmarks)
+    print(f"{args.people[0]} people: built {args.landmarks} landmarks "
+          f"in {time.perf_counter() - start:.2f}s")
+    with tempfile.TemporaryDirectory() as directory:
+        filename = os.path.join(directory, "landmarks.bin")
+        index.save(filename)
+        start = time.perf_counter()
+        index = landmarks.LandmarkIndex.load(filename)
+        print(f"  saved {os.path.getsize(filename) / 2 ** 20:.1f} MiB, "
+              f"reloaded in {time.perf_counter() - start:.2f}s")
+
+    # Queries between people the landmarks don't show to be unconnected
+    pairs = [pair for pair in random_pairs(person_ids, args.queries * 5, seed=args.seed)
+             if index.bounds(*pair)[0] is not None][:args.queries]
+    searches = [
+        ("bfs", lambda s, t, stats: degrees.shortest_path(s, t, stats=stats)),
+        ("bidirectional", lambda s, t, stats: degrees.shortest_path(
+            s, t, bidirectional=True, stats=stats)),
+        ("landmark A*", index.shortest_path),
+    ]
+    exact = []
+    for label, search in searches:
+        stats = {}
+        start = time.perf_counter()
+        paths = [search(s, t, stats) for s, t in pairs]
+        lengths = [None if path is None else len(path) for path in paths]
+        elapsed = time.perf_counter() - start
+        print(f"  {label:>14}: {stats.get('expanded', 0) / len(pairs):12.1f} "
+              f"expanded/query  {1000 * elapsed / len(pairs):10.3f} ms/query")
+        if exact and lengths != exact:
+            raise RuntimeError(f"{label} path lengths differ from BFS")
+        exact = lengths
+
+    start = time.perf_counter()
+    estimates = [landmarks.estimate_degrees(index, s, t) for s, t in pairs]
+    elapsed = time.perf_counter() - start
+    hits = sum(1 for estimate, length in zip(estimates, exact) if estimate == length)
+    print(f"  {'estimate':>14}: {1e6 * elapsed / len(pairs):10.1f} us/query, "
+          f"exact for {hits}/{len(pairs)} pairs")
+
+
+def bench_paths(args):
+    """
+    Time streaming alternative paths out of all_shortest_paths and
+    k_shortest_paths on chains of dense co-star clusters.
+    """
+    for num_clusters in args.clusters:
+        source, target = generate_clusters(num_clusters, args.cluster_size,
+                                           args.movies, seed=args.seed)
+        shortest = len(degrees.shortest_path(source, target))
+        print(f"{num_clusters} clusters of {args.cluster_size} people, "
+              f"{len(degrees.movies)} movies, {shortest} degrees apart")
+
+        generators = [
+            ("all_shortest_paths", degrees.all_shortest_paths(source, target, limit=args.k)),
+            ("k_shortest_paths", degrees.k_shortest_paths(source, target, k=args.k)),
+        ]
+        for label, generator in generators:
+            start = time.perf_counter()
+            first = None
+            lengths = []
+            for path in generator:
+                if first is None:
+                    first = time.perf_counter() - start
+                lengths.append(len(path))
+            elapsed = time.perf_counter() - start
+            print(f"  {label:>18}: first path {1000 * first:9.2f} ms, "
+                  f"{len(lengths)} paths in {1000 * elapsed:9.2f} ms "
+                  f"(lengths {min(lengths)}-{max(lengths)})")
+
+
+# Syllables for made-up names: every consonant-vowel pair, and some
+# with a closing consonant, which gives real-name-like trigram variety
+SYLLABLES = [c + v for c in "bcdfghjklmnprstvwyz" for v in "aeiou"]
+SYLLABLES += [s + c for s in SYLLABLES[::3] for c in "lnrst"]
+
+
+def random_name(rng):
+    """
+    Return a made-up "First Last" name.
+    """
+    first = "".join(rng.choice(SYLLABLES) for _ in range(rng.randint(1, 3)))
+    last = "".join(rng.choice(SYLLABLES) for _ in range(rng.randint(2, 3)))
+    return f"{first.capitalize()} {last.capitalize()}"
+
+
+def bench_names(args):
+    """
+    Measure fuzzy search and autocomplete latency against index size.
+    """
+    rng = random.Random(args.seed)
+    for size in args.sizes:
+        people = {str(i): {"name": random_name(rng)} for i in range(size)}
+        start = time.perf_counter()
+        index = nameindex.NameIndex.build(people)
+        print(f"{size} people ({len(index)} distinct names): "
+              f"index built in {time.perf_counter() - start:.2f}s")
+
+        names = [people[str(rng.randrange(size))]["name"] for _ in range(args.queries)]
+        typos = []
+        for name in names:
+            i = rng.randrange(len(name))
+            typos.append(name[:i] + name[i + 1:])
+        lookups = [
+            ("search (typo)", index.search, typos),
+            ("autocomplete", index.autocomplete, [name[:4] for name in names]),
+            ("autocomplete last", index.autocomplete, [name.split()[1][:5] for name in names]),
+        ]
+        for label, lookup, queries in lookups:
+            times = []
+            for query in queries:
+                start = time.perf_counter()
+                lookup(query)
+                times.append(time.perf_counter() - start)
+            times.sort()
+            print(f"  {label:>18}: median {1000 * times[len(times) // 2]:7.3f} ms  "
+                  f"p99 {1000 * times[int(len(times) * 0.99)]:7.3f} ms")
+        hits = sum(1 for typo, name in zip(typos, names)
+                   if index.search(typo, 5) and name.lower() in
+                   {match[1] for match in index.search(typo, 5)})
+        print(f"  typo recall@5: {hits}/{len(names)}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmarks for degrees.py")
+    parser.add_argument("--seed", type=int, default=0)
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    search = commands.add_parser("search", help="one-sided vs bidirectional BFS")
+    search.add_argument("--people", type=int, nargs="+", default=[100000, 1000000])
+    search.add_argument("--queries", type=int, default=20)
+    search.set_defaults(func=bench_search)
+
+    frontier = commands.add_parser("frontier", help="frontier throughput")
+    frontier.add_argument("--nodes", type=int, default=2000000)
+    frontier.set_defaults(func=bench_frontier)
+
+    load = commands.add_parser("load", help="dict vs compact loader")
+    load.add_argument("--stars", type=int, default=1000000)
+    load.add_argument("--no-memory", action="store_true",
+                      help="skip the (slow) tracemalloc pass")
+    load.set_defaults(func=bench_load)
+
+    cache = commands.add_parser("snapshot", help="CSV parse vs mmap snapshot startup")
+    cache.add_argument("--stars", type=int, default=1000000)
+    cache.set_defaults(func=bench_snapshot)
+
+    landmark = commands.add_parser(
+        "landmarks", help="landmark A* and estimates vs BFS (A* is slower than "
+                          "bidirectional BFS; it is measured for reference)")
+    landmark.add_argument("--people", type=int, nargs=1, default=[100000])
+    landmark.add_argument("--landmarks", type=int, default=32)
+    landmark.add_argument("--queries", type=int, default=20)
+    landmark.set_defaults(func=bench_landmarks)
+
+    paths = commands.add_parser("paths", help="alternative paths in dense clusters")
+    paths.add_argument("--clusters", type=int, nargs="+", default=[3, 6, 10])
+    paths.add_argument("--cluster-size", type=int, default=200)
+    paths.add_argument("--movies", type=int, default=100)
+    paths.add_argument("-k", type=int, default=50)
+    paths.set_defaults(func=bench_paths)
+
+    names = commands.add_parser("names", help="name lookup latency vs index size")
+    names.add_argument("--sizes", type=int, nargs="+", default=[10000, 100000, 1000000])
+    names.add_argument("--queries", type=int, default=1000)
+    names.set_defaults(func=bench_names)
+
+    args = parser.parse_args()
+    args.func(args)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,7 +1,13 @@
-import csv
+import argparse
+import heapq
 import sys
 import os
-from util import Node, StackFrontier, QueueFrontier
+
+import graph
+import ingest
+import nameindex
+import snapshot
+from util import Node, DequeQueueFrontier, bidirectional_search
 
 # Maps names to a set of corresponding person_ids
 names = {}
@@ -12,66 +18,74 @@ people = {}
 # Maps movie_ids to a dictionary of: title, year, stars (a set of person_ids)
 movies = {}
 
+# Prefix and trigram index over people's names, built on first use
+name_index = None
+
 def clear_console():
     os.system('cls' if os.name == 'nt' else 'clear')
 
-def load_data(directory):
+def load_data(directory, progress=None, use_snapshot=True):
     """
     Load data from CSV files into memory.
+
+    With `use_snapshot`, the data is read from a binary snapshot of the
+    CSV files, `snapshot.FILENAME` in `directory`, which is memory-mapped
+    rather than copied: `people`, `movies` and `names` become read-only
+    views over it. The snapshot is written the first time, and again
+    whenever the CSV files change, with a message saying where. Returns
+    None in that case.
+
+    Otherwise the files are streamed in chunks into dicts;
+    `progress(report)` is called after each chunk with an
+    `ingest.IngestReport`. Rows that can't be loaded are counted and
+    reported instead of being dropped silently. Returns the reports for
+    people, movies and stars.
     """
-    # Load people
+    global names, people, movies, name_index
     print("Current working directory:", os.getcwd())
-    with open(f"{directory}/people.csv", encoding="utf-8") as f:
-        reader = csv.DictReader(f)
-        for row in reader:
-            people[row["id"]] = {
-                "name": row["name"],
-                "birth": row["birth"],
-                "movies": set()
-            }
-            if row["name"].lower() not in names:
-                names[row["name"].lower()] = {row["id"]}
-            else:
-                names[row["name"].lower()].add(row["id"])
-
-    # Load movies
-    with open(f"{directory}/movies.csv", encoding="utf-8") as f:
-        reader = csv.DictReader(f)
-        for row in reader:
-            movies[row["id"]] = {
-                "title": row["title"],
-                "year": row["year"],
-                "stars": set()
-            }
-
-    # Load stars
-    with open(f"{directory}/stars.csv", encoding="utf-8") as f:
-        reader = csv.DictReader(f)
-        for row in reader:
-            try:
-                people[row["person_id"]]["movies"].add(row["movie_id"])
-                movies[row["movie_id"]]["stars"].add(row["person_id"])
-            except KeyError:
-                pass
+    # Rebuilt from the new data by the next name lookup
+    name_index = None
+
+    if use_snapshot:
+        stats = {}
+        compact = snapshot.load_graph(directory, stats=stats)
+        if stats["written"]:
+            print(f"Snapshot written to {stats['path']}")
+        people = graph.PeopleView(compact)
+        movies = graph.MoviesView(compact)
+        names = graph.NamesView(compact)
+        return None
+
+    names, people, movies = {}, {}, {}
+    reports = [
+        ingest.ingest_people(directory, people, names, progress=progress),
+        ingest.ingest_movies(directory, movies, progress=progress),
+        ingest.ingest_stars(directory, people, movies, progress=progress),
+    ]
+    for report in reports:
+        if report.rejected:
+            print(f"Warning: {report}")
+    return reports
 
 def main():
+    parser = argparse.ArgumentParser(description="Degrees of separation between two people")
+    parser.add_argument("directory", nargs="?", default="small")
+    parser.add_argument("--no-snapshot", action="store_true",
+                        help=f"parse the CSV files every time instead of keeping a "
+                             f"{snapshot.FILENAME} file next to them")
+    parser.add_argument("--progress", action="store_true",
+                        help="show progress while parsing the CSV files (with --no-snapshot)")
+    args = parser.parse_args()
     clear_console()
-    if len(sys.argv) > 2:
-        sys.exit("Usage: python degrees.py [directory]")
-    directory = sys.argv[1] if len(sys.argv) == 2 else "small"
 
     # Load data from files into memory
     print("Loading data...")
-    load_data(directory)
+    load_data(args.directory, ingest.print_progress if args.progress else None,
+              use_snapshot=not args.no_snapshot)
     print("Data loaded.")
 
-    source = person_id_for_name(input("Name: "))
-    if source is None:
-        sys.exit("Person not found.")
-        
-    target = person_id_for_name(input("Name: "))
-    if target is None:
-        sys.exit("Person not found.")
+    source = prompt_person()
+    target = prompt_person()
 
     path = shortest_path(source, target)
 
@@ -88,23 +102,54 @@ def main():
             print(f"{i + 1}: {person1} and {person2} starred in {movie}")
 
 
-def shortest_path(source, target):
+def prompt_person():
+    """
+    Ask for a name and return the person_id it matches, asking which
+    person is meant if several share the name. Exits with a
+    "Person not found." message if there is no such person.
+    """
+    name = input("Name: ")
+    person_id, candidates = person_id_for_name(name)
+    if person_id is not None:
+        return person_id
+    if not candidates or candidates[0]["score"] < 1:
+        sys.exit(not_found_message(candidates))
+
+    print(f"Which '{name}'?")
+    for candidate in candidates:
+        print(f"ID: {candidate['person_id']}, Name: {candidate['name']}, "
+              f"Birth: {candidate['birth']}")
+    person_id = input("Intended Person ID: ")
+    if any(candidate["person_id"] == person_id for candidate in candidates):
+        return person_id
+    sys.exit("Person not found.")
+
+
+def shortest_path(source, target, bidirectional=False, stats=None):
     """
     Returns the shortest list of (movie_id, person_id) pairs
     that connect the source to the target.
 
     If no possible path, returns None.
+
+    With `bidirectional` set, the search runs from both ends at once
+    (see `bidirectional_shortest_path`). If `stats` is a dict, the
+    number of people expanded is stored under "expanded".
     """
+    if bidirectional:
+        return bidirectional_shortest_path(source, target, stats=stats)
 
     # # TODO
     # raise NotImplementedError
-    frontier = QueueFrontier()
+    frontier = DequeQueueFrontier()
     start = Node(state=source, parent=None, action=None)
     frontier.add(start)
     explored = set()
 
     while not frontier.empty():
         node = frontier.remove()
+        if stats is not None:
+            stats["expanded"] = stats.get("expanded", 0) + 1
 
         if node.state == target:
             path = []
@@ -121,32 +166,236 @@ def shortest_path(source, target):
                 # 如果一个人已经在队列中，这意味着我们已经考虑过他并正在处理他的邻居。如果再次将该人加入队列，就会导致重复的计算。
                 child = Node(state=person_id, parent=node, action=movie_id)
                 frontier.add(child)
-    
 
-def person_id_for_name(name):
+
+def bidirectional_shortest_path(source, target, stats=None):
     """
-    Returns the IMDB id for a person's name,
-    resolving ambiguities as needed.
+    Returns the shortest list of (movie_id, person_id) pairs
+    that connect the source to the target, searching breadth-first
+    from both people and joining the two searches in the middle.
+
+    Each round expands one whole level of whichever frontier is
+    smaller, so only about twice the square root of the people a
+    one-sided search would visit need to be expanded.
+
+    If no possible path, returns None.
+    """
+    return bidirectional_search(source, target, neighbors_for_person, stats=stats)
+
+
+def all_shortest_paths(source, target, limit=None):
+    """
+    Yield every shortest list of (movie_id, person_id) pairs that
+    connects the source to the target, up to `limit` paths.
+
+    A breadth-first search records, for each person, every
+    (movie_id, person_id) step from the previous level. Paths are then
+    read off that predecessor DAG from the target backwards one at a
+    time, so they stream out without enumerating them all first.
+    """
+    if source == target:
+        yield []
+        return
+
+    predecessors = {source: []}
+    frontier = [source]
+    while frontier and target not in predecessors:
+        level = {}
+        for person_id in frontier:
+            for movie_id, neighbor_id in neighbors_for_person(person_id):
+                if neighbor_id not in predecessors:
+                    level.setdefault(neighbor_id, []).append((movie_id, person_id))
+        predecessors.update(level)
+        frontier = list(level)
+    if target not in predecessors:
+        return
+
+    # Depth-first walk back to the source; every branch gets there,
+    # because each predecessor is one level closer to it
+    count = 0
+    path = []
+    stack = [iter(predecessors[target])]
+    people_on_path = [target]
+    while stack:
+        step = next(stack[-1], None)
+        if step is None:
+            stack.pop()
+            people_on_path.pop()
+            if path:
+                path.pop()
+            continue
+        movie_id, parent_id = step
+        path.append((movie_id, people_on_path[-1]))
+        if parent_id == source:
+            yield path[::-1]
+            count += 1
+            if limit is not None and count >= limit:
+                return
+            path.pop()
+            continue
+        people_on_path.append(parent_id)
+        stack.append(iter(predecessors[parent_id]))
+
+
+def k_shortest_paths(source, target, k=None):
+    """
+    Yield up to `k` loopless lists of (movie_id, person_id) pairs that
+    connect the source to the target, shortest first (Yen's algorithm).
+
+    Paths through the same people but different movies count as
+    different paths.
+    """
+    first = _restricted_path(source, target, set(), set())
+    if first is None:
+        return
+    found = [first]
+    yield first
+    candidates = []
+    seen = {tuple(first)}
+
+    while k is None or len(found) < k:
+        previous = [(None, source)] + found[-1]
+        for i in range(len(previous) - 1):
+            spur = previous[i][1]
+            root = found[-1][:i]
+
+            # Don't reuse the next step of any found path with this root,
+            # and don't revisit people already on the root
+            excluded_steps = set()
+            for path in found:
+                if path[:i] == root and len(path) > i:
+                    movie_id, person_id = path[i]
+                    excluded_steps.add((spur, movie_id, person_id))
+            excluded_people = {person_id for _, person_id in previous[:i]}
+
+            spur_path = _restricted_path(spur, target, excluded_people, excluded_steps)
+            if spur_path is None:
+                continue
+            candidate = root + spur_path
+            if tuple(candidate) not in seen:
+                seen.add(tuple(candidate))
+                heapq.heappush(candidates, (len(candidate), len(seen), candidate))
+
+        if not candidates:
+            return
+        path = heapq.heappop(candidates)[2]
+        found.append(path)
+        yield path
+
+
+def _restricted_path(source, target, excluded_people, excluded_steps):
+    """
+    Breadth-first shortest path from source to target that avoids
+    `excluded_people` and the (person_id, movie_id, person_id)
+    `excluded_steps`. Returns None if there is no such path.
+    """
+    if source == target:
+        return []
+    parents = {source: None}
+    frontier = DequeQueueFrontier()
+    frontier.add(Node(state=source, parent=None, action=None))
+    while not frontier.empty():
+        node = frontier.remove()
+        for movie_id, person_id in neighbors_for_person(node.state):
+            if (person_id in parents or person_id in excluded_people
+                    or (node.state, movie_id, person_id) in excluded_steps):
+                continue
+            parents[person_id] = node.state
+            child = Node(state=person_id, parent=node, action=movie_id)
+            if person_id == target:
+                path = []
+                while child.parent is not None:
+                    path.append((child.action, child.state))
+                    child = child.parent
+                path.reverse()
+                return path
+            frontier.add(child)
+    return None
+
+
+def person_id_for_name(name, limit=10):
+    """
+    Returns (person_id, candidates) for a person's name.
+
+    `person_id` is the IMDB id of the one person with that name
+    (ignoring case, and accents if there is no match otherwise), and
+    `candidates` is empty. If several people have the name, `person_id`
+    is None and `candidates` lists them all, with a score of 1.0.
+    Otherwise `person_id` is None and `candidates` holds up to `limit`
+    fuzzy matches, as returned by `candidates_for_name`.
     """
     person_ids = list(names.get(name.lower(), set()))
-    if len(person_ids) == 0:
-        return None
-    elif len(person_ids) > 1:
-        print(f"Which '{name}'?")
-        for person_id in person_ids:
-            person = people[person_id]
-            name = person["name"]
-            birth = person["birth"]
-            print(f"ID: {person_id}, Name: {name}, Birth: {birth}")
-        try:
-            person_id = input("Intended Person ID: ")
-            if person_id in person_ids:
-                return person_id
-        except ValueError:
-            pass
-        return None
-    else:
-        return person_ids[0]
+    if not person_ids and people and name:
+        person_ids = _name_index().exact(name)
+    if len(person_ids) == 1:
+        return person_ids[0], []
+    if person_ids:
+        return None, [_candidate(person_id, 1.0) for person_id in person_ids]
+    if not people or not name:
+        return None, []
+    return None, candidates_for_name(name, limit)
+
+
+def candidates_for_name(name, limit=10):
+    """
+    Returns up to `limit` people whose names best match `name`,
+    as dicts of person_id, name, birth and a match score in [0, 1].
+
+    Exact matches (ignoring case and accents) score 1.0 and come
+    first, followed by fuzzy trigram matches.
+    """
+    index = _name_index()
+    candidates = [(person_id, 1.0) for person_id in index.exact(name)]
+    seen = {person_id for person_id, _ in candidates}
+    for person_id, _, score in index.search(name, limit):
+        if person_id not in seen:
+            candidates.append((person_id, score))
+            seen.add(person_id)
+    return [_candidate(person_id, score) for person_id, score in candidates[:limit]]
+
+
+def autocomplete(prefix, limit=10):
+    """
+    Returns up to `limit` people with a name word starting with
+    `prefix`, in the same form as `candidates_for_name`.
+    """
+    return [
+        _candidate(person_id, score)
+        for person_id, _, score in _name_index().autocomplete(prefix, limit)
+    ]
+
+
+def _name_index():
+    """
+    Return `name_index`, building it over `people` the first time
+    it is needed after loading.
+    """
+    global name_index
+    if name_index is None:
+        name_index = nameindex.NameIndex.build(people)
+    return name_index
+
+
+def _candidate(person_id, score):
+    person = people[person_id]
+    return {
+        "person_id": person_id,
+        "name": person["name"],
+        "birth": person["birth"],
+        "score": score,
+    }
+
+
+def not_found_message(candidates):
+    """
+    Return a "Person not found." message suggesting the close matches
+    among `candidates`, as returned by `person_id_for_name`.
+    """
+    message = "Person not found."
+    suggestions = [c["name"] for c in candidates[:3] if c["score"] >= 0.3]
+    if suggestions:
+        message += f" Did you mean: {', '.join(suggestions)}?"
+    return message
 
 
 def neighbors_for_person(person_id):
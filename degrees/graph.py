@@ -0,0 +1,292 @@
+import csv
+from array import array
+from bisect import bisect_left, bisect_right
+from collections.abc import Mapping
+
+from util import bidirectional_search
+
+
+class CompactGraph():
+    """
+    Person-movie graph stored as integer arrays.
+
+    People and movies are numbered 0..n-1 in the order they appear in
+    the CSV files. The bipartite star graph is kept in CSR form: the
+    movies person `i` starred in are
+        person_movies[person_offsets[i]:person_offsets[i + 1]]
+    and likewise the stars of movie `j` are
+        movie_stars[movie_offsets[j]:movie_offsets[j + 1]].
+
+    `person_order`, `name_order` and `movie_order` list indices sorted
+    by person id, lowercase name and movie id, so lookups are binary
+    searches instead of dicts keyed by string.
+    """
+
+    def __init__(self, person_ids, person_names, person_births,
+                 movie_ids, movie_titles, movie_years,
+                 person_offsets, person_movies, movie_offsets, movie_stars,
+                 person_order, name_order, movie_order):
+        self.person_ids = person_ids
+        self.person_names = person_names
+        self.person_births = person_births
+        self.movie_ids = movie_ids
+        self.movie_titles = movie_titles
+        self.movie_years = movie_years
+        self.person_offsets = person_offsets
+        self.person_movies = person_movies
+        self.movie_offsets = movie_offsets
+        self.movie_stars = movie_stars
+        self.person_order = person_order
+        self.name_order = name_order
+        self.movie_order = movie_order
+
+    def __len__(self):
+        return len(self.person_ids)
+
+    def person_index(self, person_id):
+        """
+        Return the index of `person_id`, or None if there is no such person.
+        """
+        return _find(self.person_order, self.person_ids, person_id)
+
+    def movie_index(self, movie_id):
+        """
+        Return the index of `movie_id`, or None if there is no such movie.
+        """
+        return _find(self.movie_order, self.movie_ids, movie_id)
+
+    def person_ids_for_name(self, name):
+        """
+        Return the ids of every person whose name matches `name`,
+        ignoring case.
+        """
+        name = name.lower()
+        key = self._lower_name
+        lo = bisect_left(self.name_order, name, key=key)
+        hi = bisect_right(self.name_order, name, lo=lo, key=key)
+        return [self.person_ids[i] for i in self.name_order[lo:hi]]
+
+    def _lower_name(self, index):
+        return self.person_names[index].lower()
+
+    def neighbors(self, person):
+        """
+        Yield (movie, person) index pairs for people who starred
+        with person index `person`, including `person` itself.
+        """
+        movie_offsets = self.movie_offsets
+        movie_stars = self.movie_stars
+        for k in range(self.person_offsets[person], self.person_offsets[person + 1]):
+            movie = self.person_movies[k]
+            for j in range(movie_offsets[movie], movie_offsets[movie + 1]):
+                yield movie, movie_stars[j]
+
+    def neighbors_for_person(self, person_id):
+        """
+        Returns (movie_id, person_id) pairs for people
+        who starred with a given person.
+        """
+        person = self.person_index(person_id)
+        if person is None:
+            raise KeyError(person_id)
+        return {
+            (self.movie_ids[movie], self.person_ids[neighbor])
+            for movie, neighbor in self.neighbors(person)
+        }
+
+    def shortest_path(self, source, target, stats=None):
+        """
+        Returns the shortest list of (movie_id, person_id) pairs
+        that connect the source to the target, or None if they are
+        not connected.
+
+        Runs `util.bidirectional_search` over person and movie
+        indices, like `degrees.bidirectional_shortest_path`.
+        """
+        source = self.person_index(source)
+        target = self.person_index(target)
+        if source is None or target is None:
+            return None
+        path = bidirectional_search(source, target, self.neighbors, stats=stats)
+        if path is None:
+            return None
+        return [(self.movie_ids[movie], self.person_ids[person])
+                for movie, person in path]
+
+
+class PeopleView(Mapping):
+    """
+    Read-only mapping over a CompactGraph shaped like `degrees.people`:
+    person_id to a dict of name, birth and movies (a set of movie_ids).
+    Each dict is built when it is looked up.
+    """
+
+    def __init__(self, graph):
+        self.graph = graph
+
+    def __getitem__(self, person_id):
+        graph = self.graph
+        person = graph.person_index(person_id)
+        if person is None:
+            raise KeyError(person_id)
+        movies = graph.person_movies[graph.person_offsets[person]:graph.person_offsets[person + 1]]
+        return {
+            "name": graph.person_names[person],
+            "birth": graph.person_births[person],
+            "movies": {graph.movie_ids[movie] for movie in movies},
+        }
+
+    def __iter__(self):
+        return iter(self.graph.person_ids)
+
+    def __len__(self):
+        return len(self.graph.person_ids)
+
+
+class MoviesView(Mapping):
+    """
+    Read-only mapping over a CompactGraph shaped like `degrees.movies`:
+    movie_id to a dict of title, year and stars (a set of person_ids).
+    """
+
+    def __init__(self, graph):
+        self.graph = graph
+
+    def __getitem__(self, movie_id):
+        graph = self.graph
+        movie = graph.movie_index(movie_id)
+        if movie is None:
+            raise KeyError(movie_id)
+        stars = graph.movie_stars[graph.movie_offsets[movie]:graph.movie_offsets[movie + 1]]
+        return {
+            "title": graph.movie_titles[movie],
+            "year": graph.movie_years[movie],
+            "stars": {graph.person_ids[person] for person in stars},
+        }
+
+    def __iter__(self):
+        return iter(self.graph.movie_ids)
+
+    def __len__(self):
+        return len(self.graph.movie_ids)
+
+
+class NamesView(Mapping):
+    """
+    Read-only mapping over a CompactGraph shaped like `degrees.names`:
+    lowercase name to the set of person_ids with that name.
+    """
+
+    def __init__(self, graph):
+        self.graph = graph
+
+    def __getitem__(self, name):
+        person_ids = self.graph.person_ids_for_name(name) if name == name.lower() else []
+        if not person_ids:
+            raise KeyError(name)
+        return set(person_ids)
+
+    def __iter__(self):
+        previous = None
+        for i in self.graph.name_order:
+            name = self.graph._lower_name(i)
+            if name != previous:
+                yield name
+                previous = name
+
+    def __len__(self):
+        return sum(1 for _ in self)
+
+
+def _find(order, keys, key):
+    """
+    Binary search `order`, a list of indices sorted by `keys`, for `key`.
+    """
+    i = bisect_left(order, key, key=keys.__getitem__)
+    if i < len(order) and keys[order[i]] == key:
+        return order[i]
+    return None
+
+
+def build_csr(count, sources, targets):
+    """
+    Group the edges (sources[k], targets[k]) by source.
+
+    Return (offsets, targets) arrays such that the targets of source
+    `i` are at positions offsets[i]..offsets[i + 1].
+    """
+    offsets = array("q", bytes(8 * (count + 1)))
+    for source in sources:
+        offsets[source + 1] += 1
+    for i in range(count):
+        offsets[i + 1] += offsets[i]
+
+    cursor = array("q", offsets)
+    grouped = array("i", bytes(4 * len(targets)))
+    for source, target in zip(sources, targets):
+        grouped[cursor[source]] = target
+        cursor[source] += 1
+    return offsets, grouped
+
+
+def load_compact(directory):
+    """
+    Load the people, movies and stars CSV files in `directory`
+    into a CompactGraph.
+    """
+    person_ids = []
+    person_names = []
+    person_births = []
+    with open(f"{directory}/people.csv", encoding="utf-8") as f:
+        reader = csv.reader(f)
+        header = next(reader)
+        id_col, name_col, birth_col = (header.index(c) for c in ("id", "name", "birth"))
+        for row in reader:
+            person_ids.append(row[id_col])
+            person_names.append(row[name_col])
+            person_births.append(row[birth_col])
+
+    movie_ids = []
+    movie_titles = []
+    movie_years = []
+    with open(f"{directory}/movies.csv", encoding="utf-8") as f:
+        reader = csv.reader(f)
+        header = next(reader)
+        id_col, title_col, year_col = (header.index(c) for c in ("id", "title", "year"))
+        for row in reader:
+            movie_ids.append(row[id_col])
+            movie_titles.append(row[title_col])
+            movie_years.append(row[year_col])
+
+    # Interning only needs these dicts while the star rows are read
+    person_lookup = {person_id: i for i, person_id in enumerate(person_ids)}
+    movie_lookup = {movie_id: i for i, movie_id in enumerate(movie_ids)}
+    star_people = array("i")
+    star_movies = array("i")
+    with open(f"{directory}/stars.csv", encoding="utf-8") as f:
+        reader = csv.reader(f)
+        header = next(reader)
+        person_col, movie_col = header.index("person_id"), header.index("movie_id")
+        for row in reader:
+            person = person_lookup.get(row[person_col])
+            movie = movie_lookup.get(row[movie_col])
+            if person is not None and movie is not None:
+                star_people.append(person)
+                star_movies.append(movie)
+    del person_lookup, movie_lookup
+
+    person_offsets, person_movies = build_csr(len(person_ids), star_people, star_movies)
+    movie_offsets, movie_stars = build_csr(len(movie_ids), star_movies, star_people)
+    del star_people, star_movies
+
+    person_order = array("i", sorted(range(len(person_ids)), key=person_ids.__getitem__))
+    name_order = array("i", sorted(range(len(person_names)),
+                                   key=lambda i: person_names[i].lower()))
+    movie_order = array("i", sorted(range(len(movie_ids)), key=movie_ids.__getitem__))
+
+    return CompactGraph(
+        person_ids, person_names, person_births,
+        movie_ids, movie_titles, movie_years,
+        person_offsets, person_movies, movie_offsets, movie_stars,
+        person_order, name_order, movie_order
+    )
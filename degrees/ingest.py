@@ -0,0 +1,181 @@
+import csv
+import os
+import time
+
+# Rows parsed between progress reports
+CHUNK_SIZE = 100000
+
+
+class IngestReport():
+    """
+    Counts and timing for ingesting one CSV file.
+    """
+
+    def __init__(self, filename):
+        self.filename = filename
+        self.size = os.path.getsize(filename)
+        self.position = 0
+        self.rows = 0
+        self.accepted = 0
+        self.rejected = {}
+        self.start = time.perf_counter()
+        self.end = None
+
+    def reject(self, reason):
+        self.rejected[reason] = self.rejected.get(reason, 0) + 1
+
+    @property
+    def seconds(self):
+        return (self.end or time.perf_counter()) - self.start
+
+    @property
+    def rows_per_second(self):
+        return self.rows / self.seconds if self.seconds else 0.0
+
+    @property
+    def progress(self):
+        """
+        Fraction of the file read so far (approximate for non-ASCII text).
+        """
+        return min(self.position / self.size, 1.0) if self.size else 1.0
+
+    def __str__(self):
+        rejected = sum(self.rejected.values())
+        text = (f"{os.path.basename(self.filename)}: {self.accepted} of {self.rows} rows "
+                f"in {self.seconds:.2f}s ({self.rows_per_second:,.0f} rows/s)")
+        if rejected:
+            reasons = ", ".join(f"{count} {reason}" for reason, count in sorted(self.rejected.items()))
+            text += f", {rejected} rejected ({reasons})"
+        return text
+
+
+def read_chunks(filename, columns, report, chunk_size=CHUNK_SIZE):
+    """
+    Yield lists of up to `chunk_size` tuples holding the named
+    `columns` of each row of a CSV file.
+
+    Blank lines are skipped. Rows with too few fields are counted in
+    `report` as malformed rather than yielded.
+    """
+    with open(filename, encoding="utf-8", newline="") as f:
+
+        def lines():
+            for line in f:
+                report.position += len(line)
+                yield line
+
+        reader = csv.reader(lines())
+        header = next(reader, [])
+        try:
+            indices = [header.index(column) for column in columns]
+        except ValueError:
+            raise ValueError(f"{filename} must have columns {', '.join(columns)}")
+        width = max(indices) + 1
+
+        chunk = []
+        for row in reader:
+            if not row:
+                # Blank lines are skipped, as csv.DictReader does
+                continue
+            report.rows += 1
+            if len(row) < width:
+                report.reject("malformed")
+                continue
+            chunk.append(tuple(row[i] for i in indices))
+            if len(chunk) == chunk_size:
+                yield chunk
+                chunk = []
+        if chunk:
+            yield chunk
+
+
+def ingest(filename, columns, add, chunk_size=CHUNK_SIZE, progress=None):
+    """
+    Stream a CSV file through `add(*values)` chunk by chunk.
+
+    `add` returns True to accept a row, or a reason string to reject
+    it. `progress(report)` is called after every chunk. Returns the
+    finished IngestReport.
+    """
+    report = IngestReport(filename)
+    for chunk in read_chunks(filename, columns, report, chunk_size):
+        for values in chunk:
+            result = add(*values)
+            if result is True:
+                report.accepted += 1
+            else:
+                report.reject(result)
+        if progress is not None:
+            progress(report)
+    report.end = time.perf_counter()
+    return report
+
+
+def ingest_people(directory, people, names, **kwargs):
+    """
+    Add every row of people.csv to the `people` and `names` dicts.
+
+    A repeated id replaces the earlier row, as the last row wins.
+    """
+    def add(person_id, name, birth):
+        previous = people.get(person_id)
+        if previous is not None:
+            ids = names.get(previous["name"].lower())
+            if ids is not None:
+                ids.discard(person_id)
+                if not ids:
+                    del names[previous["name"].lower()]
+        people[person_id] = {
+            "name": name,
+            "birth": birth,
+            "movies": set()
+        }
+        names.setdefault(name.lower(), set()).add(person_id)
+        return True
+
+    return ingest(os.path.join(directory, "people.csv"), ("id", "name", "birth"), add, **kwargs)
+
+
+def ingest_movies(directory, movies, **kwargs):
+    """
+    Add every row of movies.csv to the `movies` dict.
+
+    A repeated id replaces the earlier row, as the last row wins.
+    """
+    def add(movie_id, title, year):
+        movies[movie_id] = {
+            "title": title,
+            "year": year,
+            "stars": set()
+        }
+        return True
+
+    return ingest(os.path.join(directory, "movies.csv"), ("id", "title", "year"), add, **kwargs)
+
+
+def ingest_stars(directory, people, movies, **kwargs):
+    """
+    Link people and movies for every row of stars.csv, rejecting
+    rows whose person or movie is unknown.
+    """
+    def add(person_id, movie_id):
+        person = people.get(person_id)
+        if person is None:
+            return "unknown person"
+        movie = movies.get(movie_id)
+        if movie is None:
+            return "unknown movie"
+        person["movies"].add(movie_id)
+        movie["stars"].add(person_id)
+        return True
+
+    return ingest(os.path.join(directory, "stars.csv"), ("person_id", "movie_id"), add, **kwargs)
+
+
+def print_progress(report):
+    """
+    Progress callback printing one updating line per file.
+    """
+    print(f"\r  {os.path.basename(report.filename)}: {100 * report.progress:5.1f}% "
+          f"{report.rows:,} rows ({report.rows_per_second:,.0f} rows/s)",
+          end="\n" if report.progress == 1.0 else "", flush=True)
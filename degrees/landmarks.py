@@ -0,0 +1,235 @@
+import heapq
+import itertools
+import json
+import struct
+from array import array
+
+import degrees
+
+MAGIC = b"DEGLMK\0\0"
+VERSION = 2
+PREAMBLE = struct.Struct("<8sII")
+
+# Distances are stored as unsigned 16-bit integers, with the largest
+# value for people a landmark cannot reach
+TYPECODE = "H"
+UNREACHABLE = 0xFFFF
+
+# Landmarks consulted by the A* heuristic for one query
+ACTIVE_LANDMARKS = 8
+
+
+class LandmarkIndex():
+    """
+    BFS distances from a few well-connected "landmark" people to
+    everyone else, used ALT-style: by the triangle inequality
+
+        |d(L, s) - d(L, t)| <= d(s, t) <= d(L, s) + d(L, t)
+
+    for every landmark L, which gives bounds on the degrees of
+    separation between two people without searching.
+    """
+
+    def __init__(self, landmarks, person_ids, distances):
+        self.landmarks = landmarks
+        self.person_ids = person_ids
+        self.distances = distances
+        self.index = {person_id: i for i, person_id in enumerate(person_ids)}
+
+    @classmethod
+    def build(cls, count=32):
+        """
+        Build an index over the data loaded into `degrees`, using the
+        `count` people with the most co-stars as landmarks.
+        """
+        person_ids = list(degrees.people)
+        index = {person_id: i for i, person_id in enumerate(person_ids)}
+
+        def costars(person_id):
+            return sum(len(degrees.movies[movie_id]["stars"]) - 1
+                       for movie_id in degrees.people[person_id]["movies"])
+
+        landmarks = heapq.nlargest(count, person_ids, key=costars)
+        distances = [bfs_distances(landmark, index) for landmark in landmarks]
+        return cls(landmarks, person_ids, distances)
+
+    def _row(self, person_id):
+        i = self.index.get(person_id)
+        if i is None:
+            raise KeyError(person_id)
+        return [distances[i] for distances in self.distances]
+
+    def bounds(self, source, target):
+        """
+        Return (lower, upper) bounds on the degrees of separation
+        between two people.
+
+        `upper` is None if no landmark reaches both people. If some
+        landmark reaches exactly one of them they are not connected,
+        and (None, None) is returned.
+        """
+        if source == target:
+            return 0, 0
+        lower, upper = 0, None
+        for s, t in zip(self._row(source), self._row(target)):
+            if (s == UNREACHABLE) != (t == UNREACHABLE):
+                return None, None
+            if s == UNREACHABLE:
+                continue
+            lower = max(lower, abs(s - t))
+            if upper is None or s + t < upper:
+                upper = s + t
+        return lower, upper
+
+    def heuristic(self, target, source=None):
+        """
+        Return a function giving a lower bound on the distance from
+        a person to `target`.
+
+        With `source` given, only the ACTIVE_LANDMARKS landmarks with
+        the best bound at the source are consulted, and each person's
+        bound is computed once, so A* pays a few comparisons per
+        person instead of one per landmark per push.
+        """
+        target_row = self._row(target)
+        pairs = [(distances, t) for distances, t in zip(self.distances, target_row)
+                 if t != UNREACHABLE]
+        index = self.index
+        if source is not None:
+            i = index[source]
+            pairs = heapq.nlargest(ACTIVE_LANDMARKS, pairs, key=lambda pair: (
+                -1 if pair[0][i] == UNREACHABLE else abs(pair[0][i] - pair[1])))
+        known = {}
+
+        def h(person_id):
+            bound = known.get(person_id)
+            if bound is None:
+                i = index[person_id]
+                bound = max((abs(distances[i] - t) for distances, t in pairs
+                             if distances[i] != UNREACHABLE), default=0)
+                known[person_id] = bound
+            return bound
+        return h
+
+    def shortest_path(self, source, target, stats=None):
+        """
+        Returns the shortest list of (movie_id, person_id) pairs
+        that connect the source to the target, or None if they are
+        not connected.
+
+        Runs A* guided by the landmark lower bounds, which are
+        consistent, so the first time the target is popped its path
+        is a shortest one.
+
+        This is slower than `degrees.shortest_path(bidirectional=True)`
+        on movie graphs: degrees of separation are so small that the
+        bounds barely prune a one-sided search, which still expands
+        about a hundred times more people. Use the index for
+        `bounds` and `estimate_degrees`, and this search where a
+        single-ended search is required.
+        """
+        if self.bounds(source, target)[0] is None:
+            return None
+        h = self.heuristic(target, source)
+        counter = itertools.count()
+        parents = {source: None}
+        cost = {source: 0}
+        queue = [(h(source), next(counter), source)]
+        done = set()
+        expanded = 0
+
+        while queue:
+            _, _, person_id = heapq.heappop(queue)
+            if person_id in done:
+                continue
+            if person_id == target:
+                break
+            done.add(person_id)
+            expanded += 1
+            g = cost[person_id] + 1
+            for movie_id, neighbor_id in degrees.neighbors_for_person(person_id):
+                if neighbor_id in done or cost.get(neighbor_id, g + 1) <= g:
+                    continue
+                cost[neighbor_id] = g
+                parents[neighbor_id] = (movie_id, person_id)
+                heapq.heappush(queue, (g + h(neighbor_id), next(counter), neighbor_id))
+        else:
+            person_id = None
+
+        if stats is not None:
+            stats["expanded"] = stats.get("expanded", 0) + expanded
+        if person_id is None:
+            return None
+        path = []
+        while parents[person_id] is not None:
+            movie_id, parent_id = parents[person_id]
+            path.append((movie_id, person_id))
+            person_id = parent_id
+        path.reverse()
+        return path
+
+    def save(self, filename):
+        """
+        Write the index to `filename`.
+        """
+        header = json.dumps({
+            "landmarks": self.landmarks,
+            "people": self.person_ids,
+        }).encode("utf-8")
+        with open(filename, "wb") as f:
+            f.write(PREAMBLE.pack(MAGIC, VERSION, len(header)))
+            f.write(header)
+            for distances in self.distances:
+                distances.tofile(f)
+
+    @classmethod
+    def load(cls, filename):
+        """
+        Read an index written by `save`.
+        """
+        with open(filename, "rb") as f:
+            magic, version, size = PREAMBLE.unpack(f.read(PREAMBLE.size))
+            if magic != MAGIC or version != VERSION:
+                raise ValueError(f"{filename} is not a version {VERSION} landmark index")
+            header = json.loads(f.read(size))
+            distances = []
+            for _ in header["landmarks"]:
+                row = array(TYPECODE)
+                row.fromfile(f, len(header["people"]))
+                distances.append(row)
+        return cls(header["landmarks"], header["people"], distances)
+
+
+def bfs_distances(source, index):
+    """
+    Return an array of BFS distances from `source` to every person,
+    positioned by `index`, with UNREACHABLE for people not connected.
+    """
+    distances = array(TYPECODE, [UNREACHABLE]) * len(index)
+    distances[index[source]] = 0
+    frontier = [source]
+    depth = 0
+    while frontier:
+        depth += 1
+        next_frontier = []
+        for person_id in frontier:
+            for movie_id in degrees.people[person_id]["movies"]:
+                for neighbor_id in degrees.movies[movie_id]["stars"]:
+                    i = index[neighbor_id]
+                    if distances[i] == UNREACHABLE:
+                        distances[i] = depth
+                        next_frontier.append(neighbor_id)
+        frontier = next_frontier
+    return distances
+
+
+def estimate_degrees(index, source, target):
+    """
+    Estimate the degrees of separation between two people from the
+    LandmarkIndex `index` alone, without searching.
+
+    Returns the landmark upper bound, which is exact whenever a shortest
+    path passes through a landmark, or None if the two people are known
+    not to be connected (or no landmark reaches them).
+    """
+    return index.bounds(source, target)[1]
@@ -0,0 +1,107 @@
+import argparse
+import json
+import os
+import random
+import subprocess
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.request import Request, urlopen
+
+import snapshot
+
+# server.py next to this file, so the load test runs from any directory
+SERVER = os.path.join(os.path.dirname(os.path.abspath(__file__)), "server.py")
+
+
+def random_queries(directory, count, seed=0):
+    """
+    Return `count` queries between random people in the dataset.
+    """
+    graph = snapshot.load_graph(directory)
+    rng = random.Random(seed)
+    return [
+        {
+            "id": i,
+            "source": graph.person_ids[rng.randrange(len(graph))],
+            "target": graph.person_ids[rng.randrange(len(graph))],
+        }
+        for i in range(count)
+    ]
+
+
+def run_stdio(args, queries):
+    """
+    Start server.py in JSON-lines mode, stream every query to it and
+    wait for all the responses.
+    """
+    command = [sys.executable, SERVER, args.directory, "--workers", str(args.workers)]
+    server = subprocess.Popen(command, stdin=subprocess.PIPE, stdout=subprocess.PIPE,
+                              text=True, bufsize=1)
+
+    # Make sure the server has loaded its graph before the clock starts
+    server.stdin.write(json.dumps(queries[0]) + "\n")
+    server.stdout.readline()
+
+    def send():
+        for query in queries:
+            server.stdin.write(json.dumps(query) + "\n")
+        server.stdin.close()
+
+    start = time.perf_counter()
+    writer = threading.Thread(target=send)
+    writer.start()
+    responses = [json.loads(line) for line in server.stdout]
+    elapsed = time.perf_counter() - start
+    writer.join()
+    server.wait()
+    return responses, elapsed
+
+
+def run_http(args, queries):
+    """
+    POST every query to a running `server.py --http` from
+    `--concurrency` client threads.
+    """
+    def post(query):
+        request = Request(args.url, data=json.dumps(query).encode("utf-8"),
+                          headers={"Content-Type": "application/json"})
+        try:
+            with urlopen(request) as response:
+                return json.load(response)
+        except OSError as e:
+            body = getattr(e, "read", lambda: b"")()
+            return json.loads(body) if body else {"id": query["id"], "error": str(e)}
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(args.concurrency) as pool:
+        responses = list(pool.map(post, queries))
+    return responses, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load test for server.py")
+    parser.add_argument("directory", nargs="?", default="small")
+    parser.add_argument("--queries", type=int, default=1000)
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--url", help="test a running HTTP server, e.g. http://127.0.0.1:8000/path")
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    queries = random_queries(args.directory, args.queries, seed=args.seed)
+    if args.url:
+        responses, elapsed = run_http(args, queries)
+    else:
+        responses, elapsed = run_stdio(args, queries)
+
+    errors = sum(1 for response in responses if "error" in response)
+    connected = sum(1 for response in responses if response.get("degrees") is not None)
+    print(f"{len(responses)} responses in {elapsed:.2f}s: "
+          f"{len(responses) / elapsed:,.0f} queries/s "
+          f"({connected} connected, {errors} errors)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,173 @@
+import heapq
+import math
+import unicodedata
+from collections import Counter
+from array import array
+from bisect import bisect_left
+
+# Fraction of the query's trigrams a name must share to be found
+MIN_SHARED = 0.5
+
+# Most posting-list entries scanned per fuzzy query, rarest trigrams first
+SCAN_BUDGET = 20000
+
+# Candidates re-scored exactly after the trigram hit count
+RESCORE = 50
+
+# Most suffix keys looked at per autocomplete, as a multiple of the limit
+AUTOCOMPLETE_SCAN = 20
+
+
+def normalize(name):
+    """
+    Lowercase `name`, strip accents and collapse whitespace.
+    """
+    decomposed = unicodedata.normalize("NFKD", name)
+    stripped = "".join(c for c in decomposed if not unicodedata.combining(c))
+    return " ".join(stripped.lower().split())
+
+
+def trigrams(text):
+    """
+    Return the set of three-character substrings of `text`, padded
+    so that word starts and ends count too.
+    """
+    padded = f"  {text} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+class NameIndex():
+    """
+    Prefix and trigram index over people's names.
+
+    `autocomplete` binary-searches a sorted list of every word-suffix
+    of each name ("tom hanks", "hanks"), so typing a last name works
+    too. `search` ranks names by trigram similarity to the query,
+    which tolerates typos and missing words.
+    """
+
+    def __init__(self, names, person_ids, keys, key_names, grams):
+        self.names = names
+        self.person_ids = person_ids
+        self.keys = keys
+        self.key_names = key_names
+        self.grams = grams
+
+    @classmethod
+    def build(cls, people):
+        """
+        Build an index from a dict mapping person_id to a dict with a
+        "name", like `degrees.people`.
+        """
+        by_name = {}
+        for person_id, person in people.items():
+            by_name.setdefault(normalize(person["name"]), []).append(person_id)
+        names = sorted(by_name)
+        person_ids = [by_name[name] for name in names]
+
+        suffixes = []
+        postings = {}
+        for i, name in enumerate(names):
+            start = 0
+            while start != -1:
+                suffixes.append((name[start:], i))
+                start = name.find(" ", start)
+                if start != -1:
+                    start += 1
+            for gram in trigrams(name):
+                posting = postings.get(gram)
+                if posting is None:
+                    postings[gram] = posting = array("i")
+                posting.append(i)
+        suffixes.sort()
+        keys = [key for key, _ in suffixes]
+        key_names = array("i", (i for _, i in suffixes))
+        return cls(names, person_ids, keys, key_names, postings)
+
+    def __len__(self):
+        return len(self.names)
+
+    def _matches(self, indices, scores):
+        return [
+            (person_id, self.names[i], score)
+            for i, score in zip(indices, scores)
+            for person_id in self.person_ids[i]
+        ]
+
+    def exact(self, name):
+        """
+        Return the person_ids whose normalized name equals `name`'s.
+        """
+        name = normalize(name)
+        i = bisect_left(self.names, name)
+        if i < len(self.names) and self.names[i] == name:
+            return list(self.person_ids[i])
+        return []
+
+    def autocomplete(self, prefix, limit=10):
+        """
+        Return up to `limit` (person_id, name, score) matches for names
+        with a word starting with `prefix`. Matches on the first word
+        score 1.0 and come first, later words score 0.5.
+        """
+        prefix = normalize(prefix)
+        start = bisect_left(self.keys, prefix)
+        first, later = [], []
+        seen = set()
+        end = min(len(self.keys), start + AUTOCOMPLETE_SCAN * limit)
+        for k in range(start, end):
+            if not self.keys[k].startswith(prefix):
+                break
+            i = self.key_names[k]
+            if i in seen:
+                continue
+            seen.add(i)
+            (first if self.names[i].startswith(prefix) else later).append(i)
+            if len(first) >= limit:
+                break
+        indices = (first + later)[:limit]
+        scores = [1.0 if i in first else 0.5 for i in indices]
+        return self._matches(indices, scores)[:limit]
+
+    def search(self, query, limit=10):
+        """
+        Return up to `limit` (person_id, name, score) matches ranked by
+        the Dice coefficient between query and name trigrams.
+
+        A name sharing at least MIN_SHARED of the query's t trigrams
+        must appear in one of the t - ceil(MIN_SHARED * t) + 1 rarest
+        posting lists, so only those are scanned (up to SCAN_BUDGET
+        entries). Common trigrams never make a query touch most of
+        the index.
+        """
+        query = normalize(query)
+        query_grams = trigrams(query)
+        postings = sorted(
+            (self.grams[gram] for gram in query_grams if gram in self.grams), key=len
+        )
+        needed = len(query_grams) - math.ceil(MIN_SHARED * len(query_grams)) + 1
+        hits = Counter()
+        scanned = 0
+        for posting in postings[:needed]:
+            if scanned and scanned + len(posting) > SCAN_BUDGET:
+                break
+            scanned += len(posting)
+            hits.update(posting)
+
+        if len(hits) > RESCORE:
+            # Keep the names hit by the most scanned lists; a cutoff is
+            # much cheaper than fully ranking every hit
+            counts = sorted(hits.values(), reverse=True)
+            cutoff = counts[RESCORE - 1]
+            shortlist = [i for i, count in hits.items() if count > cutoff]
+            shortlist += [i for i, count in hits.items()
+                          if count == cutoff][:RESCORE - len(shortlist)]
+        else:
+            shortlist = hits
+        scored = []
+        for i in shortlist:
+            name_grams = trigrams(self.names[i])
+            common = len(query_grams & name_grams)
+            scored.append((2 * common / (len(query_grams) + len(name_grams)), i))
+        best = heapq.nlargest(limit, scored)
+        return self._matches([i for _, i in best], [score for score, _ in best])[:limit]
@@ -0,0 +1,202 @@
+import argparse
+import json
+import multiprocessing
+import os
+import sys
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+import snapshot
+
+# Graph shared by every worker. It is loaded once in the parent before
+# the pool starts, so forked workers inherit it (and its mmap) for free.
+graph = None
+
+
+def load(directory):
+    """
+    Load the graph for `directory` unless this process already has it.
+    """
+    global graph
+    if graph is None:
+        graph = snapshot.load_graph(directory)
+
+
+def resolve(person):
+    """
+    Return (person_id, error) for a person given by id or by name.
+    """
+    if graph.person_index(person) is not None:
+        return person, None
+    person_ids = graph.person_ids_for_name(person)
+    if len(person_ids) == 1:
+        return person_ids[0], None
+    if not person_ids:
+        return None, f"person not found: {person}"
+    return None, f"ambiguous name: {person} (ids {', '.join(person_ids)})"
+
+
+def answer(request):
+    """
+    Answer one query dict with "source" and "target" names or ids.
+    Return a JSON-serializable response dict, echoing any "id".
+    """
+    response = {"id": request.get("id")}
+    try:
+        source, error = resolve(str(request["source"]))
+        if error is None:
+            target, error = resolve(str(request["target"]))
+    except KeyError as e:
+        error = f"missing field: {e.args[0]}"
+    if error is not None:
+        response["error"] = error
+        return response
+
+    path = graph.shortest_path(source, target)
+    if path is None:
+        response["degrees"] = None
+        response["path"] = None
+        return response
+    response["degrees"] = len(path)
+    response["path"] = [
+        {
+            "movie_id": movie_id,
+            "title": graph.movie_titles[graph.movie_index(movie_id)],
+            "person_id": person_id,
+            "name": graph.person_names[graph.person_index(person_id)],
+        }
+        for movie_id, person_id in path
+    ]
+    return response
+
+
+def serve_stdio(executor, max_pending, infile=sys.stdin, outfile=sys.stdout):
+    """
+    Read one JSON query per line from `infile` and write one JSON
+    response per line to `outfile`.
+
+    Queries are answered concurrently, so responses come back in
+    completion order; match them up by "id".
+    """
+    pending = threading.BoundedSemaphore(max_pending)
+    lock = threading.Lock()
+
+    def write(response):
+        with lock:
+            outfile.write(json.dumps(response) + "\n")
+            outfile.flush()
+
+    def done(future, request_id):
+        try:
+            try:
+                response = future.result()
+            except Exception as e:
+                response = {"id": request_id, "error": f"internal error: {e}"}
+            write(response)
+        finally:
+            # Release even if the write fails, or the reader deadlocks
+            pending.release()
+
+    for line in infile:
+        if not line.strip():
+            continue
+        try:
+            request = json.loads(line)
+            if not isinstance(request, dict):
+                raise ValueError("query must be a JSON object")
+        except ValueError as e:
+            write({"id": None, "error": f"bad request: {e}"})
+            continue
+        pending.acquire()
+        future = executor.submit(answer, request)
+        future.add_done_callback(lambda f, i=request.get("id"): done(f, i))
+
+    # Wait for every outstanding query to be written
+    for _ in range(max_pending):
+        pending.acquire()
+
+
+class QueryHandler(BaseHTTPRequestHandler):
+    """
+    GET /path?source=...&target=... or POST /path with a JSON query.
+    """
+    executor = None
+
+    def do_GET(self):
+        query = parse_qs(urlparse(self.path).query)
+        self.respond({key: values[0] for key, values in query.items()})
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length", 0))
+        try:
+            request = json.loads(self.rfile.read(length))
+        except ValueError as e:
+            self.send(400, {"error": f"bad request: {e}"})
+            return
+        self.respond(request)
+
+    def respond(self, request):
+        if urlparse(self.path).path != "/path":
+            self.send(404, {"error": "not found"})
+            return
+        if not isinstance(request, dict):
+            self.send(400, {"error": "bad request: query must be a JSON object"})
+            return
+        try:
+            response = self.executor.submit(answer, request).result()
+        except Exception as e:
+            self.send(500, {"id": request.get("id"), "error": f"internal error: {e}"})
+            return
+        self.send(400 if "error" in response else 200, response)
+
+    def send(self, status, body):
+        data = json.dumps(body).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Answer many degrees queries against one loaded graph."
+    )
+    parser.add_argument("directory", nargs="?", default="small")
+    parser.add_argument("--http", type=int, metavar="PORT",
+                        help="serve HTTP on PORT instead of JSON lines on stdin/stdout")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--workers", type=int, default=os.cpu_count())
+    parser.add_argument("--max-pending", type=int, default=1024,
+                        help="most stdin queries in flight at once")
+    args = parser.parse_args()
+
+    load(args.directory)
+    print(f"Loaded {len(graph)} people.", file=sys.stderr)
+
+    # Fork where available so workers share the already loaded graph
+    methods = multiprocessing.get_all_start_methods()
+    context = multiprocessing.get_context("fork" if "fork" in methods else None)
+    with ProcessPoolExecutor(args.workers, mp_context=context,
+                             initializer=load, initargs=(args.directory,)) as executor:
+        if args.http is None:
+            serve_stdio(executor, args.max_pending)
+            return
+        QueryHandler.executor = executor
+        server = ThreadingHTTPServer((args.host, args.http), QueryHandler)
+        print(f"Serving on http://{args.host}:{args.http}/path", file=sys.stderr)
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            server.server_close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,220 @@
+import hashlib
+import json
+import mmap
+import os
+import struct
+from array import array
+
+from graph import CompactGraph, load_compact
+
+MAGIC = b"DEGSNAP\0"
+VERSION = 1
+FILENAME = "degrees.snapshot"
+SOURCES = ("people.csv", "movies.csv", "stars.csv")
+
+# Preamble: magic, format version, length of the JSON header that follows
+PREAMBLE = struct.Struct("<8sII")
+
+# Integer array attributes of CompactGraph and their array typecodes
+ARRAYS = {
+    "person_offsets": "q",
+    "person_movies": "i",
+    "movie_offsets": "q",
+    "movie_stars": "i",
+    "person_order": "i",
+    "name_order": "i",
+    "movie_order": "i",
+}
+
+# String attributes of CompactGraph
+STRINGS = (
+    "person_ids", "person_names", "person_births",
+    "movie_ids", "movie_titles", "movie_years",
+)
+
+
+class StringTable():
+    """
+    Read-only sequence of strings stored as one UTF-8 buffer plus an
+    array of offsets into it. Strings are decoded only when indexed.
+    """
+
+    def __init__(self, offsets, data):
+        self.offsets = offsets
+        self.data = data
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def __getitem__(self, index):
+        return str(self.data[self.offsets[index]:self.offsets[index + 1]], "utf-8")
+
+
+def fingerprint(directory, previous=None):
+    """
+    Return a dict describing the source CSV files in `directory`.
+
+    Each file is identified by its mtime and size. Its SHA-256 is only
+    recomputed when those differ from `previous`, otherwise the hash
+    recorded there is reused.
+    """
+    previous = previous or {}
+    result = {}
+    for name in SOURCES:
+        stat = os.stat(os.path.join(directory, name))
+        entry = {"mtime_ns": stat.st_mtime_ns, "size": stat.st_size}
+        old = previous.get(name, {})
+        if old.get("mtime_ns") == entry["mtime_ns"] and old.get("size") == entry["size"]:
+            entry["sha256"] = old["sha256"]
+        else:
+            entry["sha256"] = file_hash(os.path.join(directory, name))
+        result[name] = entry
+    return result
+
+
+def file_hash(path):
+    """
+    Return the SHA-256 hex digest of the file at `path`.
+    """
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def same_sources(old, new):
+    """
+    Return True if two fingerprints describe the same file contents.
+    """
+    return all(old.get(name, {}).get("sha256") == new[name]["sha256"] for name in new)
+
+
+def encode_strings(strings):
+    """
+    Return (offsets, data) for a sequence of strings.
+    """
+    if isinstance(strings, StringTable):
+        return array("q", strings.offsets), bytes(strings.data)
+    offsets = array("q", [0])
+    chunks = []
+    total = 0
+    for s in strings:
+        encoded = s.encode("utf-8")
+        chunks.append(encoded)
+        total += len(encoded)
+        offsets.append(total)
+    return offsets, b"".join(chunks)
+
+
+def write_snapshot(graph, path, sources):
+    """
+    Write `graph` to a snapshot file at `path`, recording the
+    `sources` fingerprint it was built from.
+
+    The file is written next to `path` first and then renamed over
+    it, so readers never see a partial snapshot.
+    """
+    sections = []
+    for name, typecode in ARRAYS.items():
+        sections.append((name, typecode, array(typecode, getattr(graph, name)).tobytes()))
+    for name in STRINGS:
+        offsets, data = encode_strings(getattr(graph, name))
+        sections.append((f"{name}.offsets", "q", offsets.tobytes()))
+        sections.append((f"{name}.data", "B", data))
+
+    # Section offsets are relative to the (8-byte aligned) end of the header
+    layout = {}
+    position = 0
+    for name, typecode, data in sections:
+        layout[name] = [position, len(data), typecode]
+        position += _aligned(len(data))
+    header = json.dumps({"sources": sources, "sections": layout}).encode("utf-8")
+    header += b" " * (_aligned(PREAMBLE.size + len(header)) - PREAMBLE.size - len(header))
+
+    temporary = f"{path}.tmp"
+    with open(temporary, "wb") as f:
+        f.write(PREAMBLE.pack(MAGIC, VERSION, len(header)))
+        f.write(header)
+        for name, typecode, data in sections:
+            f.write(data)
+            f.write(b"\0" * (_aligned(len(data)) - len(data)))
+    os.replace(temporary, path)
+
+
+def read_snapshot(path):
+    """
+    Memory-map the snapshot at `path`.
+
+    Return (graph, sources), or None if the file is missing or was
+    written by a different format version. The graph's arrays and
+    strings are views into the mapping, nothing is copied.
+    """
+    try:
+        f = open(path, "rb")
+    except FileNotFoundError:
+        return None
+    with f:
+        if os.fstat(f.fileno()).st_size < PREAMBLE.size:
+            return None
+        buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+    magic, version, header_size = PREAMBLE.unpack_from(buffer)
+    if magic != MAGIC or version != VERSION:
+        buffer.close()
+        return None
+    header = json.loads(bytes(buffer[PREAMBLE.size:PREAMBLE.size + header_size]))
+    base = PREAMBLE.size + header_size
+    view = memoryview(buffer)
+
+    def section(name):
+        offset, length, typecode = header["sections"][name]
+        data = view[base + offset:base + offset + length]
+        return data if typecode == "B" else data.cast(typecode)
+
+    fields = {name: section(name) for name in ARRAYS}
+    for name in STRINGS:
+        fields[name] = StringTable(section(f"{name}.offsets"), section(f"{name}.data"))
+    graph = CompactGraph(**fields)
+
+    # Keep the mapping alive as long as the graph is
+    graph.mapping = buffer
+    return graph, header["sources"]
+
+
+def load_graph(directory, path=None, stats=None):
+    """
+    Return a CompactGraph for the dataset in `directory`.
+
+    The graph is read from a snapshot file next to the CSVs when one
+    exists and the CSVs have not changed since it was written.
+    Otherwise the CSVs are parsed and a new snapshot is written. If
+    `stats` is a dict, the snapshot's "path" is stored in it, and
+    whether it was "written" (True) or only read (False).
+    """
+    path = path or os.path.join(directory, FILENAME)
+    if stats is not None:
+        stats["path"] = path
+        stats["written"] = True
+    snapshot = read_snapshot(path)
+    if snapshot is not None:
+        graph, recorded = snapshot
+        current = fingerprint(directory, recorded)
+        if current == recorded:
+            if stats is not None:
+                stats["written"] = False
+            return graph
+        if same_sources(recorded, current):
+            # Only the mtimes moved, record them so the hash isn't redone
+            write_snapshot(graph, path, current)
+            return read_snapshot(path)[0]
+    else:
+        current = fingerprint(directory)
+
+    graph = load_compact(directory)
+    write_snapshot(graph, path, current)
+    return read_snapshot(path)[0]
+
+
+def _aligned(size):
+    return (size + 7) & ~7
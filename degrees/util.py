@@ -1,4 +1,9 @@
+from collections import deque
+
+
 class Node():
+    __slots__ = ("state", "parent", "action")
+
     def __init__(self, state, parent, action):
         self.state = state
         self.parent = parent
@@ -36,3 +41,119 @@ class QueueFrontier(StackFrontier):
             node = self.frontier[0]
             self.frontier = self.frontier[1:]
             return node
+
+
+class DequeStackFrontier():
+    """
+    Stack frontier with O(1) add, remove and contains_state.
+
+    Nodes are kept in a deque, alongside a count of how many nodes
+    for each state are currently in the frontier.
+    """
+
+    def __init__(self):
+        self.frontier = deque()
+        self.states = {}
+
+    def add(self, node):
+        self.frontier.append(node)
+        self.states[node.state] = self.states.get(node.state, 0) + 1
+
+    def contains_state(self, state):
+        return state in self.states
+
+    def empty(self):
+        return len(self.frontier) == 0
+
+    def __len__(self):
+        return len(self.frontier)
+
+    def _pop(self):
+        return self.frontier.pop()
+
+    def remove(self):
+        if self.empty():
+            raise Exception("empty frontier")
+        node = self._pop()
+        count = self.states[node.state] - 1
+        if count:
+            self.states[node.state] = count
+        else:
+            del self.states[node.state]
+        return node
+
+
+class DequeQueueFrontier(DequeStackFrontier):
+
+    def _pop(self):
+        return self.frontier.popleft()
+
+
+def bidirectional_search(source, target, neighbors, stats=None):
+    """
+    Returns the shortest list of (action, state) pairs leading from
+    `source` to `target`, where `neighbors(state)` gives the
+    (action, state) pairs one step away, or None if there is none.
+
+    The search runs breadth-first from both ends and joins the two
+    searches in the middle. Each round expands one whole level of
+    whichever frontier is smaller. If `stats` is a dict, the number
+    of states expanded is added to "expanded".
+    """
+    if source == target:
+        return []
+
+    # Maps each state reached to the (action, state) step leading
+    # back towards the side's starting state
+    forward = {source: None}
+    backward = {target: None}
+    forward_frontier = [source]
+    backward_frontier = [target]
+    expanded = 0
+
+    meeting = None
+    while forward_frontier and backward_frontier and meeting is None:
+        if len(forward_frontier) <= len(backward_frontier):
+            frontier, visited, other = forward_frontier, forward, backward
+        else:
+            frontier, visited, other = backward_frontier, backward, forward
+
+        next_frontier = []
+        for state in frontier:
+            expanded += 1
+            for action, neighbor in neighbors(state):
+                if neighbor in visited:
+                    continue
+                visited[neighbor] = (action, state)
+                if neighbor in other:
+                    meeting = neighbor
+                    break
+                next_frontier.append(neighbor)
+            if meeting is not None:
+                break
+
+        if frontier is forward_frontier:
+            forward_frontier = next_frontier
+        else:
+            backward_frontier = next_frontier
+
+    if stats is not None:
+        stats["expanded"] = stats.get("expanded", 0) + expanded
+    if meeting is None:
+        return None
+
+    # Walk back to the source, then forward to the target
+    path = []
+    state = meeting
+    while forward[state] is not None:
+        action, parent = forward[state]
+        path.append((action, state))
+        state = parent
+    path.reverse()
+
+    state = meeting
+    while backward[state] is not None:
+        action, child = backward[state]
+        path.append((action, child))
+        state = child
+    return path
@@ -0,0 +1,186 @@
+import argparse
+import csv
+import json
+import multiprocessing
+import os
+import sys
+import time
+from collections import OrderedDict
+
+import heredity
+import inference
+import sampling
+import vectorized
+
+# How each method solves one independent family
+METHODS = {
+    "exact": lambda people: inference.exact_probabilities(people, heredity.PROBS),
+    "pruned": heredity.pruned_probabilities,
+    "enumerate": heredity.enumerate_probabilities,
+    "vectorized": lambda people: vectorized.vectorized_probabilities(people, heredity.PROBS),
+    "gibbs": lambda people: sampling.gibbs(people, heredity.PROBS, processes=1),
+    "likelihood-weighting": lambda people: sampling.likelihood_weighting(
+        people, heredity.PROBS, processes=1),
+}
+
+# Methods whose answer depends only on the family's shape and known
+# traits, so a solved family can be reused; sampling answers are random
+CACHED_METHODS = {"exact", "pruned", "enumerate", "vectorized"}
+
+# Solved families kept by each worker process
+CACHE_SIZE = 4096
+
+# Files sent to a worker at a time
+CHUNK_SIZE = 8
+
+# Solved families of this worker process, by method and family shape
+_cache = OrderedDict()
+
+
+def find_files(source):
+    """
+    Return the family CSV files to process: the .csv files in `source`
+    if it is a directory, or else the files listed one per line in the
+    manifest `source` (relative to the manifest's directory; blank
+    lines and lines starting with # are skipped).
+    """
+    if os.path.isdir(source):
+        return sorted(os.path.join(source, name) for name in os.listdir(source)
+                      if name.endswith(".csv"))
+    directory = os.path.dirname(source)
+    with open(source, encoding="utf-8") as f:
+        lines = [line.strip() for line in f]
+    return [os.path.join(directory, line) for line in lines
+            if line and not line.startswith("#")]
+
+
+def solve_family(people, family, method):
+    """
+    Return the distributions of the people of one independent family,
+    and whether they came from this process's cache: for methods in
+    CACHED_METHODS, they do if a family of the same shape and known
+    traits was solved before.
+    """
+    if method not in CACHED_METHODS:
+        return METHODS[method]({person: people[person] for person in family}), False
+    order, key = heredity.family_key(people, family)
+    key = (method, key)
+    solved = _cache.get(key)
+    hit = solved is not None
+    if hit:
+        _cache.move_to_end(key)
+    else:
+        # Solve it under canonical names, so the result fits any
+        # family with the same key
+        names = {person: f"{i}" for i, person in enumerate(order)}
+        renamed = {
+            names[person]: {
+                "name": names[person],
+                "mother": names.get(people[person]["mother"]),
+                "father": names.get(people[person]["father"]),
+                "trait": people[person]["trait"],
+            }
+            for person in order
+        }
+        probabilities = METHODS[method](renamed)
+        solved = [probabilities[names[person]] for person in order]
+        _cache[key] = solved
+        if len(_cache) > CACHE_SIZE:
+            _cache.popitem(last=False)
+    return dict(zip(order, solved)), hit
+
+
+def solve_file(job):
+    """
+    Return the JSON-serializable result record for one family file.
+    """
+    path, method = job
+    start = time.perf_counter()
+    try:
+        people = heredity.load_data(path)
+        probabilities = {}
+        groups = heredity.families(people)
+        cached = 0
+        for family in groups:
+            solved, hit = solve_family(people, family, method)
+            probabilities.update(solved)
+            cached += hit
+    except (OSError, KeyError, ValueError, csv.Error) as error:
+        return {"file": path, "error": f"{type(error).__name__}: {error}",
+                "seconds": time.perf_counter() - start}
+    return {
+        "file": path,
+        "people": len(people),
+        "families": len(groups),
+        "cached": cached,
+        "seconds": time.perf_counter() - start,
+        "probabilities": {person: probabilities[person] for person in people},
+    }
+
+
+def run(paths, output, method="exact", processes=None, stats=None):
+    """
+    Solve every family file in `paths` with `method` over `processes`
+    worker processes (all cores by default), writing one JSON line per
+    file to the open text file `output` as results come in.
+
+    Each record holds the file name, the number of people and
+    independent families, how many families were answered from the
+    worker's cache, the seconds spent on the file and the
+    probabilities, or an "error" message for files that can't be read.
+
+    If `stats` is a dict, "files", "errors", "families", "cached",
+    "elapsed" and "families_per_second" are stored in it.
+    """
+    if method not in METHODS:
+        raise ValueError(f"unknown method: {method}")
+    begin = time.perf_counter()
+    files = errors = families = cached = 0
+    jobs = [(path, method) for path in paths]
+    methods = multiprocessing.get_all_start_methods()
+    context = multiprocessing.get_context("fork" if "fork" in methods else None)
+    with context.Pool(processes) as pool:
+        for record in pool.imap_unordered(solve_file, jobs, CHUNK_SIZE):
+            output.write(json.dumps(record) + "\n")
+            files += 1
+            if "error" in record:
+                errors += 1
+            else:
+                families += record["families"]
+                cached += record["cached"]
+
+    if stats is not None:
+        elapsed = time.perf_counter() - begin
+        stats["files"] = files
+        stats["errors"] = errors
+        stats["families"] = families
+        stats["cached"] = cached
+        stats["elapsed"] = elapsed
+        stats["families_per_second"] = families / elapsed if elapsed else 0.0
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Gene and trait probabilities of many families")
+    parser.add_argument("source", help="directory of family CSV files, or a manifest "
+                                       "listing one file per line")
+    parser.add_argument("--output", "-o", default="-",
+                        help="JSON lines file to write (default: standard output)")
+    parser.add_argument("--method", choices=list(METHODS), default="exact")
+    parser.add_argument("--processes", type=int,
+                        help="worker processes (default: all cores)")
+    args = parser.parse_args()
+
+    paths = find_files(args.source)
+    stats = {}
+    if args.output == "-":
+        run(paths, sys.stdout, args.method, args.processes, stats)
+    else:
+        with open(args.output, "w", encoding="utf-8") as output:
+            run(paths, output, args.method, args.processes, stats)
+    print(f"{stats['files']} files ({stats['errors']} failed), {stats['families']} families "
+          f"({stats['cached']} cached) in {stats['elapsed']:.2f}s: "
+          f"{stats['families_per_second']:.0f} families/s", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
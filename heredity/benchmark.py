@@ -0,0 +1,340 @@
+import argparse
+import csv
+import os
+import random
+import tempfile
+import time
+
+import numpy as np
+
+import batch
+import heredity
+import inference
+import sampling
+import vectorized
+
+
+def generate_family(num_people, known=0.5, inbreeding=0.0, seed=0):
+    """
+    Return a synthetic pedigree of `num_people` people, in the format
+    `load_data` returns.
+
+    Starting from one couple, a random member of the family marries
+    and has one to three children, until the family is big enough.
+    Spouses are new people without parents in the data, except that a
+    share `inbreeding` of marriages are between two members of the
+    family, which adds loops to the pedigree. Each person's trait is
+    known with probability `known`.
+    """
+    rng = random.Random(seed)
+    people = {}
+
+    def add(mother=None, father=None):
+        name = f"person{len(people)}"
+        trait = rng.random() < 0.1 if rng.random() < known else None
+        people[name] = {"name": name, "mother": mother, "father": father, "trait": trait}
+        return name
+
+    members = [add(), add()]
+    if num_people > 2:
+        members.append(add(*members))
+    while len(people) < num_people:
+        mother = rng.choice(members)
+        # Marry within the family when there is no room left for a
+        # spouse and a child, so nobody is left unrelated
+        if num_people - len(people) < 2 or rng.random() < inbreeding:
+            father = rng.choice([member for member in members if member != mother])
+        else:
+            father = add()
+        for _ in range(min(rng.randint(1, 3), num_people - len(people))):
+            members.append(add(mother, father))
+    return people
+
+
+def generate_families(num_families, family_size, known=0.5, seed=0):
+    """
+    Return `num_families` independent synthetic families of
+    `family_size` people each, in one `load_data` dict. Families are
+    generated from a few seeds, so some have the same shape.
+    """
+    people = {}
+    for k in range(num_families):
+        family = generate_family(family_size, known, seed=seed + k % 3)
+        for name, person in family.items():
+            rename = {p: f"family{k}-{p}" for p in (name, person["mother"], person["father"])
+                      if p is not None}
+            people[rename[name]] = dict(person, name=rename[name],
+                                        mother=rename.get(person["mother"]),
+                                        father=rename.get(person["father"]))
+    return people
+
+
+def counting_calls():
+    """
+    Wrap `heredity.joint_probability` to count its calls. Return a
+    function that returns the count so far.
+    """
+    joint_probability = heredity.joint_probability
+    calls = [0]
+
+    def counted(*args):
+        calls[0] += 1
+        return joint_probability(*args)
+
+    heredity.joint_probability = counted
+    return lambda: calls[0]
+
+
+def bench_pruning(args):
+    """
+    Compare the joint probabilities evaluated and time of plain and
+    pruned enumeration on files of several independent families:
+    `joint_probability` calls for plain enumeration, and the gene
+    assignments pruned enumeration reports evaluating.
+    """
+    calls = counting_calls()
+    for num_families in args.families:
+        people = generate_families(num_families, args.family_size, args.known, args.seed)
+        print(f"{num_families} families of {args.family_size} people")
+        methods = [("pruned", lambda stats: heredity.pruned_probabilities(people, stats=stats))]
+        if len(people) <= args.max_enumerate:
+            methods.insert(0, ("enumerate", lambda stats: heredity.enumerate_probabilities(people)))
+        results = {}
+        for name, method in methods:
+            before = calls()
+            stats = {}
+            start = time.perf_counter()
+            results[name] = method(stats)
+            elapsed = time.perf_counter() - start
+            count = calls() - before + stats.get("calls", 0)
+            print(f"  {name:>9}: {count:>10} joint_probability calls, "
+                  f"{elapsed:9.4f}s")
+        if len(results) == 2:
+            error = max(abs(results["enumerate"][person][field][value] - p)
+                        for person in people
+                        for field, values in results["pruned"][person].items()
+                        for value, p in values.items())
+            print(f"  max difference {error:.2e}")
+
+
+def write_family(path, people):
+    """
+    Write a `load_data` dict as a family CSV file.
+    """
+    with open(path, "w", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(["name", "mother", "father", "trait"])
+        for person in people.values():
+            trait = "" if person["trait"] is None else int(person["trait"])
+            writer.writerow([person["name"], person["mother"] or "", person["father"] or "",
+                             trait])
+
+
+def bench_batch(args):
+    """
+    Time batch processing of a directory of family files, for
+    different numbers of worker processes.
+    """
+    rng = random.Random(args.seed)
+    with tempfile.TemporaryDirectory() as directory:
+        for i in range(args.files):
+            people = generate_families(rng.randint(1, args.max_families),
+                                       rng.randint(3, args.max_family_size),
+                                       args.known, rng.randrange(args.shapes))
+            write_family(os.path.join(directory, f"family{i}.csv"), people)
+        paths = batch.find_files(directory)
+        print(f"{len(paths)} files, method {args.method}")
+
+        for processes in args.processes:
+            stats = {}
+            with open(os.devnull, "w") as output:
+                batch.run(paths, output, args.method, processes, stats)
+            print(f"  {processes} processes: {stats['elapsed']:8.2f}s, "
+                  f"{stats['families']} families ({stats['cached']} cached), "
+                  f"{stats['families_per_second']:8.0f} families/s, "
+                  f"{stats['files'] / stats['elapsed']:8.0f} files/s")
+
+
+def max_difference(expected, probabilities):
+    """
+    Return the largest difference between two sets of distributions.
+    """
+    return max(abs(expected[person][field][value] - p)
+               for person in probabilities
+               for field in probabilities[person]
+               for value, p in probabilities[person][field].items())
+
+
+def bench_exact(args):
+    """
+    Check junction tree inference against enumeration on the bundled
+    families, then compare them on growing pedigrees.
+    """
+    for name in ("family0", "family1", "family2"):
+        people = heredity.load_data(os.path.join("data", f"{name}.csv"))
+        expected = heredity.enumerate_probabilities(people)
+        probabilities = inference.exact_probabilities(people, heredity.PROBS)
+        error = max_difference(expected, probabilities)
+        print(f"{name}: {len(people)} people, max difference {error:.2e}")
+        if error > args.tolerance:
+            raise RuntimeError(f"junction tree and enumeration disagree on {name}")
+
+    for num_people in args.people:
+        people = generate_family(num_people, args.known, args.inbreeding, args.seed)
+        start = time.perf_counter()
+        network = inference.FamilyNetwork(people, heredity.PROBS)
+        tree = inference.JunctionTree(network)
+        compiled = time.perf_counter() - start
+        probabilities = network.probabilities(tree.marginals())
+        elapsed = time.perf_counter() - start
+        print(f"{num_people} people, largest clique {tree.width}")
+        print(f"  {'junction tree':>14}: {elapsed:9.4f}s ({compiled:.4f}s compiling)")
+
+        if num_people <= args.max_enumerate:
+            start = time.perf_counter()
+            expected = heredity.enumerate_probabilities(people)
+            elapsed = time.perf_counter() - start
+            error = max_difference(expected, probabilities)
+            print(f"  {'enumerate':>14}: {elapsed:9.4f}s, max difference {error:.2e}")
+
+
+def bench_joint(args):
+    """
+    Compare joint_probability and update, one assignment at a time,
+    with batched log probabilities and scatter-add updates.
+    """
+    for num_people in args.people:
+        people = generate_family(num_people, args.known, seed=args.seed)
+        evaluator = vectorized.BatchEvaluator(people, heredity.PROBS)
+        total = evaluator.count()
+        print(f"{num_people} people, {total} assignments")
+
+        # Turn a sample of assignments back into sets for the scalar path
+        rng = np.random.default_rng(args.seed)
+        numbers = np.sort(rng.choice(total, min(total, args.sample), replace=False))
+        genes, traits = evaluator.decode(numbers)
+        names = evaluator.names
+        assignments = [
+            ({names[i] for i in np.flatnonzero(row == 1)},
+             {names[i] for i in np.flatnonzero(row == 2)},
+             {names[i] for i in np.flatnonzero(have)})
+            for row, have in zip(genes, traits)
+        ]
+        probabilities = {person: {"gene": {2: 0, 1: 0, 0: 0}, "trait": {True: 0, False: 0}}
+                         for person in people}
+        start = time.perf_counter()
+        expected = []
+        for one_gene, two_genes, have_trait in assignments:
+            p = heredity.joint_probability(people, one_gene, two_genes, have_trait)
+            heredity.update(probabilities, one_gene, two_genes, have_trait, p)
+            expected.append(p)
+        scalar = (time.perf_counter() - start) / len(assignments)
+        print(f"  {'joint_probability':>18}: {1e6 * scalar:9.3f} us per assignment")
+
+        start = time.perf_counter()
+        log_p = evaluator.log_joint(genes, traits)
+        vectorized.update(np.zeros((num_people, 3)), np.zeros((num_people, 2)),
+                          genes, traits, np.exp(log_p))
+        batched = (time.perf_counter() - start) / len(assignments)
+        error = np.abs(np.exp(log_p) - expected).max() / max(expected)
+        print(f"  {'batched':>18}: {1e6 * batched:9.3f} us per assignment "
+              f"({scalar / batched:.0f}x), max relative difference {error:.1e}")
+
+        start = time.perf_counter()
+        evaluator.probabilities()
+        elapsed = time.perf_counter() - start
+        print(f"  {'all, batched':>18}: {elapsed:9.3f}s, {total / elapsed:,.0f} assignments/s")
+
+
+def bench_sampling(args):
+    """
+    Compare likelihood weighting and Gibbs sampling with exact
+    inference, for different numbers of worker processes.
+    """
+    samplers = {"weighting": sampling.likelihood_weighting, "gibbs": sampling.gibbs}
+    for num_people in args.people:
+        people = generate_family(num_people, args.known, args.inbreeding, args.seed)
+        expected = inference.exact_probabilities(people, heredity.PROBS)
+        print(f"{num_people} people")
+        for name, sampler in samplers.items():
+            for processes in args.processes:
+                stats = {}
+                options = {"max_samples": args.max_samples} if name == "weighting" else {}
+                probabilities = sampler(people, heredity.PROBS, args.target_error,
+                                        processes=processes, seed=args.seed, stats=stats,
+                                        **options)
+                error = max(abs(expected[person]["gene"][g] - p)
+                            for person in people
+                            for g, p in probabilities[person]["gene"].items())
+                print(f"  {name:>9}, {processes} processes: {stats['elapsed']:8.2f}s, "
+                      f"{stats['samples']:>8} samples, min ESS {stats['min_ess']:8.0f} "
+                      f"({stats['min_ess'] / stats['elapsed']:.0f}/s), "
+                      f"max error {error:.4f}"
+                      + ("" if stats["converged"] else ", not converged"))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark heredity inference")
+    parser.add_argument("--seed", type=int, default=0)
+    commands = parser.add_subparsers(required=True)
+
+    exact = commands.add_parser("exact", help="enumeration vs junction tree inference")
+    exact.add_argument("--people", type=int, nargs="+", default=[3, 5, 7, 100, 300, 1000])
+    exact.add_argument("--known", type=float, default=0.5,
+                       help="share of people whose trait is known")
+    exact.add_argument("--inbreeding", type=float, default=0.05,
+                       help="share of marriages between members of the family")
+    exact.add_argument("--max-enumerate", type=int, default=7,
+                       help="largest family to also enumerate for comparison")
+    exact.add_argument("--tolerance", type=float, default=1e-9,
+                       help="largest difference allowed on the bundled families")
+    exact.set_defaults(func=bench_exact)
+
+    joint = commands.add_parser("joint", help="scalar vs batched joint probabilities")
+    joint.add_argument("--people", type=int, nargs="+", default=[6, 9, 11])
+    joint.add_argument("--known", type=float, default=0.5,
+                       help="share of people whose trait is known")
+    joint.add_argument("--sample", type=int, default=100000,
+                       help="assignments to time joint_probability on")
+    joint.set_defaults(func=bench_joint)
+
+    sample = commands.add_parser("sampling", help="likelihood weighting and Gibbs sampling")
+    sample.add_argument("--people", type=int, nargs="+", default=[10, 50, 200])
+    sample.add_argument("--known", type=float, default=0.5,
+                        help="share of people whose trait is known")
+    sample.add_argument("--inbreeding", type=float, default=0.05,
+                        help="share of marriages between members of the family")
+    sample.add_argument("--target-error", type=float, default=0.005)
+    sample.add_argument("--max-samples", type=int, default=10 ** 6,
+                        help="likelihood weighting samples to give up after")
+    sample.add_argument("--processes", type=int, nargs="+", default=[1, 4])
+    sample.set_defaults(func=bench_sampling)
+
+    prune = commands.add_parser("pruning", help="plain vs pruned enumeration")
+    prune.add_argument("--families", type=int, nargs="+", default=[1, 2, 3, 100])
+    prune.add_argument("--family-size", type=int, default=3)
+    prune.add_argument("--known", type=float, default=0.5,
+                       help="share of people whose trait is known")
+    prune.add_argument("--max-enumerate", type=int, default=9,
+                       help="largest file to also enumerate without pruning")
+    prune.set_defaults(func=bench_pruning)
+
+    many = commands.add_parser("batch", help="batch processing of family files")
+    many.add_argument("--files", type=int, default=2000)
+    many.add_argument("--max-families", type=int, default=5,
+                      help="most independent families in one file")
+    many.add_argument("--max-family-size", type=int, default=12)
+    many.add_argument("--shapes", type=int, default=50,
+                      help="random seeds the families are generated from")
+    many.add_argument("--known", type=float, default=0.5,
+                      help="share of people whose trait is known")
+    many.add_argument("--method", choices=list(batch.METHODS), default="exact")
+    many.add_argument("--processes", type=int, nargs="+", default=[1, 4])
+    many.set_defaults(func=bench_batch)
+
+    args = parser.parse_args()
+    args.func(args)
+
+
+if __name__ == "__main__":
+    main()
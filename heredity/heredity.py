@@ -1,8 +1,11 @@
+import argparse
 import csv
 import itertools
-import sys
 import os
-os.system('clear')
+
+import inference
+import sampling
+import vectorized
 
 PROBS = {
 
@@ -40,14 +43,59 @@ PROBS = {
 
 
 def main():
+    parser = argparse.ArgumentParser(description="Gene and trait probabilities of a family")
+    parser.add_argument("data", nargs="?", default="data/family0.csv")
+    parser.add_argument("--method", default="enumerate",
+                        choices=("enumerate", "pruned", "vectorized", "exact",
+                                 "likelihood-weighting", "gibbs"),
+                        help="sum the joint probability of every assignment (of each "
+                             "independent family, for pruned), one at a time or in "
+                             "NumPy batches, run exact inference on a junction tree "
+                             "(fast for large families), or sample")
+    parser.add_argument("--target-error", type=float, default=0.005,
+                        help="standard error at which sampling stops")
+    parser.add_argument("--processes", type=int,
+                        help="worker processes for sampling (default: all cores)")
+    args = parser.parse_args()
+    os.system('clear')
+    people = load_data(args.data)
 
-    # Check for proper usage
-    if len(sys.argv) != 2:
-        # sys.exit("Usage: python heredity.py data.csv")
-        people = load_data("data/family0.csv")
+    if args.method == "exact":
+        probabilities = inference.exact_probabilities(people, PROBS)
+    elif args.method == "pruned":
+        probabilities = pruned_probabilities(people)
+    elif args.method == "vectorized":
+        probabilities = vectorized.vectorized_probabilities(people, PROBS)
+    elif args.method in ("likelihood-weighting", "gibbs"):
+        sampler = (sampling.gibbs if args.method == "gibbs" else
+                   sampling.likelihood_weighting)
+        stats = {}
+        probabilities = sampler(people, PROBS, args.target_error,
+                                processes=args.processes, stats=stats)
     else:
-        people = load_data(sys.argv[1])
+        probabilities = enumerate_probabilities(people)
 
+    # Print results
+    for person in people:
+        print(f"{person}:")
+        for field in probabilities[person]:
+            print(f"  {field.capitalize()}:")
+            for value in probabilities[person][field]:
+                p = probabilities[person][field][value]
+                print(f"    {value}: {p:.4f}")
+    if args.method in ("likelihood-weighting", "gibbs"):
+        print(f"{stats['samples']} samples in {stats['elapsed']:.2f}s, "
+              f"standard error {stats['standard_error']:.4f}, "
+              f"effective sample size {stats['min_ess']:.0f}"
+              + ("" if stats["converged"] else " (stopped before the target error)"))
+
+
+def enumerate_probabilities(people):
+    """
+    Return the gene and trait distribution of every person in `people`
+    by summing the joint probability of every assignment of genes and
+    traits that agrees with the known traits.
+    """
     # Keep track of gene and trait probabilities for each person
     probabilities = {
         person: {
@@ -87,15 +135,181 @@ def main():
 
     # Ensure probabilities sum to 1
     normalize(probabilities)
+    return probabilities
+
+
+def pruned_probabilities(people, cache=None, stats=None):
+    """
+    Return the same distributions as `enumerate_probabilities`, with
+    far fewer calls to `joint_probability`:
+
+    * people with no relatives in common form independent families,
+      whose probabilities don't depend on each other, so each family
+      is enumerated on its own;
+    * traits are factored out of the enumeration: known traits are
+      fixed, and an unknown trait is summed out of each gene
+      assignment's joint probability instead of enumerated;
+    * families with the same shape and known traits have the same
+      probabilities, so each shape is enumerated once and its results
+      kept in `cache` (a dict, which may be shared between calls).
+
+    If `stats` is a dict, "families", "cached" and "calls" (joint
+    probabilities of a gene assignment evaluated, the counterpart of
+    `joint_probability` calls) are stored in it.
+    """
+    if cache is None:
+        cache = {}
+    probabilities = {}
+    groups = families(people)
+    cached = 0
+    counts = {"calls": 0}
+    for family in groups:
+        order, key = family_key(people, family)
+        if key in cache:
+            cached += 1
+        else:
+            cache[key] = enumerate_family({person: people[person] for person in order},
+                                          order, stats=counts)
+        for person, distributions in zip(order, cache[key]):
+            probabilities[person] = {
+                field: dict(values) for field, values in distributions.items()
+            }
+
+    if stats is not None:
+        stats["families"] = len(groups)
+        stats["cached"] = cached
+        stats["calls"] = counts["calls"]
+    return {person: probabilities[person] for person in people}
+
+
+def families(people):
+    """
+    Return the independent families in `people`: lists of people who
+    are connected through parents and children.
+    """
+    group = {person: person for person in people}
+
+    def find(person):
+        while group[person] != person:
+            group[person] = group[group[person]]
+            person = group[person]
+        return person
 
-    # Print results
     for person in people:
-        print(f"{person}:")
-        for field in probabilities[person]:
-            print(f"  {field.capitalize()}:")
-            for value in probabilities[person][field]:
-                p = probabilities[person][field][value]
-                print(f"    {value}: {p:.4f}")
+        for parent in (people[person]["mother"], people[person]["father"]):
+            if parent is not None:
+                group[find(person)] = find(parent)
+    members = {}
+    for person in people:
+        members.setdefault(find(person), []).append(person)
+    return list(members.values())
+
+
+def family_key(people, family):
+    """
+    Return the people of `family` in a canonical order, and a key that
+    is the same for every family with the same shape and known traits
+    in that order: for each person, the positions of their parents and
+    their trait.
+    """
+    generation = {}
+
+    def depth(person):
+        if person not in generation:
+            mother = people[person]["mother"]
+            father = people[person]["father"]
+            generation[person] = 0 if mother is None or father is None else \
+                1 + max(depth(mother), depth(father))
+        return generation[person]
+
+    children = {person: 0 for person in family}
+    for person in family:
+        for parent in (people[person]["mother"], people[person]["father"]):
+            if parent is not None:
+                children[parent] += 1
+    order = sorted(family, key=lambda person: (
+        depth(person), str(people[person]["trait"]), children[person]))
+    position = {person: i for i, person in enumerate(order)}
+    key = tuple(
+        (tuple(sorted(position[people[person][parent]] for parent in ("mother", "father")
+                      if people[person][parent] is not None)),
+         people[person]["trait"])
+        for person in order
+    )
+    return order, key
+
+
+def enumerate_family(family, order, stats=None):
+    """
+    Return the gene and trait distributions of each person of one
+    family, in `order`, by enumerating gene assignments only. If
+    `stats` is a dict, the number of assignments evaluated is added
+    to "calls".
+    """
+    totals = {
+        person: {"gene": {2: 0, 1: 0, 0: 0}, "trait": {True: 0, False: 0}}
+        for person in order
+    }
+    calls = 0
+    for assignment in itertools.product((2, 1, 0), repeat=len(order)):
+        genes = dict(zip(order, assignment))
+        p = assignment_probability(family, genes)
+        calls += 1
+        for person in order:
+            num_gene = genes[person]
+            totals[person]["gene"][num_gene] += p
+            trait = family[person]["trait"]
+            if trait is None:
+                # An unknown trait is summed out
+                for trait in (True, False):
+                    totals[person]["trait"][trait] += p * PROBS["trait"][num_gene][trait]
+            else:
+                totals[person]["trait"][trait] += p
+    if stats is not None:
+        stats["calls"] = stats.get("calls", 0) + calls
+    normalize(totals)
+    return [totals[person] for person in order]
+
+
+def assignment_probability(people, genes):
+    """
+    Return the probability that everyone in `people` has the number of
+    copies of the gene given by the dict `genes`, and the traits that
+    are known. Unknown traits contribute no factor.
+    """
+    p = 1
+    for person in people:
+        num_gene = genes[person]
+        mother = people[person]["mother"]
+        father = people[person]["father"]
+        if mother is None or father is None:
+            p *= PROBS["gene"][num_gene]
+        else:
+            mother_probability = inherit_probability(genes[mother])
+            father_probability = inherit_probability(genes[father])
+            if num_gene == 2:
+                p *= mother_probability * father_probability
+            elif num_gene == 1:
+                p *= (mother_probability * (1 - father_probability)
+                      + (1 - mother_probability) * father_probability)
+            else:
+                p *= (1 - mother_probability) * (1 - father_probability)
+        trait = people[person]["trait"]
+        if trait is not None:
+            p *= PROBS["trait"][num_gene][trait]
+    return p
+
+
+def inherit_probability(num_gene):
+    """
+    Return the probability that a parent with `num_gene` copies of the
+    gene passes one on to a child.
+    """
+    if num_gene == 2:
+        return 1 - PROBS["mutation"]
+    if num_gene == 1:
+        return 0.5 * (1 - PROBS["mutation"]) + 0.5 * PROBS["mutation"]
+    return PROBS["mutation"]
 
 
 def load_data(filename):
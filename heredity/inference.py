@@ -0,0 +1,280 @@
+import heapq
+
+import numpy as np
+
+# Gene counts, in the order used by every table in this module
+GENES = (0, 1, 2)
+
+# Largest clique JunctionTree accepts: a table over 14 people already
+# has 3^14 (4.8 million) entries
+MAX_WIDTH = 14
+
+
+class Factor():
+    """
+    A table of non-negative values over some gene variables: `table`
+    has one axis of length 3 (0, 1 or 2 copies) per variable in
+    `variables`, which are person indices.
+    """
+
+    def __init__(self, variables, table):
+        self.variables = tuple(variables)
+        self.table = np.asarray(table, dtype=float)
+
+    def __repr__(self):
+        return f"Factor({self.variables})"
+
+
+def product(factors, keep):
+    """
+    Multiply `factors` together and sum out every variable not in
+    `keep`. Return the result as a Factor over `keep`, scaled to sum to
+    1 so long chains of messages can't underflow.
+    """
+    keep = tuple(keep)
+    labels = {}
+    operands = []
+    for factor in factors:
+        operands.append(factor.table)
+        operands.append([labels.setdefault(v, len(labels)) for v in factor.variables])
+    for v in keep:
+        # A variable no factor mentions is uniform
+        if v not in labels:
+            operands.append(np.ones(3))
+            operands.append([labels.setdefault(v, len(labels))])
+    if len(labels) > 52:
+        raise ValueError("clique too large for einsum")
+    table = np.einsum(*operands, [labels[v] for v in keep])
+    total = table.sum()
+    if total > 0:
+        table = table / total
+    return Factor(keep, table)
+
+
+def inheritance_table(probs):
+    """
+    Return P(child genes | mother genes, father genes) as a 3x3x3 array
+    indexed by [mother, father, child].
+    """
+    mutation = probs["mutation"]
+    # Probability that a parent with 0, 1 or 2 copies passes the gene on
+    passes = np.array([mutation, 0.5, 1 - mutation])
+    mother = passes[:, None]
+    father = passes[None, :]
+    table = np.empty((3, 3, 3))
+    table[:, :, 0] = (1 - mother) * (1 - father)
+    table[:, :, 1] = mother * (1 - father) + (1 - mother) * father
+    table[:, :, 2] = mother * father
+    return table
+
+
+def trait_table(probs):
+    """
+    Return P(trait | genes) as a 3x2 array indexed by [genes, trait].
+    """
+    return np.array([[probs["trait"][g][False], probs["trait"][g][True]] for g in GENES])
+
+
+class FamilyNetwork():
+    """
+    A family from `load_data` compiled into a Bayesian network.
+
+    Every person has a gene variable with either the unconditional
+    gene distribution (people without parents in the data) or an
+    inheritance factor over their parents' genes. Traits only depend
+    on the person's own genes, so a known trait becomes a one-variable
+    evidence factor on the genes, and an unknown trait is summed out
+    after inference.
+    """
+
+    def __init__(self, people, probs):
+        self.names = list(people)
+        self.index = {name: i for i, name in enumerate(self.names)}
+        self.traits = trait_table(probs)
+        self.evidence = [people[name]["trait"] for name in self.names]
+        self.parents = []
+        self.factors = []
+
+        prior = np.array([probs["gene"][g] for g in GENES])
+        inheritance = inheritance_table(probs)
+        for i, name in enumerate(self.names):
+            mother = people[name]["mother"]
+            father = people[name]["father"]
+            if mother is None or father is None:
+                self.parents.append(None)
+                self.factors.append(Factor((i,), prior))
+            else:
+                parents = (self.index[mother], self.index[father])
+                self.parents.append(parents)
+                self.factors.append(Factor(parents + (i,), inheritance))
+            if self.evidence[i] is not None:
+                self.factors.append(Factor((i,), self.traits[:, int(self.evidence[i])]))
+
+    def __len__(self):
+        return len(self.names)
+
+    def moral_graph(self):
+        """
+        Return the neighbours of each variable in the moral graph:
+        every factor's variables are linked to each other (a child to
+        both parents, and the parents to each other).
+        """
+        neighbours = [set() for _ in self.names]
+        for factor in self.factors:
+            for v in factor.variables:
+                neighbours[v].update(factor.variables)
+                neighbours[v].discard(v)
+        return neighbours
+
+    def probabilities(self, genes):
+        """
+        Return per-person gene marginals `genes` (an n x 3 array) as a
+        dict in the same shape as `heredity.main`'s `probabilities`,
+        with trait probabilities filled in from the genes (or from the
+        evidence, for known traits).
+        """
+        have_trait = genes @ self.traits[:, 1]
+        probabilities = {}
+        for i, name in enumerate(self.names):
+            if self.evidence[i] is not None:
+                trait = float(self.evidence[i])
+            else:
+                trait = float(have_trait[i])
+            probabilities[name] = {
+                "gene": {g: float(genes[i, g]) for g in reversed(GENES)},
+                "trait": {True: trait, False: 1 - trait},
+            }
+        return probabilities
+
+
+def elimination_order(neighbours):
+    """
+    Return a greedy min-fill elimination order for a graph given as a
+    list of neighbour sets, and the clique (variable plus neighbours)
+    formed when each variable is eliminated.
+
+    Eliminating a variable connects all of its remaining neighbours,
+    so the variable whose neighbours are closest to a clique already
+    goes first. Pedigrees without marriages between relatives are
+    close to trees, so cliques stay at three or four variables.
+    """
+    neighbours = [set(n) for n in neighbours]
+
+    def fill(v):
+        nbrs = list(neighbours[v])
+        return sum(1 for i, a in enumerate(nbrs) for b in nbrs[i + 1:]
+                   if b not in neighbours[a])
+
+    version = [0] * len(neighbours)
+    heap = [(fill(v), len(neighbours[v]), v, 0) for v in range(len(neighbours))]
+    heapq.heapify(heap)
+    eliminated = [False] * len(neighbours)
+    order = []
+    cliques = []
+    while heap:
+        _, _, v, seen = heapq.heappop(heap)
+        if eliminated[v] or seen != version[v]:
+            continue
+        eliminated[v] = True
+        nbrs = neighbours[v]
+        order.append(v)
+        cliques.append(frozenset(nbrs | {v}))
+
+        for u in nbrs:
+            neighbours[u].discard(v)
+            neighbours[u].update(nbrs - {u})
+        # Only v's neighbours and theirs can have changed fill
+        affected = set(nbrs)
+        for u in nbrs:
+            affected.update(neighbours[u])
+        for u in affected:
+            version[u] += 1
+            heapq.heappush(heap, (fill(u), len(neighbours[u]), u, version[u]))
+    return order, cliques
+
+
+class JunctionTree():
+    """
+    Exact inference on a FamilyNetwork by message passing over the
+    clique tree of a variable elimination order.
+
+    Each variable v gets the clique formed when it is eliminated, and
+    the tree links that clique to the clique of the first of its
+    neighbours eliminated after it (a root, if none). Every factor is
+    placed in the clique of its earliest eliminated variable. A collect
+    pass from the leaves up is plain variable elimination; a second
+    distribute pass down the tree then gives every clique the messages
+    from the rest of the network, so all marginals cost about twice one
+    elimination run.
+
+    The cost grows as 3 to the power of the largest clique, which stays
+    small unless many marriages are between relatives; ValueError is
+    raised for cliques of more than MAX_WIDTH people.
+    """
+
+    def __init__(self, network):
+        self.network = network
+        n = len(network)
+        order, cliques = elimination_order(network.moral_graph())
+        self.order = order
+        position = [0] * n
+        for i, v in enumerate(order):
+            position[v] = i
+
+        self.separator = [None] * n
+        self.parent = [None] * n
+        self.children = [[] for _ in range(n)]
+        for v, clique in zip(order, cliques):
+            self.separator[v] = tuple(sorted(clique - {v}))
+            if self.separator[v]:
+                parent = min(self.separator[v], key=position.__getitem__)
+                self.parent[v] = parent
+                self.children[parent].append(v)
+
+        self.assigned = [[] for _ in range(n)]
+        for factor in network.factors:
+            self.assigned[min(factor.variables, key=position.__getitem__)].append(factor)
+        self.width = max((len(clique) for clique in cliques), default=0)
+        if self.width > MAX_WIDTH:
+            raise ValueError(f"pedigree too entangled for exact inference "
+                             f"(clique of {self.width} people)")
+
+    def marginals(self):
+        """
+        Return P(genes | evidence) for every person as an n x 3 array,
+        rows in the order of the network's names.
+        """
+        n = len(self.network)
+        up = [None] * n
+        for v in self.order:
+            if self.parent[v] is not None:
+                incoming = self.assigned[v] + [up[c] for c in self.children[v]]
+                up[v] = product(incoming, self.separator[v])
+
+        down = [None] * n
+        for v in reversed(self.order):
+            parent = self.parent[v]
+            if parent is None:
+                continue
+            incoming = self.assigned[parent] + [up[c] for c in self.children[parent] if c != v]
+            if down[parent] is not None:
+                incoming.append(down[parent])
+            down[v] = product(incoming, self.separator[v])
+
+        genes = np.empty((n, 3))
+        for v in range(n):
+            incoming = self.assigned[v] + [up[c] for c in self.children[v]]
+            if down[v] is not None:
+                incoming.append(down[v])
+            genes[v] = product(incoming, (v,)).table
+        return genes
+
+
+def exact_probabilities(people, probs):
+    """
+    Return the exact gene and trait distribution of every person in
+    `people`, given the known traits, in the same shape as the
+    `probabilities` dict computed by `heredity.main`.
+    """
+    network = FamilyNetwork(people, probs)
+    return network.probabilities(JunctionTree(network).marginals())
@@ -0,0 +1,313 @@
+import multiprocessing
+import time
+
+import numpy as np
+
+import inference
+
+# Likelihood weighting samples drawn per job
+BATCH_SAMPLES = 20000
+
+# Gibbs sweeps run by every chain per job, and before any are counted
+ROUND_SWEEPS = 50
+BURN_IN = 100
+
+
+class PedigreeModel():
+    """
+    A family from `load_data` compiled for sampling: people in an order
+    where parents come before their children, the gene tables, and the
+    likelihood of each person's known trait (1 if unknown) given their
+    genes.
+    """
+
+    def __init__(self, people, probs):
+        self.network = inference.FamilyNetwork(people, probs)
+        n = len(self.network)
+        self.prior = np.array([probs["gene"][g] for g in inference.GENES])
+        self.inheritance = inference.inheritance_table(probs)
+        self.likelihood = np.ones((n, 3))
+        for i, trait in enumerate(self.network.evidence):
+            if trait is not None:
+                self.likelihood[i] = self.network.traits[:, int(trait)]
+
+        # Each person's children, with the child's other parent
+        self.children = [[] for _ in range(n)]
+        for child, parents in enumerate(self.network.parents):
+            if parents is not None:
+                mother, father = parents
+                self.children[mother].append((child, father, True))
+                self.children[father].append((child, mother, False))
+
+        # Place people after their parents, walking up from each person
+        self.order = []
+        placed = [False] * n
+        for person in range(n):
+            stack = [person]
+            while stack:
+                i = stack[-1]
+                waiting = [p for p in self.network.parents[i] or () if not placed[p]]
+                if waiting:
+                    stack.extend(waiting)
+                    continue
+                stack.pop()
+                if not placed[i]:
+                    placed[i] = True
+                    self.order.append(i)
+
+    def __len__(self):
+        return len(self.network)
+
+    def forward(self, rng, samples):
+        """
+        Draw genes for `samples` families from the model, ignoring the
+        known traits. Return the (samples x n) gene matrix and the log
+        likelihood of the known traits for each sample.
+        """
+        genes = np.empty((samples, len(self)), dtype=np.intp)
+        log_weights = np.zeros(samples)
+        for i in self.order:
+            parents = self.network.parents[i]
+            if parents is None:
+                p = np.broadcast_to(self.prior, (samples, 3))
+            else:
+                p = self.inheritance[genes[:, parents[0]], genes[:, parents[1]]]
+            genes[:, i] = draw(rng, p)
+            log_weights += np.log(self.likelihood[i, genes[:, i]])
+        return genes, log_weights
+
+    def conditional(self, genes, i):
+        """
+        Return P(genes of person i | everyone else's genes, known
+        traits) for every row of `genes`, as a (rows x 3) array.
+        """
+        parents = self.network.parents[i]
+        if parents is None:
+            p = np.broadcast_to(self.prior, (len(genes), 3))
+        else:
+            p = self.inheritance[genes[:, parents[0]], genes[:, parents[1]]]
+        p = p * self.likelihood[i]
+        for child, other, is_mother in self.children[i]:
+            if is_mother:
+                p = p * self.inheritance[:, genes[:, other], genes[:, child]].T
+            else:
+                p = p * self.inheritance[genes[:, other], :, genes[:, child]]
+        return p / p.sum(axis=1, keepdims=True)
+
+
+def draw(rng, p):
+    """
+    Return one index drawn from each row of probabilities `p`.
+    """
+    cumulative = np.cumsum(p, axis=1)
+    u = rng.random(len(p)) * cumulative[:, -1]
+    return (u[:, None] > cumulative[:, :-1]).sum(axis=1)
+
+
+# Model shared with worker processes, set before they are forked
+_model = None
+
+
+def _init_worker(model):
+    global _model
+    _model = model
+
+
+def _weighting_job(job):
+    seed, samples = job
+    genes, log_weights = _model.forward(np.random.default_rng(seed), samples)
+    shift = log_weights.max()
+    w = np.exp(log_weights - shift)
+    n = len(_model)
+    # Scatter w and w^2 into per-person gene totals
+    cells = (3 * np.arange(n) + genes).ravel()
+    weights = np.repeat(w, n)
+    return (shift, w.sum(), (w ** 2).sum(),
+            np.bincount(cells, weights, minlength=3 * n).reshape(n, 3),
+            np.bincount(cells, weights ** 2, minlength=3 * n).reshape(n, 3))
+
+
+def _gibbs_job(job):
+    seed, genes, sweeps, burn_in = job
+    rng = np.random.default_rng(seed)
+    genes = genes.copy()
+    totals = np.zeros(genes.shape + (3,))
+    for sweep in range(burn_in + sweeps):
+        for i in range(len(_model)):
+            p = _model.conditional(genes, i)
+            genes[:, i] = draw(rng, p)
+            if sweep >= burn_in:
+                # Rao-Blackwellized: count the conditional, not the draw
+                totals[:, i] += p
+    return genes, totals
+
+
+class Workers():
+    """
+    Run sampling jobs on `model` in `processes` forked worker processes
+    (all cores by default), or in this process if `processes` is 1.
+
+    Use as a context manager, or call `close()` to stop the workers.
+    """
+
+    def __init__(self, model, processes=None):
+        self.processes = processes or multiprocessing.cpu_count()
+        if self.processes == 1:
+            self.pool = None
+            _init_worker(model)
+        else:
+            methods = multiprocessing.get_all_start_methods()
+            context = multiprocessing.get_context("fork" if "fork" in methods else None)
+            self.pool = context.Pool(self.processes, initializer=_init_worker,
+                                     initargs=(model,))
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        if self.pool is not None:
+            self.pool.close()
+            self.pool.join()
+
+    def map(self, function, jobs):
+        if self.pool is None:
+            return list(map(function, jobs))
+        return self.pool.map(function, jobs)
+
+
+def effective_sample_size(genes, error):
+    """
+    Return, for each person, the effective sample size of their gene
+    marginals `genes` estimated with standard errors `error`: the number
+    of independent draws that would give the same error, from the
+    binomial variance p (1 - p). The least certain gene count counts.
+    """
+    with np.errstate(divide="ignore", invalid="ignore"):
+        ess = genes * (1 - genes) / error ** 2
+    ess[~np.isfinite(ess)] = np.inf
+    return ess.min(axis=1)
+
+
+def _finish(model, genes, error, samples, converged, rounds, begin, stats):
+    if stats is not None:
+        ess = effective_sample_size(genes, error)
+        stats["samples"] = samples
+        stats["rounds"] = rounds
+        stats["standard_error"] = float(error.max())
+        stats["converged"] = converged
+        stats["ess"] = dict(zip(model.network.names, ess.tolist()))
+        stats["min_ess"] = float(ess.min()) if len(ess) else 0.0
+        stats["elapsed"] = time.perf_counter() - begin
+    return model.network.probabilities(genes)
+
+
+def likelihood_weighting(people, probs, target_error=0.005, max_samples=10 ** 6,
+                         processes=None, seed=None, stats=None):
+    """
+    Estimate the gene and trait distribution of every person in
+    `people` by likelihood weighting, in the same shape as the
+    `probabilities` dict computed by `heredity.main`.
+
+    Genes are drawn forward from parents to children, and each sample
+    is weighted by the likelihood of the known traits. Unknown traits
+    don't change the weights, so they are summed out exactly from the
+    gene marginals rather than sampled. Samples are drawn in rounds of
+    BATCH_SAMPLES per worker process until the standard error of every
+    gene marginal is below `target_error`, or `max_samples` are drawn.
+
+    If `stats` is a dict, "samples", "rounds", "standard_error" (the
+    largest), "converged", "ess" (effective sample size per person),
+    "min_ess" and "elapsed" are stored in it.
+    """
+    begin = time.perf_counter()
+    model = PedigreeModel(people, probs)
+    n = len(model)
+    seeds = np.random.SeedSequence(seed)
+
+    # Running sums of w, w^2 and their per-gene totals, scaled by
+    # exp(-shift) (squares by exp(-2 shift)) so weights can't underflow
+    shift = -np.inf
+    w = w2 = 0.0
+    wx = np.zeros((n, 3))
+    w2x = np.zeros((n, 3))
+    samples = rounds = 0
+    converged = False
+    with Workers(model, processes) as workers:
+        while samples < max_samples:
+            size = min(BATCH_SAMPLES, -(-(max_samples - samples) // workers.processes))
+            jobs = [(s, size) for s in seeds.spawn(workers.processes)]
+            for batch_shift, batch_w, batch_w2, batch_wx, batch_w2x in workers.map(
+                    _weighting_job, jobs):
+                top = max(shift, batch_shift)
+                old = np.exp(shift - top) if np.isfinite(shift) else 0.0
+                new = np.exp(batch_shift - top)
+                w = w * old + batch_w * new
+                w2 = w2 * old ** 2 + batch_w2 * new ** 2
+                wx = wx * old + batch_wx * new
+                w2x = w2x * old ** 2 + batch_w2x * new ** 2
+                shift = top
+                samples += size
+            rounds += 1
+
+            genes = wx / w
+            # Delta-method variance of a ratio estimator, for 0/1 indicators
+            variance = (w2x * (1 - 2 * genes) + genes ** 2 * w2) / w ** 2
+            error = np.sqrt(np.maximum(variance, 0))
+            if error.max() < target_error:
+                converged = True
+                break
+    return _finish(model, genes, error, samples, converged, rounds, begin, stats)
+
+
+def gibbs(people, probs, target_error=0.005, chains=256, max_sweeps=10000,
+          processes=None, seed=None, stats=None):
+    """
+    Estimate the gene and trait distribution of every person in
+    `people` by Gibbs sampling, in the same shape as the `probabilities`
+    dict computed by `heredity.main`.
+
+    `chains` chains start from forward samples and are split between
+    the worker processes. Each sweep redraws every person's genes from
+    their conditional given their parents, children, spouses and known
+    trait, and the conditionals (not the draws) are averaged. After
+    BURN_IN sweeps, chains run ROUND_SWEEPS sweeps per round until the
+    standard error of every gene marginal, from the spread between the
+    independent chains' averages, is below `target_error`, or each chain
+    has run `max_sweeps` counted sweeps.
+
+    `stats` is filled in like for `likelihood_weighting`, counting
+    chains times sweeps as samples.
+    """
+    if chains < 2:
+        raise ValueError("need at least 2 chains to estimate the standard error")
+    begin = time.perf_counter()
+    model = PedigreeModel(people, probs)
+    n = len(model)
+    seeds = np.random.SeedSequence(seed)
+    state, _ = model.forward(np.random.default_rng(seeds.spawn(1)[0]), chains)
+    totals = np.zeros((chains, n, 3))
+    sweeps = rounds = 0
+    converged = False
+    with Workers(model, processes) as workers:
+        parts = np.array_split(np.arange(chains), min(chains, workers.processes))
+        while sweeps < max_sweeps:
+            size = min(ROUND_SWEEPS, max_sweeps - sweeps)
+            burn_in = BURN_IN if rounds == 0 else 0
+            jobs = [(s, state[part], size, burn_in)
+                    for s, part in zip(seeds.spawn(len(parts)), parts)]
+            for part, (genes, part_totals) in zip(parts, workers.map(_gibbs_job, jobs)):
+                state[part] = genes
+                totals[part] += part_totals
+            sweeps += size
+            rounds += 1
+
+            means = totals / sweeps
+            genes = means.mean(axis=0)
+            error = means.std(axis=0, ddof=1) / np.sqrt(chains)
+            if error.max() < target_error:
+                converged = True
+                break
+    return _finish(model, genes, error, chains * sweeps, converged, rounds, begin, stats)
@@ -0,0 +1,180 @@
+import numpy as np
+
+import inference
+
+# Assignments evaluated at once by BatchEvaluator.probabilities
+CHUNK_SIZE = 1 << 18
+
+
+class BatchEvaluator():
+    """
+    Joint probabilities of many assignments of genes and traits to one
+    family at a time.
+
+    An assignment is a row of two matrices with one column per person
+    (in `names` order): `genes`, the number of copies of the gene (0, 1
+    or 2), and `traits`, whether the person has the trait. Every term
+    of `heredity.joint_probability` is then a lookup into a table of
+    log probabilities by fancy indexing, over all rows at once.
+    """
+
+    def __init__(self, people, probs):
+        self.names = list(people)
+        index = {name: i for i, name in enumerate(self.names)}
+        self.evidence = [people[name]["trait"] for name in self.names]
+        self.unknown = np.array([i for i, trait in enumerate(self.evidence) if trait is None],
+                                dtype=np.intp)
+
+        founders = []
+        children = []
+        for i, name in enumerate(self.names):
+            mother = people[name]["mother"]
+            father = people[name]["father"]
+            if mother is None or father is None:
+                founders.append(i)
+            else:
+                children.append((i, index[mother], index[father]))
+        self.founders = np.array(founders, dtype=np.intp)
+        self.children, self.mothers, self.fathers = np.array(
+            children, dtype=np.intp).reshape(-1, 3).T
+
+        with np.errstate(divide="ignore"):
+            self.log_prior = np.log([probs["gene"][g] for g in inference.GENES])
+            self.log_inheritance = np.log(inference.inheritance_table(probs))
+            self.log_trait = np.log(inference.trait_table(probs))
+
+    def __len__(self):
+        return len(self.names)
+
+    def encode(self, assignments):
+        """
+        Return the (genes, traits) matrices of a list of
+        (one_gene, two_genes, have_trait) sets of names.
+        """
+        genes = np.zeros((len(assignments), len(self.names)), dtype=np.int8)
+        traits = np.zeros((len(assignments), len(self.names)), dtype=bool)
+        for row, (one_gene, two_genes, have_trait) in enumerate(assignments):
+            for i, name in enumerate(self.names):
+                genes[row, i] = 2 if name in two_genes else 1 if name in one_gene else 0
+                traits[row, i] = name in have_trait
+        return genes, traits
+
+    def log_joint(self, genes, traits):
+        """
+        Return the log joint probability of every assignment, the rows
+        of `genes` and `traits`.
+        """
+        genes = np.asarray(genes, dtype=np.intp)
+        traits = np.asarray(traits, dtype=np.intp)
+        log_p = self.log_prior[genes[:, self.founders]].sum(axis=1)
+        log_p += self.log_inheritance[genes[:, self.mothers], genes[:, self.fathers],
+                                      genes[:, self.children]].sum(axis=1)
+        log_p += self.log_trait[genes, traits].sum(axis=1)
+        return log_p
+
+    def joint(self, assignments):
+        """
+        Return `heredity.joint_probability` of each (one_gene,
+        two_genes, have_trait) assignment in `assignments`, as an array.
+        """
+        return np.exp(self.log_joint(*self.encode(assignments)))
+
+    def count(self):
+        """
+        Return the number of assignments that agree with the known
+        traits.
+        """
+        return 3 ** len(self.names) * 2 ** len(self.unknown)
+
+    def assignments(self, start, stop):
+        """
+        Return the (genes, traits) matrices of assignments `start` to
+        `stop` of the `count()` assignments that agree with the known
+        traits.
+        """
+        return self.decode(np.arange(start, stop, dtype=np.int64))
+
+    def decode(self, numbers):
+        """
+        Return the (genes, traits) matrices of the assignments numbered
+        `numbers`, read as the unknown traits in base 2 followed by
+        every person's genes in base 3.
+        """
+        numbers = np.asarray(numbers, dtype=np.int64)
+        n = len(self.names)
+        traits = np.empty((len(numbers), n), dtype=bool)
+        for i, trait in enumerate(self.evidence):
+            if trait is not None:
+                traits[:, i] = trait
+        bits = len(self.unknown)
+        traits[:, self.unknown] = (numbers[:, None] >> np.arange(bits)) & 1
+        numbers = numbers >> bits
+        genes = (numbers[:, None] // 3 ** np.arange(n, dtype=np.int64)) % 3
+        return genes.astype(np.int8), traits
+
+    def probabilities(self, chunk_size=CHUNK_SIZE):
+        """
+        Return the gene and trait distribution of every person, like
+        `heredity.enumerate_probabilities`, evaluating `chunk_size`
+        assignments per batch.
+        """
+        n = len(self.names)
+        genes_total = np.zeros((n, 3))
+        traits_total = np.zeros((n, 2))
+        # Weights are exp(log_p - shift); when a chunk raises the
+        # largest log probability seen, the totals so far are rescaled
+        shift = -np.inf
+        total = self.count()
+        for start in range(0, total, chunk_size):
+            genes, traits = self.assignments(start, min(start + chunk_size, total))
+            log_p = self.log_joint(genes, traits)
+            top = log_p.max()
+            if top > shift:
+                if np.isfinite(shift):
+                    scale = np.exp(shift - top)
+                    genes_total *= scale
+                    traits_total *= scale
+                shift = top
+            update(genes_total, traits_total, genes, traits, np.exp(log_p - shift))
+        return to_probabilities(self.names, genes_total, traits_total)
+
+
+def update(genes_total, traits_total, genes, traits, p):
+    """
+    Add the joint probability `p[k]` of each assignment (row k of
+    `genes` and `traits`) to each person's totals for the gene count
+    and trait value it assigns them: `genes_total` (n x 3) and
+    `traits_total` (n x 2), scattered with one bincount each.
+    """
+    n = genes_total.shape[0]
+    weights = np.broadcast_to(p[:, None], genes.shape).ravel()
+    people = 3 * np.arange(n)
+    genes_total += np.bincount((people + genes).ravel(), weights,
+                               minlength=3 * n).reshape(n, 3)
+    people = 2 * np.arange(n)
+    traits_total += np.bincount((people + traits).ravel(), weights,
+                                minlength=2 * n).reshape(n, 2)
+
+
+def to_probabilities(names, genes_total, traits_total):
+    """
+    Return gene and trait totals as a normalized dict in the same shape
+    as `heredity.main`'s `probabilities`.
+    """
+    genes = genes_total / genes_total.sum(axis=1, keepdims=True)
+    traits = traits_total / traits_total.sum(axis=1, keepdims=True)
+    return {
+        name: {
+            "gene": {g: float(genes[i, g]) for g in reversed(inference.GENES)},
+            "trait": {True: float(traits[i, 1]), False: float(traits[i, 0])},
+        }
+        for i, name in enumerate(names)
+    }
+
+
+def vectorized_probabilities(people, probs, chunk_size=CHUNK_SIZE):
+    """
+    Return the gene and trait distribution of every person in `people`
+    by batched enumeration of every assignment.
+    """
+    return BatchEvaluator(people, probs).probabilities(chunk_size)
@@ -0,0 +1,595 @@
+import argparse
+import heapq
+import html.parser
+import itertools
+import os
+import re
+import resource
+import tempfile
+import time
+
+import numpy as np
+
+import crawler
+import incremental
+import pagerank
+import outofcore
+import personalized
+import results
+import sampler
+import solvers
+import sparse
+
+
+def generate_edges(num_pages, mean_links=8, seed=0):
+    """
+    Return (sources, targets) arrays for a synthetic web graph.
+
+    Out-degrees are geometric around `mean_links` (so some pages have
+    no links at all) and link targets follow a Zipf-like popularity
+    curve, as on the real web.
+    """
+    rng = np.random.default_rng(seed)
+    degree = rng.geometric(1 / (mean_links + 1), size=num_pages) - 1
+    sources = np.repeat(np.arange(num_pages), degree)
+    targets = (num_pages * rng.random(len(sources)) ** 3).astype(np.int64)
+    keep = sources != targets
+    edges = np.unique(np.stack([sources[keep], targets[keep]]), axis=1)
+    return edges[0], edges[1]
+
+
+def generate_corpus(num_pages, mean_links=8, seed=0):
+    """
+    Return a synthetic corpus dict, in the format `crawl()` returns.
+    """
+    sources, targets = generate_edges(num_pages, mean_links, seed)
+    corpus = {f"{i}.html": set() for i in range(num_pages)}
+    for source, target in zip(sources.tolist(), targets.tolist()):
+        corpus[f"{source}.html"].add(f"{target}.html")
+    return corpus
+
+
+def bench_iterate(args):
+    """
+    Compare iterate_pagerank with the sparse power-iteration engine.
+    """
+    for num_pages in args.pages:
+        sources, targets = generate_edges(num_pages, seed=args.seed)
+        print(f"{num_pages} pages, {len(sources)} links")
+
+        start = time.perf_counter()
+        transition = sparse.TransitionMatrix([f"{i}.html" for i in range(num_pages)],
+                                             sources, targets)
+        built = time.perf_counter() - start
+        ranks, iterations = sparse.power_iteration(transition, pagerank.DAMPING)
+        elapsed = time.perf_counter() - start
+        print(f"  {'sparse':>16}: {elapsed:9.3f}s ({built:.3f}s building), "
+              f"{iterations} iterations")
+
+        if num_pages <= args.max_dense:
+            corpus = generate_corpus(num_pages, seed=args.seed)
+            start = time.perf_counter()
+            expected = pagerank.iterate_pagerank(corpus, pagerank.DAMPING)
+            elapsed = time.perf_counter() - start
+            error = max(abs(expected[page] - rank)
+                        for page, rank in transition.to_dict(ranks).items())
+            print(f"  {'iterate_pagerank':>16}: {elapsed:9.3f}s, "
+                  f"max difference {error:.2e}")
+
+
+def bench_sample(args):
+    """
+    Compare sample_pagerank with the batched surfer sampler, and
+    report the sampler's error against the iterative result.
+    """
+    for num_pages in args.pages:
+        sources, targets = generate_edges(num_pages, seed=args.seed)
+        transition = sparse.TransitionMatrix([f"{i}.html" for i in range(num_pages)],
+                                             sources, targets)
+        links = sampler.OutLinks(transition)
+        reference, _ = sparse.power_iteration(transition, pagerank.DAMPING, threshold=1e-12)
+        print(f"{num_pages} pages, {len(sources)} links, {args.samples} samples")
+
+        for processes in args.processes:
+            start = time.perf_counter()
+            ranks = sampler.batched_sample(links, pagerank.DAMPING, args.samples,
+                                           surfers=args.surfers, processes=processes,
+                                           seed=args.seed)
+            elapsed = time.perf_counter() - start
+            error = sampler.convergence_error(transition, ranks, pagerank.DAMPING, reference)
+            print(f"  {f'batched x{processes}':>16}: {elapsed:9.3f}s  "
+                  f"L1 error {error['l1']:.4f}  max error {error['max']:.2e}")
+
+        if num_pages <= args.max_dense:
+            corpus = generate_corpus(num_pages, seed=args.seed)
+            start = time.perf_counter()
+            ranks = pagerank.sample_pagerank(corpus, pagerank.DAMPING, args.samples)
+            elapsed = time.perf_counter() - start
+            ranks = np.array([ranks[page] for page in transition.pages])
+            error = sampler.convergence_error(transition, ranks, pagerank.DAMPING, reference)
+            print(f"  {'sample_pagerank':>16}: {elapsed:9.3f}s  "
+                  f"L1 error {error['l1']:.4f}  max error {error['max']:.2e}")
+
+
+def write_corpus(directory, num_pages, mean_links=8, per_directory=0, seed=0):
+    """
+    Write a synthetic corpus of HTML pages into `directory`.
+
+    With `per_directory`, pages are spread over subdirectories of that
+    many pages each and link to each other by relative path.
+    Return the list of page paths written.
+    """
+    sources, targets = generate_edges(num_pages, mean_links, seed)
+    names = [f"{i}.html" if not per_directory else f"d{i // per_directory}/{i}.html"
+             for i in range(num_pages)]
+    links = [[] for _ in range(num_pages)]
+    for source, target in zip(sources.tolist(), targets.tolist()):
+        links[source].append(target)
+
+    paths = []
+    for i, name in enumerate(names):
+        path = os.path.join(directory, *name.split("/"))
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        depth = "../" if per_directory else ""
+        items = "".join(f'<li><a href="{depth}{names[j]}">{j}</a></li>' for j in links[i])
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(f"<!DOCTYPE html><html><head><title>{i}</title></head>"
+                    f"<body><h1>{i}</h1><ul>{items}</ul></body></html>")
+        paths.append(path)
+    return paths
+
+
+# The link pattern pagerank.crawl used before crawler.scan_links
+REGEX_LINK = re.compile(r"<a\s+(?:[^>]*?)href=\"([^\"]*)\"")
+
+
+class AnchorParser(html.parser.HTMLParser):
+    """
+    Collect href values with the standard library's HTML parser.
+    """
+
+    def __init__(self):
+        super().__init__(convert_charrefs=False)
+        self.links = set()
+
+    def handle_starttag(self, tag, attrs):
+        if tag == "a":
+            self.links.update(value for name, value in attrs if name == "href" and value)
+
+
+def generate_html(size, anchor_share=0.2, indent=0, seed=0):
+    """
+    Return about `size` bytes of HTML, where `anchor_share` of the
+    elements are anchors with double-quoted hrefs, like the corpora.
+
+    With `indent`, tags are pretty-printed with one attribute per line
+    indented by that many spaces, as template engines emit them, and
+    half of the anchors are named anchors without an href.
+    """
+    rng = np.random.default_rng(seed)
+    words = ["page", "rank", "surfer", "link", "graph", "damping", "corpus", "matrix"]
+    gap = f"\n{' ' * indent}" if indent else " "
+    parts = ["<!DOCTYPE html><html><head><title>Synthetic</title></head><body>"]
+    length = 0
+    while length < size:
+        if rng.random() < anchor_share:
+            if indent and rng.random() < 0.5:
+                attributes = ["class=\"anchor\"", f"id=\"s{length}\"", "aria-hidden=\"true\""]
+            else:
+                attributes = ["class=\"link\"", f"id=\"l{length}\"",
+                              f"href=\"{rng.integers(1 << 20)}.html\""]
+            part = f"<a{gap}{gap.join(attributes)}>{rng.choice(words)}</a>"
+        else:
+            text = " ".join(rng.choice(words, 20))
+            part = f'<div class="row" data-n="{length}"><span>{text}</span></div>\n'
+        parts.append(part)
+        length += len(part)
+    parts.append("</body></html>")
+    return "".join(parts).encode()
+
+
+def bench_parse(args):
+    """
+    Compare link extraction throughput of the old regex, html.parser
+    and crawler's bytes scanner on multi-MB pages.
+    """
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "page.html")
+
+        def regex():
+            with open(path, encoding="utf-8") as f:
+                return set(REGEX_LINK.findall(f.read()))
+
+        def parser():
+            with open(path, encoding="utf-8") as f:
+                anchors = AnchorParser()
+                anchors.feed(f.read())
+                anchors.close()
+                return anchors.links
+
+        extractors = (("regex", regex), ("html.parser", parser),
+                      ("scanner", lambda: crawler.extract_links(path)))
+        for size, share, indent in itertools.product(args.sizes, args.anchor_shares,
+                                                     args.indents):
+            with open(path, "wb") as f:
+                f.write(generate_html(size << 20, share, indent, args.seed))
+            layout = f"indented by {indent}" if indent else "compact"
+            print(f"{size} MB page, {share:.0%} anchors, {layout}")
+
+            expected = None
+            for name, extract in extractors:
+                start = time.perf_counter()
+                links = extract()
+                elapsed = time.perf_counter() - start
+                expected = expected or links
+                print(f"  {name:>11}: {elapsed:7.3f}s  {size / elapsed:7.1f} MB/s  "
+                      f"{len(links)} links{'' if links == expected else ', MISMATCH'}")
+
+
+def bench_crawl(args):
+    """
+    Time a cold parallel crawl, a cached re-crawl, and a re-crawl
+    after changing a few pages, against the sequential crawl.
+    """
+    with tempfile.TemporaryDirectory() as directory:
+        paths = write_corpus(directory, args.pages, per_directory=args.per_directory,
+                             seed=args.seed)
+        print(f"{args.pages} pages written")
+
+        if not args.per_directory:
+            start = time.perf_counter()
+            expected = pagerank.crawl(directory)
+            print(f"  {'pagerank.crawl':>20}: {time.perf_counter() - start:8.3f}s")
+
+        runs = [("cold", []), ("cached", []), (f"{args.changed} changed", paths[:args.changed])]
+        for label, changed in runs:
+            for path in changed:
+                with open(path, "a", encoding="utf-8") as f:
+                    f.write("\n")
+            stats = {}
+            start = time.perf_counter()
+            corpus = crawler.crawl(directory, workers=args.workers,
+                                   processes=args.processes, stats=stats)
+            print(f"  {label:>20}: {time.perf_counter() - start:8.3f}s "
+                  f"({stats['parsed']} parsed, {stats['cached']} cached)")
+        if not args.per_directory and corpus != expected:
+            raise RuntimeError("crawler.crawl and pagerank.crawl disagree")
+
+
+def bench_incremental(args):
+    """
+    Rewire the links of a few pages, then compare a full recompute
+    against warm-started iteration and forward push from the old ranks.
+    """
+    corpus = generate_corpus(args.pages, seed=args.seed)
+    old = sparse.TransitionMatrix.from_corpus(corpus)
+    previous, _ = sparse.power_iteration(old, pagerank.DAMPING, args.threshold)
+
+    rng = np.random.default_rng(args.seed + 1)
+    pages = sorted(corpus)
+    changed = {}
+    for i in rng.choice(len(pages), args.changed, replace=False).tolist():
+        links = rng.choice(len(pages), rng.integers(0, 10), replace=False).tolist()
+        changed[pages[i]] = {pages[j] for j in links} - {pages[i]}
+    new = incremental.apply_diff(corpus, incremental.CorpusDiff(changed=changed))
+    diff = incremental.diff_corpus(corpus, new)
+    if incremental.apply_diff(corpus, diff) != new:
+        raise RuntimeError("apply_diff(old, diff_corpus(old, new)) is not new")
+    print(f"{args.pages} pages, {args.changed} pages rewired, threshold {args.threshold}")
+
+    transition = sparse.TransitionMatrix.from_corpus(new)
+    reference, _ = sparse.power_iteration(transition, pagerank.DAMPING, args.threshold / 100)
+
+    start = time.perf_counter()
+    ranks, iterations = sparse.power_iteration(transition, pagerank.DAMPING, args.threshold)
+    elapsed = time.perf_counter() - start
+    error = np.abs(ranks - reference).max()
+    print(f"  {'full':>6}: {elapsed:8.4f}s  {iterations} iterations "
+          f"({iterations * len(old.matrix.data)} edge updates)  max error {error:.1e}")
+
+    for method in ("warm", "push"):
+        stats = {}
+        start = time.perf_counter()
+        ranks = incremental.update_ranks(transition, previous, pagerank.DAMPING,
+                                         method, args.threshold, stats, diff)
+        elapsed = time.perf_counter() - start
+        error = np.abs(ranks - reference).max()
+        if method == "warm":
+            work = f"{stats['iterations']} iterations"
+        else:
+            work = (f"{stats['rounds']} rounds, {stats['pushes']} pushes "
+                    f"({stats['edge_work']} edge updates)")
+        print(f"  {method:>6}: {elapsed:8.4f}s  {work}  max error {error:.1e}")
+
+
+def bench_personalized(args):
+    """
+    Measure personalized PageRank query latency with a cold and a warm
+    push-vector cache.
+    """
+    corpus = generate_corpus(args.pages, seed=args.seed)
+    pages = sorted(corpus)
+    rng = np.random.default_rng(args.seed)
+    hot = [pages[i] for i in rng.choice(len(pages), args.hot, replace=False)]
+    queries = [[hot[i] for i in rng.choice(len(hot), args.seeds, replace=False)]
+               for _ in range(args.queries)]
+    print(f"{args.pages} pages, {args.queries} queries of {args.seeds} seeds "
+          f"from {len(hot)} hot pages, epsilon {args.epsilon}")
+
+    start = time.perf_counter()
+    transition = sparse.TransitionMatrix.from_corpus(corpus)
+    sparse.power_iteration(transition, pagerank.DAMPING)
+    print(f"  global PageRank for comparison: {time.perf_counter() - start:.3f}s")
+
+    index = personalized.PPRIndex(corpus, pagerank.DAMPING, args.epsilon,
+                                  cache_size=args.cache_size)
+    for label in ("cold cache", "warm cache"):
+        index.latencies.clear()
+        touched = 0
+        for seeds in queries:
+            touched += len(index.query(seeds))
+        stats = index.latency_stats()
+        print(f"  {label:>10}: mean {stats['mean_ms']:8.3f} ms  p50 {stats['p50_ms']:8.3f} ms  "
+              f"p99 {stats['p99_ms']:8.3f} ms  ({touched / len(queries):.0f} pages/query, "
+              f"{stats['hits']} hits, {stats['misses']} misses)")
+
+
+def bench_convergence(args):
+    """
+    Compare iterations, time and accuracy of the convergence options on
+    one synthetic graph, optionally tracing every iteration's residual.
+    """
+    sources, targets = generate_edges(args.pages, seed=args.seed)
+    transition = sparse.TransitionMatrix([f"{i}.html" for i in range(args.pages)],
+                                         sources, targets)
+    reference, _ = sparse.power_iteration(transition, pagerank.DAMPING, threshold=1e-14)
+    print(f"{args.pages} pages, {len(sources)} links")
+
+    def trace(iteration, residual, elapsed):
+        print(f"    {iteration:4d}  residual {residual:.3e}  {1000 * elapsed:9.2f} ms")
+
+    for norm in ("linf", "l1"):
+        for tolerance in args.tolerances:
+            for extrapolation in (None, "aitken"):
+                stats = {}
+                ranks, _ = sparse.power_iteration(
+                    transition, pagerank.DAMPING, tolerance, norm=norm,
+                    max_iterations=args.max_iterations, extrapolation=extrapolation,
+                    callback=trace if args.trace else None, stats=stats)
+                error = np.abs(ranks - reference).sum()
+                print(f"  {norm:>4} < {tolerance:.0e} {extrapolation or 'plain':>6}: "
+                      f"{stats['iterations']:4d} iterations "
+                      f"({stats['extrapolations']} extrapolated), "
+                      f"{stats['elapsed']:.3f}s, L1 error {error:.2e}"
+                      f"{'' if stats['converged'] else ', not converged'}")
+
+
+def bench_solvers(args):
+    """
+    Report iterations to convergence and time of each solver, and the
+    block solver's speedup as worker processes are added.
+    """
+    sources, targets = generate_edges(args.pages, seed=args.seed)
+    transition = sparse.TransitionMatrix([f"{i}.html" for i in range(args.pages)],
+                                         sources, targets)
+    print(f"{args.pages} pages, {len(sources)} links, {os.cpu_count()} cores")
+    for damping_factor in args.damping:
+        reference, _ = sparse.power_iteration(transition, damping_factor, threshold=1e-14)
+        print(f"  damping {damping_factor}, threshold {args.threshold:.0e}")
+        runs = [("power", 1), ("gauss-seidel", 1)] + [("block", p) for p in args.processes]
+        baseline = None
+        for solver, processes in runs:
+            start = time.perf_counter()
+            ranks, iterations = solvers.solve(transition, damping_factor, solver,
+                                              args.threshold, processes=processes)
+            elapsed = time.perf_counter() - start
+            if solver == "block":
+                baseline = baseline or elapsed
+                label = f"block x{processes}"
+                speedup = f", speedup {baseline / elapsed:.2f}x"
+            else:
+                label = solver
+                speedup = ""
+            print(f"    {label:>12}: {iterations:4d} iterations, {elapsed:7.3f}s{speedup}, "
+                  f"L1 error {np.abs(ranks - reference).sum():.1e}")
+
+
+def bench_results(args):
+    """
+    Time saving results for a large corpus, and top-k, rank and
+    percentile queries against the saved file.
+    """
+    rng = np.random.default_rng(args.seed)
+    ranks = rng.pareto(1.5, args.pages) + 1
+    ranks /= ranks.sum()
+    pages = [f"{i}.html" for i in range(args.pages)]
+    print(f"{args.pages} pages")
+
+    start = time.perf_counter()
+    rank_dict = dict(zip(pages, ranks.tolist()))
+    expected = heapq.nlargest(args.k, rank_dict.items(), key=lambda item: item[1])
+    print(f"  {'dict + heapq top-k':>20}: {time.perf_counter() - start:9.3f}s")
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "ranks.bin")
+        start = time.perf_counter()
+        results.write_results(path, ranks, pages)
+        print(f"  {'write':>20}: {time.perf_counter() - start:9.3f}s, "
+              f"{os.path.getsize(path) / 2 ** 20:.0f} MB")
+
+        start = time.perf_counter()
+        saved = results.RankResults(path)
+        print(f"  {'open':>20}: {1000 * (time.perf_counter() - start):9.3f} ms")
+
+        sample = [pages[i] for i in rng.integers(0, args.pages, args.queries)]
+        queries = [
+            (f"top_k({args.k})", lambda: saved.top_k(args.k)),
+            (f"top_k({args.k}) of {len(sample)}", lambda: saved.top_k(args.k, sample)),
+            ("rank_of", lambda: [saved.rank_of(page) for page in sample]),
+            ("percentile", lambda: [saved.percentile(q) for q in range(101)]),
+            ("percentile_of", lambda: [saved.percentile_of(page) for page in sample]),
+        ]
+        for name, query in queries:
+            start = time.perf_counter()
+            answer = query()
+            cold = time.perf_counter() - start
+            start = time.perf_counter()
+            query()
+            elapsed = time.perf_counter() - start
+            count = len(answer) if name in ("rank_of", "percentile", "percentile_of") else 1
+            print(f"  {name:>20}: {1000 * elapsed / count:9.3f} ms per query "
+                  f"({1000 * cold / count:.3f} ms cold)")
+            if name == f"top_k({args.k})" and answer != expected:
+                print("    MISMATCH with heapq.nlargest")
+        saved.close()
+
+
+def write_edge_list(directory, num_pages, mean_links=8, seed=0, block_pages=1 << 20):
+    """
+    Write a synthetic graph like `generate_edges` as an edge list,
+    generating it `block_pages` source pages at a time.
+    """
+    rng = np.random.default_rng(seed)
+    pages = (f"{i}.html" for i in range(num_pages))
+    with outofcore.EdgeListWriter(directory, pages) as writer:
+        for first in range(0, num_pages, block_pages):
+            count = min(block_pages, num_pages - first)
+            degree = rng.geometric(1 / (mean_links + 1), size=count) - 1
+            sources = np.repeat(np.arange(first, first + count), degree)
+            targets = (num_pages * rng.random(len(sources)) ** 3).astype(np.int64)
+            keep = sources != targets
+            writer.add(sources[keep], targets[keep])
+
+
+def peak_memory_mb():
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def bench_outofcore(args):
+    """
+    Check out-of-core PageRank against the in-memory engines on the
+    bundled corpora and a synthetic graph, and time it.
+    """
+    with tempfile.TemporaryDirectory() as directory:
+        for name in ("corpus0", "corpus1", "corpus2"):
+            path = os.path.join(directory, name)
+            outofcore.crawl_to_edge_list(name, path)
+            expected = sparse.sparse_pagerank(pagerank.crawl(name), pagerank.DAMPING)
+            ranks = outofcore.outofcore_pagerank(path, pagerank.DAMPING)
+            error = max(abs(expected[page] - ranks[page]) for page in expected)
+            print(f"{name}: {len(ranks)} pages, max difference {error:.2e}")
+
+        path = os.path.join(directory, "synthetic")
+        start = time.perf_counter()
+        write_edge_list(path, args.pages, args.mean_links, args.seed)
+        written = time.perf_counter() - start
+        edges = outofcore.EdgeList(path, block_edges=args.block_edges)
+        size = os.path.getsize(os.path.join(path, outofcore.EDGES_FILENAME))
+        print(f"synthetic: {args.pages} pages, {edges.num_edges} links, "
+              f"{size / 2 ** 20:.0f} MB written in {written:.1f}s")
+
+        start = time.perf_counter()
+        ranks, iterations = sparse.power_iteration(edges, pagerank.DAMPING, args.threshold)
+        elapsed = time.perf_counter() - start
+        print(f"  out-of-core: {elapsed:7.1f}s, {iterations} iterations, "
+              f"peak RSS {peak_memory_mb():.0f} MB")
+
+        if edges.num_edges <= args.max_verify:
+            start = time.perf_counter()
+            transition = sparse.TransitionMatrix(edges.pages, edges.edges[:, 0], edges.edges[:, 1])
+            expected, _ = sparse.power_iteration(transition, pagerank.DAMPING, args.threshold)
+            elapsed = time.perf_counter() - start
+            print(f"    in-memory: {elapsed:7.1f}s, peak RSS {peak_memory_mb():.0f} MB, "
+                  f"max difference {np.abs(expected - ranks).max():.2e}")
+            del transition
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmarks for pagerank.py")
+    parser.add_argument("--seed", type=int, default=0)
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    iterate = commands.add_parser("iterate", help="iterate_pagerank vs sparse engine")
+    iterate.add_argument("--pages", type=int, nargs="+",
+                         default=[1000, 10000, 100000, 1000000])
+    iterate.add_argument("--max-dense", type=int, default=2000,
+                         help="largest corpus to run the per-page iterate_pagerank on")
+    iterate.set_defaults(func=bench_iterate)
+
+    sample = commands.add_parser("sample", help="sample_pagerank vs batched sampler")
+    sample.add_argument("--pages", type=int, nargs="+", default=[1000, 10000, 100000])
+    sample.add_argument("--samples", type=int, default=10000)
+    sample.add_argument("--surfers", type=int, default=1000)
+    sample.add_argument("--processes", type=int, nargs="+", default=[1, 4])
+    sample.add_argument("--max-dense", type=int, default=10000,
+                        help="largest corpus to run the O(N) per step sample_pagerank on")
+    sample.set_defaults(func=bench_sample)
+
+    crawl = commands.add_parser("crawl", help="parallel cached crawler")
+    crawl.add_argument("--pages", type=int, default=100000)
+    crawl.add_argument("--per-directory", type=int, default=0,
+                       help="spread pages over subdirectories of this many pages")
+    crawl.add_argument("--changed", type=int, default=100)
+    crawl.add_argument("--workers", type=int)
+    crawl.add_argument("--processes", action="store_true")
+    crawl.set_defaults(func=bench_crawl)
+
+    parse = commands.add_parser("parse", help="link extraction throughput")
+    parse.add_argument("--sizes", type=int, nargs="+", default=[4, 32],
+                       help="page sizes in MB")
+    parse.add_argument("--anchor-shares", type=float, nargs="+", default=[0.05, 0.5])
+    parse.add_argument("--indents", type=int, nargs="+", default=[0, 40],
+                       help="attribute indentation (0 for compact tags)")
+    parse.set_defaults(func=bench_parse)
+
+    update = commands.add_parser("incremental", help="incremental vs full recompute")
+    update.add_argument("--pages", type=int, default=100000)
+    update.add_argument("--changed", type=int, default=10)
+    update.add_argument("--threshold", type=float, default=1e-9)
+    update.set_defaults(func=bench_incremental)
+
+    ppr = commands.add_parser("personalized", help="personalized PageRank query latency")
+    ppr.add_argument("--pages", type=int, default=100000)
+    ppr.add_argument("--queries", type=int, default=200)
+    ppr.add_argument("--seeds", type=int, default=3)
+    ppr.add_argument("--hot", type=int, default=50)
+    ppr.add_argument("--epsilon", type=float, default=1e-5)
+    ppr.add_argument("--cache-size", type=int, default=1024)
+    ppr.set_defaults(func=bench_personalized)
+
+    converge = commands.add_parser("convergence", help="tolerances, norms and extrapolation")
+    converge.add_argument("--pages", type=int, default=100000)
+    converge.add_argument("--tolerances", type=float, nargs="+", default=[1e-3, 1e-6, 1e-9])
+    converge.add_argument("--max-iterations", type=int, default=1000)
+    converge.add_argument("--trace", action="store_true",
+                          help="print the residual and elapsed time of every iteration")
+    converge.set_defaults(func=bench_convergence)
+
+    solve = commands.add_parser("solvers", help="power, Gauss-Seidel and block solvers")
+    solve.add_argument("--pages", type=int, default=1000000)
+    solve.add_argument("--damping", type=float, nargs="+", default=[0.85, 0.99])
+    solve.add_argument("--threshold", type=float, default=1e-8)
+    solve.add_argument("--processes", type=int, nargs="+", default=[1, 2, 4])
+    solve.set_defaults(func=bench_solvers)
+
+    saved = commands.add_parser("results", help="saved results and rank queries")
+    saved.add_argument("--pages", type=int, default=10000000)
+    saved.add_argument("--k", type=int, default=100)
+    saved.add_argument("--queries", type=int, default=1000)
+    saved.set_defaults(func=bench_results)
+
+    disk = commands.add_parser("outofcore", help="out-of-core vs in-memory power iteration")
+    disk.add_argument("--pages", type=int, default=6250000)
+    disk.add_argument("--mean-links", type=int, default=8)
+    disk.add_argument("--block-edges", type=int, default=outofcore.BLOCK_EDGES)
+    disk.add_argument("--threshold", type=float, default=1e-8)
+    disk.add_argument("--max-verify", type=int, default=60000000,
+                      help="largest edge count to also build in memory for comparison")
+    disk.set_defaults(func=bench_outofcore)
+
+    args = parser.parse_args()
+    args.func(args)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+import time
+
+import numpy as np
+
+NORMS = {
+    "l1": lambda difference: float(np.abs(difference).sum()),
+    "linf": lambda difference: float(np.abs(difference).max()),
+}
+
+# Iterations between two Aitken extrapolations
+AITKEN_PERIOD = 10
+
+
+def aitken(older, old, new):
+    """
+    Return the componentwise Aitken delta-squared extrapolation of three
+    successive power iterates, renormalized to sum to 1.
+
+    Components whose second difference vanishes (already converged, or
+    not converging geometrically) keep their latest value, and so does
+    the whole vector if extrapolation would make any rank negative.
+    """
+    step = new - old
+    curvature = step - (old - older)
+    safe = np.abs(curvature) > 1e-15
+    extrapolated = new.copy()
+    extrapolated[safe] -= step[safe] ** 2 / curvature[safe]
+    if (extrapolated < 0).any():
+        return new
+    return extrapolated / extrapolated.sum()
+
+
+def converge(step, start, tolerance=0.001, norm="linf", max_iterations=None,
+             extrapolation=None, callback=None, stats=None):
+    """
+    Apply `step` to the vector `start` repeatedly until the residual,
+    the `norm` ("l1" or "linf") of the change made by one step, drops
+    below `tolerance`, or `max_iterations` steps have been taken.
+
+    With `extrapolation="aitken"`, every AITKEN_PERIOD steps the last
+    three iterates are replaced by their Aitken extrapolation, which
+    skips ahead when the slowest mode dominates the error.
+
+    `callback(iteration, residual, elapsed)` is called after every step,
+    with the seconds elapsed since the start. If `stats` is a dict,
+    "iterations", "residual", "converged", "extrapolations" and
+    "elapsed" are stored in it.
+
+    Return the last vector.
+    """
+    if norm not in NORMS:
+        raise ValueError(f"unknown norm: {norm}")
+    if extrapolation not in (None, "aitken"):
+        raise ValueError(f"unknown extrapolation: {extrapolation}")
+    measure = NORMS[norm]
+
+    begin = time.perf_counter()
+    vector = np.asarray(start, dtype=float)
+    history = []
+    iterations = 0
+    extrapolations = 0
+    converged = False
+    residual = float("inf")
+
+    while max_iterations is None or iterations < max_iterations:
+        new_vector = step(vector)
+        iterations += 1
+        residual = measure(new_vector - vector)
+        if callback is not None:
+            callback(iterations, residual, time.perf_counter() - begin)
+        vector = new_vector
+        if residual < tolerance:
+            converged = True
+            break
+
+        if extrapolation == "aitken":
+            history = history[-2:] + [vector]
+            if iterations % AITKEN_PERIOD == 0 and len(history) == 3:
+                extrapolated = aitken(*history)
+                if extrapolated is not vector:
+                    vector = extrapolated
+                    extrapolations += 1
+                    history = []
+
+    if stats is not None:
+        stats["iterations"] = iterations
+        stats["residual"] = residual
+        stats["converged"] = converged
+        stats["extrapolations"] = extrapolations
+        stats["elapsed"] = time.perf_counter() - begin
+    return vector
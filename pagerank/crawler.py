@@ -0,0 +1,258 @@
+import html
+import json
+import os
+import posixpath
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+CACHE_FILENAME = ".linkcache.json"
+CACHE_VERSION = 3
+
+# Bytes read from a page at a time
+CHUNK_SIZE = 1 << 20
+
+# Bytes that separate attributes in a tag
+SPACE = frozenset(b" \t\n\r\f")
+SEPARATOR = SPACE | frozenset(b"/")
+QUOTES = {byte: bytes([byte]) for byte in b"\"'"}
+
+
+def _anchor_hrefs(data, lower, start, final):
+    """
+    Tokenize the attributes of the anchor tag at offset `start` one by
+    one. Return (href values, offset past the tag), with None for the
+    offset if `data` ends inside the tag.
+
+    Only attributes with a value matter, so the tokenizer jumps from
+    one "=" to the next with `bytes.find`, reads the name before it and
+    the value after it, and stops at the first ">" outside a value.
+    """
+    end = len(data)
+    hrefs = []
+    pos = start + 2
+    close = data.find(b">", pos)
+    while True:
+        if close != -1 and close < pos:
+            # The ">" found last was inside a value
+            close = data.find(b">", pos)
+        equals = data.find(b"=", pos, end if close == -1 else close)
+        if equals == -1:
+            if close == -1:
+                return hrefs, end if final else None
+            return hrefs, close + 1
+        name = lower[pos:equals].rstrip()
+        href = name.endswith(b"href") and (len(name) == 4 or name[-5] in SEPARATOR)
+        first = equals + 1
+        while first < end and data[first] in SPACE:
+            first += 1
+        if first == end:
+            return hrefs, end if final else None
+        quote = data[first]
+        if quote in QUOTES:
+            last = data.find(QUOTES[quote], first + 1)
+            if last == -1:
+                # A quoted value the data ends in
+                return hrefs, end if final else None
+            if href:
+                hrefs.append(data[first + 1:last])
+            pos = last + 1
+        else:
+            last = first
+            limit = end if close == -1 else close
+            while last < limit and data[last] not in SPACE:
+                last += 1
+            if last == end and not final:
+                return hrefs, None
+            if href and last > first:
+                hrefs.append(data[first:last])
+            pos = last
+
+
+def scan_links(data, links, final=True):
+    """
+    Add the href values of the anchor tags in the bytes `data` to the
+    set `links`, in one pass.
+
+    Anchors and comments are found with `bytes.find` and each anchor's
+    attributes are tokenized in place, so no byte is looked at by
+    Python code outside a tag. Double-quoted, single-quoted and
+    unquoted values are all accepted, in any letter case, and anchors
+    inside comments are skipped.
+
+    Return the offset to scan again from once more data comes, which
+    is at or before the start of any tag or comment that `data` ends
+    in the middle of, or len(data). With `final`, unfinished tags are
+    scanned as far as they go.
+    """
+    lower = data.lower()
+    end = len(data)
+    hrefs = []
+    cut = end
+    pos = 0
+    comment = lower.find(b"<!--")
+    while True:
+        if comment != -1 and comment < pos:
+            comment = lower.find(b"<!--", pos)
+        start = lower.find(b"<a", pos)
+        if comment != -1 and (start == -1 or comment < start):
+            close = lower.find(b"-->", comment + 4)
+            if close == -1:
+                cut = end if final else comment
+                break
+            pos = close + 3
+            continue
+        if start == -1:
+            if not final:
+                # The data may end in the first bytes of "<a " or "<!--"
+                tail = lower.find(b"<", max(pos, end - 3))
+                if tail != -1:
+                    cut = tail
+            break
+        pos = start + 2
+        if pos == end:
+            if not final:
+                cut = start
+            break
+        if lower[pos] not in SPACE:
+            continue
+        found, stop = _anchor_hrefs(data, lower, start, final)
+        if stop is None:
+            cut = start
+            break
+        hrefs.extend(found)
+        pos = stop
+
+    # Decoded in one piece, unless a value holds the separator
+    text = str(b"\0".join(hrefs), "utf-8", "replace")
+    values = text.split("\0") if hrefs else []
+    if len(values) != len(hrefs):
+        values = [str(href, "utf-8", "replace") for href in hrefs]
+    if "&" in text:
+        values = [html.unescape(href) if "&" in href else href for href in values]
+    links.update(values)
+    return cut
+
+
+def extract_links(path, chunk_size=CHUNK_SIZE):
+    """
+    Return the set of href values of the anchor tags in the file at
+    `path`, reading it `chunk_size` bytes at a time. See `scan_links`.
+    """
+    links = set()
+    carry = b""
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            data = carry + chunk if carry else chunk
+            carry = data[scan_links(data, links, final=False):]
+    scan_links(carry, links)
+    return links
+
+
+def resolve(page, link):
+    """
+    Return the corpus page name `link` refers to from `page`, or None
+    for links that leave the corpus (other sites, mailto:, ...).
+    """
+    link = link.split("#", 1)[0].split("?", 1)[0].strip()
+    if not link or ":" in link or link.startswith("//"):
+        return None
+    if link.startswith("/"):
+        return posixpath.normpath(link.lstrip("/"))
+    return posixpath.normpath(posixpath.join(posixpath.dirname(page), link))
+
+
+def find_pages(directory):
+    """
+    Return a dict mapping the relative name of every .html file under
+    `directory` (in any subdirectory) to its (path, os.stat_result).
+    """
+    pages = {}
+    pending = [(directory, "")]
+    while pending:
+        root, prefix = pending.pop()
+        with os.scandir(root) as entries:
+            for entry in entries:
+                if entry.is_dir():
+                    pending.append((entry.path, f"{prefix}{entry.name}/"))
+                elif entry.name.endswith(".html"):
+                    pages[prefix + entry.name] = (entry.path, entry.stat())
+    return pages
+
+
+def parse_page(page, path):
+    """
+    Return (page, links) for the page named `page` stored at `path`,
+    where `links` are the sorted corpus page names it links to, other
+    than itself. Links are not checked against the pages that exist.
+    """
+    links = (resolve(page, link) for link in extract_links(path))
+    return page, sorted({link for link in links if link is not None and link != page})
+
+
+def load_cache(filename):
+    """
+    Return the cached {page: {"mtime_ns", "size", "links"}} entries,
+    or an empty dict if there is no usable cache.
+    """
+    try:
+        with open(filename, encoding="utf-8") as f:
+            cache = json.load(f)
+    except (FileNotFoundError, ValueError):
+        return {}
+    if cache.get("version") != CACHE_VERSION:
+        return {}
+    return cache["pages"]
+
+
+def save_cache(filename, pages):
+    temporary = f"{filename}.tmp"
+    with open(temporary, "w", encoding="utf-8") as f:
+        json.dump({"version": CACHE_VERSION, "pages": pages}, f)
+    os.replace(temporary, filename)
+
+
+def crawl(directory, workers=None, processes=False, cache=True, stats=None):
+    """
+    Parse a directory tree of HTML pages and check for links to other
+    pages, like `pagerank.crawl`, but in parallel.
+
+    Pages in subdirectories are named by their relative path, and
+    relative links are resolved against the linking page's directory.
+
+    Files are parsed by a thread pool, or a process pool if
+    `processes` is set. With `cache`, the resolved links of every page
+    are kept in a cache file in `directory` keyed by mtime and size,
+    so only new or changed pages are parsed again. If `stats` is a
+    dict, the number of "parsed" and "cached" pages is stored in it.
+    """
+    cache_file = os.path.join(directory, CACHE_FILENAME)
+    cached = load_cache(cache_file) if cache else {}
+    paths = find_pages(directory)
+
+    entries = {}
+    jobs = []
+    for page, (path, stat) in paths.items():
+        entry = cached.get(page)
+        if entry and entry["mtime_ns"] == stat.st_mtime_ns and entry["size"] == stat.st_size:
+            entries[page] = entry
+        else:
+            entries[page] = {"mtime_ns": stat.st_mtime_ns, "size": stat.st_size}
+            jobs.append((page, path))
+
+    if jobs:
+        pool = ProcessPoolExecutor if processes else ThreadPoolExecutor
+        with pool(workers) as executor:
+            for page, links in executor.map(parse_page, *zip(*jobs),
+                                            chunksize=64 if processes else 1):
+                entries[page]["links"] = links
+
+    if cache and (jobs or set(cached) != set(entries)):
+        save_cache(cache_file, entries)
+    if stats is not None:
+        stats["parsed"] = len(jobs)
+        stats["cached"] = len(entries) - len(jobs)
+
+    # Only include links to other pages in the corpus
+    return {
+        page: {link for link in entry["links"] if link in entries}
+        for page, entry in entries.items()
+    }
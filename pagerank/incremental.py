@@ -0,0 +1,219 @@
+import numpy as np
+
+import sparse
+from sampler import OutLinks
+
+
+class CorpusDiff():
+    """
+    Changes between two versions of a corpus: pages `added` and
+    `removed`, and the new link sets of pages whose links `changed`,
+    which include every added page.
+
+    `old_links` holds the link sets that changed or removed pages had
+    before, when known; `update_ranks` needs them to tell which ranks
+    the diff can move.
+    """
+
+    def __init__(self, added=(), removed=(), changed=None, old_links=None):
+        self.added = set(added)
+        self.removed = set(removed)
+        self.changed = dict(changed or {})
+        self.old_links = dict(old_links or {})
+
+    def __bool__(self):
+        return bool(self.added or self.removed or self.changed)
+
+    def pages(self):
+        """
+        Return every page the diff touches.
+        """
+        return self.added | self.removed | set(self.changed)
+
+
+def diff_corpus(old, new):
+    """
+    Return the CorpusDiff turning corpus `old` into corpus `new`.
+    """
+    changed = {
+        page: set(links) for page, links in new.items()
+        if page not in old or old[page] != links
+    }
+    removed = set(old) - set(new)
+    old_links = {page: set(old[page]) for page in changed.keys() | removed if page in old}
+    return CorpusDiff(set(new) - set(old), removed, changed, old_links)
+
+
+def apply_diff(corpus, diff):
+    """
+    Return a new corpus with `diff` applied to `corpus`.
+    """
+    result = {page: links for page, links in corpus.items() if page not in diff.removed}
+    for page in diff.added:
+        result[page] = diff.changed.get(page, set())
+    for page, links in diff.changed.items():
+        result[page] = set(links)
+
+    # Links to removed pages disappear with them
+    for page, links in result.items():
+        if links & diff.removed:
+            result[page] = links - diff.removed
+    return result
+
+
+def warm_start(transition, previous):
+    """
+    Return a start vector for `transition` from the `previous` ranks:
+    either a rank vector in the order of `transition.pages`, used as
+    is, or a dict by page name, where known pages keep their rank and
+    new pages get 1 / N. The result is rescaled to sum to 1.
+    """
+    n = len(transition)
+    if isinstance(previous, dict):
+        start = np.fromiter(map(previous.get, transition.pages, [1 / n] * n),
+                            dtype=float, count=n)
+    else:
+        start = np.array(previous, dtype=float)
+        if len(start) != n:
+            raise ValueError(f"previous ranks have {len(start)} pages, expected {n}")
+    return start / start.sum()
+
+
+def seed_residual(transition, ranks, damping_factor, diff=None):
+    """
+    Return the residual of every page for `ranks`: how much one
+    power-iteration step on `transition` would change its rank.
+
+    Given the `diff` that `transition` came from and ranks that had
+    converged before it, only the old and new targets of the pages
+    whose links changed are computed; every other residual changes
+    by the same amount, set by the rank that moved in or out of
+    dangling pages. Without a diff, or when it adds or removes pages
+    or lacks a changed page's old links, one full step is taken.
+    """
+    if diff is None or diff.added or diff.removed:
+        return transition.step(ranks, damping_factor) - ranks
+    pages = set()
+    moved = 0.0
+    index = transition.index
+    for page, links in diff.changed.items():
+        old = diff.old_links.get(page)
+        if old is None:
+            return transition.step(ranks, damping_factor) - ranks
+        pages |= old | links
+        # Mass now spread over every page, less what was before
+        if bool(old) != bool(links) and page in index:
+            moved += ranks[index[page]] if old else -ranks[index[page]]
+    seeds = np.array(sorted(index[page] for page in pages if page in index), dtype=np.int64)
+
+    n = len(transition)
+    residual = np.full(n, damping_factor * moved / n)
+    teleport = (damping_factor * ranks[transition.dangling].sum() + 1 - damping_factor) / n
+    residual[seeds] = (damping_factor * (transition.matrix[seeds] @ ranks)
+                       + teleport - ranks[seeds])
+    return residual
+
+
+def push(transition, ranks, damping_factor, threshold=0.001, residual=None, stats=None):
+    """
+    Refine `ranks` in place by forward push until no page's residual
+    reaches `threshold`, and return it.
+
+    The residual of a page is how much one power-iteration step would
+    change its rank, so this stops on the same rule as
+    `power_iteration`. Pushing a page moves its residual into its rank
+    and spreads `damping_factor` of it over the pages it links to, so
+    when the previous ranks were already converged only the
+    neighbourhood of the changed pages is touched.
+
+    `residual` is the starting residual of every page, from
+    `seed_residual` by default.
+
+    Every page over the threshold is pushed at once in each round,
+    which keeps the work vectorized; mass pushed from dangling pages
+    is spread over every page.
+    """
+    n = len(transition)
+    links = OutLinks(transition)
+    if residual is None:
+        residual = seed_residual(transition, ranks, damping_factor)
+    rounds = 0
+    pushes = 0
+    work = 0
+
+    while True:
+        active = np.flatnonzero(np.abs(residual) >= threshold)
+        if len(active) == 0:
+            break
+        rounds += 1
+        pushes += len(active)
+        amounts = residual[active]
+        ranks[active] += amounts
+        residual[active] = 0
+
+        degree = links.degree[active]
+        dangling = degree == 0
+        if dangling.any():
+            residual += damping_factor * amounts[dangling].sum() / n
+            work += n
+
+        # Gather the outgoing links of every active page
+        linked = ~dangling
+        starts = links.offsets[active[linked]]
+        degree = degree[linked]
+        total = int(degree.sum())
+        first = np.cumsum(degree) - degree
+        positions = np.repeat(starts - first, degree) + np.arange(total)
+        shares = np.repeat(damping_factor * amounts[linked] / degree, degree)
+        np.add.at(residual, links.targets[positions], shares)
+        work += total
+
+    if stats is not None:
+        stats["rounds"] = rounds
+        stats["pushes"] = pushes
+        stats["edge_work"] = work
+    return ranks
+
+
+def update_ranks(transition, previous, damping_factor, method="push",
+                 threshold=0.001, stats=None, diff=None):
+    """
+    Return the rank vector for `transition`, starting from the
+    `previous` ranks of an earlier version of the corpus (see
+    `warm_start`).
+
+    `method` is "warm" to warm-start power iteration, or "push" for a
+    localized forward-push update. Given the `diff` between the two
+    versions, push only computes the residuals of the pages it
+    affects (see `seed_residual`). Push stops once every residual is
+    under `threshold`, but those leftovers add up over many pages, so
+    at the same threshold its ranks are less accurate than power
+    iteration's; pass a smaller threshold where that matters.
+    If `stats` is a dict, "iterations" (warm) or "rounds", "pushes"
+    and "edge_work" (push) are stored in it.
+    """
+    start = warm_start(transition, previous)
+    if method == "warm":
+        ranks, iterations = sparse.power_iteration(transition, damping_factor,
+                                                   threshold, start=start)
+        if stats is not None:
+            stats["iterations"] = iterations
+        return ranks
+    if method == "push":
+        residual = seed_residual(transition, start, damping_factor, diff)
+        ranks = push(transition, start, damping_factor, threshold, residual, stats)
+        return ranks / ranks.sum()
+    raise ValueError(f"unknown method: {method}")
+
+
+def incremental_pagerank(corpus, previous, damping_factor, method="push",
+                         threshold=0.001, stats=None, diff=None):
+    """
+    Return PageRank values for the (changed) `corpus`, starting from
+    the `previous` ranks dict rather than from 1 / N.
+    See `update_ranks` for `method`, `stats` and `diff`.
+    """
+    transition = sparse.TransitionMatrix.from_corpus(corpus)
+    ranks = update_ranks(transition, previous, damping_factor, method, threshold, stats,
+                         diff)
+    return transition.to_dict(ranks)
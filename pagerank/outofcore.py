@@ -0,0 +1,248 @@
+import os
+import struct
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+import crawler
+import sparse
+
+MAGIC = b"PREDGES\0"
+VERSION = 1
+EDGES_FILENAME = "edges.bin"
+PAGES_FILENAME = "pages.txt"
+
+# Preamble of the edge file: magic, format version, number of pages,
+# number of edges. The edges follow as (source, target) int32 pairs.
+PREAMBLE = struct.Struct("<8sIQQ")
+
+# Edges held in memory at once while streaming or sorting
+BLOCK_EDGES = 1 << 22
+BUCKET_EDGES = 1 << 24
+
+# Pages parsed per batch by crawl_to_edge_list
+CRAWL_BATCH = 4096
+
+
+class EdgeListWriter():
+    """
+    Write a link graph as an on-disk edge list, sorted by source and
+    then target and without duplicate links, in bounded memory.
+
+    Edges may be added in any order. They are first spooled to a
+    temporary file, then partitioned by source range into buckets of
+    about `bucket_edges` edges, and each bucket is sorted in memory.
+    Use as a context manager, or call `close()` to finish the file.
+    """
+
+    def __init__(self, directory, pages, bucket_edges=BUCKET_EDGES):
+        os.makedirs(directory, exist_ok=True)
+        self.directory = directory
+        self.bucket_edges = bucket_edges
+        self.num_pages = 0
+        with open(os.path.join(directory, PAGES_FILENAME), "w", encoding="utf-8") as f:
+            for page in pages:
+                f.write(f"{page}\n")
+                self.num_pages += 1
+        if self.num_pages >= 1 << 31:
+            raise ValueError("too many pages for int32 page indices")
+        self.out_degree = np.zeros(self.num_pages, dtype=np.int64)
+        self.spool = tempfile.TemporaryFile(dir=directory)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        if exc[0] is None:
+            self.close()
+        else:
+            self.spool.close()
+
+    def add(self, sources, targets):
+        """
+        Add the links from `sources[i]` to `targets[i]`, given as page
+        indices.
+        """
+        edges = np.empty((len(sources), 2), dtype=np.int32)
+        edges[:, 0] = sources
+        edges[:, 1] = targets
+        self.out_degree += np.bincount(edges[:, 0], minlength=self.num_pages)
+        self.spool.write(edges.tobytes())
+
+    def _buckets(self):
+        """
+        Return the boundaries of source ranges holding about
+        `bucket_edges` spooled edges each.
+        """
+        cumulative = np.cumsum(self.out_degree)
+        total = int(cumulative[-1]) if len(cumulative) else 0
+        cuts = np.searchsorted(cumulative, np.arange(self.bucket_edges, total, self.bucket_edges))
+        return np.unique(np.concatenate([[0], cuts + 1, [self.num_pages]]))
+
+    def close(self):
+        bounds = self._buckets()
+        path = os.path.join(self.directory, EDGES_FILENAME)
+        temporary = f"{path}.tmp"
+        runs = [tempfile.TemporaryFile(dir=self.directory) for _ in range(len(bounds) - 1)]
+        try:
+            # Partition the spooled edges by source range
+            self.spool.seek(0)
+            while True:
+                data = self.spool.read(BLOCK_EDGES * 8)
+                if not data:
+                    break
+                edges = np.frombuffer(data, dtype=np.int32).reshape(-1, 2)
+                bucket = np.searchsorted(bounds, edges[:, 0], side="right") - 1
+                order = np.argsort(bucket, kind="stable")
+                splits = np.searchsorted(bucket[order], np.arange(1, len(runs)))
+                for run, part in zip(runs, np.split(order, splits)):
+                    run.write(edges[part].tobytes())
+
+            # Sort and deduplicate each bucket, in source order
+            num_edges = 0
+            with open(temporary, "wb") as f:
+                f.write(PREAMBLE.pack(MAGIC, VERSION, self.num_pages, 0))
+                for run in runs:
+                    run.seek(0)
+                    edges = np.frombuffer(run.read(), dtype=np.int32).reshape(-1, 2)
+                    keys = edges[:, 0].astype(np.int64) << 32 | edges[:, 1]
+                    keys.sort()
+                    keys = keys[np.concatenate([[True], keys[1:] != keys[:-1]])]
+                    sorted_edges = np.empty((len(keys), 2), dtype=np.int32)
+                    sorted_edges[:, 0] = keys >> 32
+                    sorted_edges[:, 1] = keys & 0xFFFFFFFF
+                    f.write(sorted_edges.tobytes())
+                    num_edges += len(keys)
+                f.seek(0)
+                f.write(PREAMBLE.pack(MAGIC, VERSION, self.num_pages, num_edges))
+            os.replace(temporary, path)
+        finally:
+            for run in runs:
+                run.close()
+            self.spool.close()
+
+
+class EdgeList():
+    """
+    Memory-mapped edge list written by `EdgeListWriter`.
+
+    Offers the same `step`, `to_dict` and `len()` interface as
+    `sparse.TransitionMatrix`, so `sparse.power_iteration` runs on it
+    unchanged: each step streams the edges in blocks of `block_edges`,
+    and only the page-sized vectors (ranks and out-degrees) stay
+    resident.
+    """
+
+    def __init__(self, directory, block_edges=BLOCK_EDGES):
+        self.directory = directory
+        self.block_edges = block_edges
+        path = os.path.join(directory, EDGES_FILENAME)
+        with open(path, "rb") as f:
+            magic, version, self.num_pages, self.num_edges = PREAMBLE.unpack(
+                f.read(PREAMBLE.size))
+        if magic != MAGIC or version != VERSION:
+            raise ValueError(f"{path} is not a version {VERSION} edge list")
+        self.edges = np.memmap(path, dtype=np.int32, mode="r", offset=PREAMBLE.size,
+                               shape=(self.num_edges, 2))
+        self._pages = None
+
+        self.out_degree = np.zeros(self.num_pages, dtype=np.int64)
+        for sources, _ in self.blocks():
+            self.out_degree += np.bincount(sources, minlength=self.num_pages)
+        self.dangling = self.out_degree == 0
+
+    def __len__(self):
+        return self.num_pages
+
+    @property
+    def pages(self):
+        """
+        The list of page names, read from disk on first use.
+        """
+        if self._pages is None:
+            with open(os.path.join(self.directory, PAGES_FILENAME), encoding="utf-8") as f:
+                self._pages = f.read().splitlines()
+        return self._pages
+
+    def blocks(self):
+        """
+        Yield the (sources, targets) columns of the edges, `block_edges`
+        edges at a time.
+        """
+        for start in range(0, self.num_edges, self.block_edges):
+            block = np.asarray(self.edges[start:start + self.block_edges])
+            yield block[:, 0], block[:, 1]
+
+    def step(self, ranks, damping_factor):
+        """
+        Apply one PageRank update to the rank vector `ranks`.
+        """
+        n = self.num_pages
+        shares = ranks / np.maximum(self.out_degree, 1)
+        new_ranks = np.zeros(n)
+        for sources, targets in self.blocks():
+            new_ranks += np.bincount(targets, weights=shares[sources], minlength=n)
+        dangling_mass = ranks[self.dangling].sum()
+        return (damping_factor * new_ranks
+                + (damping_factor * dangling_mass + 1 - damping_factor) / n)
+
+    def to_dict(self, ranks):
+        """
+        Return a rank vector as a dict keyed by page name.
+        """
+        return dict(zip(self.pages, ranks.tolist()))
+
+
+def write_corpus(corpus, directory):
+    """
+    Write a `crawl()` corpus dict as an edge list in `directory`.
+    """
+    pages = sorted(corpus)
+    index = {page: i for i, page in enumerate(pages)}
+    with EdgeListWriter(directory, pages) as writer:
+        sources = []
+        targets = []
+        for page, links in corpus.items():
+            for link in links:
+                if link in index:
+                    sources.append(index[page])
+                    targets.append(index[link])
+        writer.add(sources, targets)
+
+
+def crawl_to_edge_list(source, directory, workers=None):
+    """
+    Crawl the HTML pages under `source` like `crawler.crawl`, but
+    stream the links straight into an edge list in `directory` instead
+    of building a corpus dict.
+    """
+    paths = crawler.find_pages(source)
+    pages = sorted(paths)
+    index = {page: i for i, page in enumerate(pages)}
+
+    with EdgeListWriter(directory, pages) as writer, ThreadPoolExecutor(workers) as executor:
+        # Submit pages a batch at a time so pending results stay bounded
+        for start in range(0, len(pages), CRAWL_BATCH):
+            batch = pages[start:start + CRAWL_BATCH]
+            sources = []
+            targets = []
+            for page, links in executor.map(crawler.parse_page, batch,
+                                            [paths[page][0] for page in batch]):
+                for link in links:
+                    if link in index:
+                        sources.append(index[page])
+                        targets.append(index[link])
+            writer.add(sources, targets)
+
+
+def outofcore_pagerank(directory, damping_factor, threshold=0.001, **options):
+    """
+    Return PageRank values for each page of the edge list in
+    `directory`, like `sparse_pagerank`, streaming the edges from disk
+    on every iteration. Keyword arguments are passed on to
+    `sparse.power_iteration`.
+    """
+    edges = EdgeList(directory)
+    ranks, _ = sparse.power_iteration(edges, damping_factor, threshold, **options)
+    return edges.to_dict(ranks)
@@ -1,29 +1,61 @@
+import argparse
+import heapq
 import os
 import random
-import re
-import sys
+
+import numpy as np
+
+import convergence
+import crawler
+import results
+import solvers
 
 DAMPING = 0.85
 SAMPLES = 10000
 
 
 def main():
-    if len(sys.argv) == 1:        
-        corpus  = crawl("corpus1")
-        # corpus =  {'1': {'2'}, '2': {'3', '1'}, '3': {'4', '5', '2'}, '4': {'1', '2'}, '5': set()} 
-    elif len(sys.argv) == 2:
-        corpus = crawl(sys.argv[1])
-    else:
-        sys.exit("Usage: python pagerank.py corpus")
+    parser = argparse.ArgumentParser(description="Rank the pages of a corpus")
+    parser.add_argument("corpus", nargs="?", default="corpus1")
+    parser.add_argument("--solver", choices=("iterate",) + solvers.SOLVERS, default="iterate",
+                        help="iterative solver: this module's iterate_pagerank, or a "
+                             "sparse power, gauss-seidel or block-parallel solver")
+    parser.add_argument("--processes", type=int,
+                        help="worker processes for the block solver (default: all cores)")
+    parser.add_argument("--top", type=int,
+                        help="only print the K highest ranked pages, highest first")
+    parser.add_argument("--save", metavar="PATH",
+                        help="save the iteration results to a file for results.py")
+    args = parser.parse_args()
+    corpus = crawl(args.corpus)
+    # corpus =  {'1': {'2'}, '2': {'3', '1'}, '3': {'4', '5', '2'}, '4': {'1', '2'}, '5': set()} 
 
     ranks = sample_pagerank(corpus, DAMPING, SAMPLES)
     print(f"PageRank Results from Sampling (n = {SAMPLES})")
-    for page in sorted(ranks):
-        print(f"  {page}: {ranks[page]:.4f}")
-    ranks = iterate_pagerank(corpus, DAMPING)
-    print(f"PageRank Results from Iteration")
-    for page in sorted(ranks):
-        print(f"  {page}: {ranks[page]:.4f}")
+    print_ranks(ranks, args.top)
+    if args.solver == "iterate":
+        ranks = iterate_pagerank(corpus, DAMPING)
+        print(f"PageRank Results from Iteration")
+    else:
+        ranks = solvers.solver_pagerank(corpus, DAMPING, args.solver, processes=args.processes)
+        print(f"PageRank Results from Iteration ({args.solver} solver)")
+    print_ranks(ranks, args.top)
+    if args.save:
+        results.write_results(args.save, ranks, metadata={
+            "corpus": args.corpus, "damping": DAMPING, "solver": args.solver})
+
+
+def print_ranks(ranks, top=None):
+    """
+    Print every page's rank sorted by page name, or only the `top`
+    highest ranked pages.
+    """
+    if top is None:
+        for page in sorted(ranks):
+            print(f"  {page}: {ranks[page]:.4f}")
+    else:
+        for page, rank in heapq.nlargest(top, ranks.items(), key=lambda item: item[1]):
+            print(f"  {page}: {rank:.4f}")
 
 
 def crawl(directory):
@@ -38,10 +70,9 @@ def crawl(directory):
     for filename in os.listdir(directory):
         if not filename.endswith(".html"):
             continue
-        with open(os.path.join(directory, filename)) as f:
-            contents = f.read()
-            links = re.findall(r"<a\s+(?:[^>]*?)href=\"([^\"]*)\"", contents)
-            pages[filename] = set(links) - {filename}
+        links = crawler.extract_links(os.path.join(directory, filename))
+        links = (crawler.resolve(filename, link) for link in links)
+        pages[filename] = set(links) - {filename, None}
 
     # Only include links to other pages in the corpus
     for filename in pages:
@@ -107,34 +138,44 @@ def sample_pagerank(corpus, damping_factor, n):
     pagerank = {page: count/n for page, count in page_count.items()}
     return pagerank 
 
-def iterate_pagerank(corpus, damping_factor):
+def iterate_pagerank(corpus, damping_factor, tolerance=0.001, norm="linf",
+                     max_iterations=None, extrapolation=None, callback=None):
     """
     Return PageRank values for each page by iteratively updating
     PageRank values until convergence.
 
+    Iteration stops once the `norm` ("linf" for the largest per-page
+    change, or "l1" for the total change) of one update is below
+    `tolerance`, or after `max_iterations` updates. `extrapolation`
+    and `callback(iteration, residual, elapsed)` are passed on to
+    `convergence.converge`.
+
     Return a dictionary where keys are page names, and values are
     their estimated PageRank value (a value between 0 and 1). All
     PageRank values should sum to 1.
     """
     # raise NotImplementedError
-    num_pages = len(corpus)
-    pagerank = {page: 1/num_pages for page in corpus}
-    num_links = {page: len(links) for page, links in corpus.items()}
+    pages = list(corpus)
+    num_pages = len(pages)
+    index = {page: i for i, page in enumerate(pages)}
+    num_links = np.array([len(corpus[page]) for page in pages])
+    dangling = num_links == 0
+    linked_by = [[] for _ in pages]
+    for i, page in enumerate(pages):
+        for link in corpus[page]:
+            if link in index:
+                linked_by[index[link]].append(i)
+    linked_by = [np.array(sources, dtype=int) for sources in linked_by]
+
+    def update(pagerank):
+        shares = np.where(dangling, 0, pagerank / np.maximum(num_links, 1))
+        base = (1 - damping_factor) / num_pages + damping_factor * pagerank[dangling].sum() / num_pages
+        return np.array([base + damping_factor * shares[sources].sum() for sources in linked_by])
+
+    pagerank = convergence.converge(update, np.full(num_pages, 1 / num_pages), tolerance,
+                                    norm, max_iterations, extrapolation, callback)
+    return dict(zip(pages, pagerank.tolist()))
+
 
-    while True:
-        new_pagerank = {}
-        for p in corpus:
-            new_pagerank[p] = (1-damping_factor)/num_pages
-            for i, linked_pages in corpus.items():
-                if p in linked_pages:
-                    new_pagerank[p] += damping_factor*pagerank[i]/num_links[i]
-                if num_links[i] == 0:
-                    new_pagerank[p] += damping_factor*pagerank[i]/num_pages
-        errors = {page: abs(pagerank[page] - new_pagerank[page]) for page in corpus}
-        if all(error < 0.001 for error in errors.values()):
-            break
-        else:
-            pagerank = new_pagerank
-    return pagerank
 if __name__ == "__main__":
     main()
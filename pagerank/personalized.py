@@ -0,0 +1,161 @@
+import heapq
+import time
+from collections import OrderedDict, deque
+
+
+def seed_weights(seeds, corpus):
+    """
+    Return a dict of seed pages to teleport probabilities, from either
+    a dict of page weights or an iterable of equally weighted pages.
+    Raise KeyError for seed pages that are not in `corpus`.
+    """
+    if isinstance(seeds, dict):
+        weights = {page: float(w) for page, w in seeds.items() if w > 0}
+    else:
+        weights = {page: 1.0 for page in seeds}
+    for page in weights:
+        if page not in corpus:
+            raise KeyError(page)
+    total = sum(weights.values())
+    if not total:
+        raise ValueError("no seed pages")
+    return {page: w / total for page, w in weights.items()}
+
+
+def forward_push(corpus, teleport, damping_factor, epsilon=1e-6):
+    """
+    Run local forward push from the `teleport` distribution and return
+    the (unnormalized) ranks of the pages it reached.
+
+    Each push moves 1 - damping of a page's residual mass into its
+    rank and spreads the rest over its links, until every residual is
+    below `epsilon`. Mass reaching a dangling page is dropped: a surfer
+    there restarts from the teleport distribution, as after a teleport,
+    so the dropped mass only rescales the result.
+    """
+    ranks = {}
+    residual = dict(teleport)
+    queue = deque(page for page, mass in residual.items() if mass >= epsilon)
+
+    while queue:
+        page = queue.popleft()
+        mass = residual.pop(page, 0.0)
+        if mass < epsilon:
+            if mass:
+                residual[page] = mass
+            continue
+        ranks[page] = ranks.get(page, 0.0) + (1 - damping_factor) * mass
+        links = corpus.get(page)
+        if not links:
+            continue
+        share = damping_factor * mass / len(links)
+        for link in links:
+            before = residual.get(link, 0.0)
+            residual[link] = before + share
+            if before < epsilon <= before + share:
+                queue.append(link)
+    return ranks
+
+
+def normalized(ranks):
+    total = sum(ranks.values())
+    if not total:
+        # Nothing was pushed, e.g. every seed's mass is below epsilon
+        return {}
+    return {page: rank / total for page, rank in ranks.items()}
+
+
+def personalized_pagerank(corpus, seeds, damping_factor, epsilon=1e-6):
+    """
+    Return personalized PageRank values with respect to `seeds`: like
+    PageRank, but the surfer teleports (and leaves dangling pages) to
+    the seed pages instead of to any page in the corpus.
+
+    `seeds` is an iterable of pages, or a dict of page weights, and
+    KeyError is raised for seeds not in `corpus`. Uses local forward
+    push, so only pages near the seeds are touched, and pages never
+    reached are left out of the result, which is empty if no seed has
+    a mass of at least `epsilon`.
+    """
+    weights = seed_weights(seeds, corpus)
+    return normalized(forward_push(corpus, weights, damping_factor, epsilon))
+
+
+class PPRIndex():
+    """
+    Personalized PageRank query server over one corpus.
+
+    Single-page push vectors are computed on demand and kept in an LRU
+    cache of `cache_size` pages. `forward_push` is linear in the
+    teleport distribution, so a query for a seed set is the weighted
+    sum of its seeds' vectors, normalized.
+
+    The latency of every query is recorded; see `latency_stats`.
+    """
+
+    def __init__(self, corpus, damping_factor, epsilon=1e-6, cache_size=1024):
+        self.corpus = corpus
+        self.damping_factor = damping_factor
+        self.epsilon = epsilon
+        self.cache_size = cache_size
+        self.cache = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.latencies = []
+
+    def vector(self, page):
+        """
+        Return the unnormalized push vector of a single seed page, from
+        the cache if possible.
+        """
+        vector = self.cache.get(page)
+        if vector is not None:
+            self.cache.move_to_end(page)
+            self.hits += 1
+            return vector
+        self.misses += 1
+        if page not in self.corpus:
+            raise KeyError(page)
+        vector = forward_push(self.corpus, {page: 1.0}, self.damping_factor, self.epsilon)
+        self.cache[page] = vector
+        if len(self.cache) > self.cache_size:
+            self.cache.popitem(last=False)
+        return vector
+
+    def precompute(self, pages):
+        """
+        Fill the cache with the vectors of `pages`.
+        """
+        for page in pages:
+            self.vector(page)
+
+    def query(self, seeds, k=None):
+        """
+        Return personalized PageRank values with respect to `seeds`
+        (pages, or a dict of page weights) as a dict, or only the `k`
+        highest as a list of (page, rank) pairs. Raise KeyError for
+        seeds not in the corpus, as `personalized_pagerank` does.
+        """
+        start = time.perf_counter()
+        ranks = {}
+        for seed, weight in seed_weights(seeds, self.corpus).items():
+            for page, rank in self.vector(seed).items():
+                ranks[page] = ranks.get(page, 0.0) + weight * rank
+        ranks = normalized(ranks)
+        if k is not None:
+            ranks = heapq.nlargest(k, ranks.items(), key=lambda item: item[1])
+        self.latencies.append(time.perf_counter() - start)
+        return ranks
+
+    def latency_stats(self):
+        """
+        Return a dict summarizing query latencies in milliseconds, and
+        cache hits and misses.
+        """
+        latencies = sorted(self.latencies)
+        stats = {"queries": len(latencies), "hits": self.hits, "misses": self.misses}
+        if latencies:
+            stats["mean_ms"] = 1000 * sum(latencies) / len(latencies)
+            for name, q in (("p50_ms", 0.5), ("p95_ms", 0.95), ("p99_ms", 0.99)):
+                stats[name] = 1000 * latencies[min(len(latencies) - 1, int(q * len(latencies)))]
+        return stats
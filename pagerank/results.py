@@ -0,0 +1,227 @@
+import argparse
+import heapq
+import json
+import math
+import mmap
+import os
+import struct
+from bisect import bisect_left, bisect_right
+
+import numpy as np
+
+MAGIC = b"PRRANKS\0"
+VERSION = 1
+
+# Preamble: magic, format version, length of the JSON header that follows
+PREAMBLE = struct.Struct("<8sII")
+
+# Columns of a results file and their dtypes. Positions count from 0
+# for the highest ranked page, and page names are stored in that order
+# as UTF-8 data with offsets, so the top pages share a few disk pages.
+COLUMNS = {
+    "ranks": "<f8",        # rank at each position, highest first
+    "name_order": "<i4",   # positions sorted by page name
+    "name_offsets": "<i8",
+    "name_data": "u1",
+}
+
+
+def write_results(path, ranks, pages=None, metadata=None):
+    """
+    Write PageRank results to a columnar file at `path`.
+
+    `ranks` is a dict of page names to ranks, or a rank vector with
+    the matching list of `pages`. `metadata` (a JSON-serializable dict,
+    such as the damping factor used) is stored in the header.
+
+    The file is written next to `path` first and then renamed over it,
+    so readers never see partial results.
+    """
+    if isinstance(ranks, dict):
+        pages = list(ranks)
+        ranks = list(ranks.values())
+    ranks = np.asarray(ranks, dtype=np.float64)
+    if pages is None or len(pages) != len(ranks):
+        raise ValueError("need one page name per rank")
+    if len(ranks) >= 1 << 31:
+        raise ValueError("too many pages for int32 page numbers")
+
+    order = np.argsort(-ranks, kind="stable")
+    encoded = [pages[i].encode("utf-8") for i in order.tolist()]
+    name_offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+    np.cumsum([len(name) for name in encoded], out=name_offsets[1:])
+    name_order = sorted(range(len(encoded)), key=encoded.__getitem__)
+
+    columns = {
+        "ranks": ranks[order],
+        "name_order": name_order,
+        "name_offsets": name_offsets,
+        "name_data": np.frombuffer(b"".join(encoded), dtype=np.uint8),
+    }
+    sections = {name: np.asarray(columns[name], dtype=dtype).tobytes()
+                for name, dtype in COLUMNS.items()}
+
+    # Column offsets are relative to the (8-byte aligned) end of the header
+    layout = {}
+    offset = 0
+    for name, data in sections.items():
+        layout[name] = [offset, len(data)]
+        offset += _aligned(len(data))
+    header = json.dumps({"pages": len(ranks), "metadata": metadata or {},
+                         "columns": layout}).encode("utf-8")
+    header += b" " * (_aligned(PREAMBLE.size + len(header)) - PREAMBLE.size - len(header))
+
+    temporary = f"{path}.tmp"
+    with open(temporary, "wb") as f:
+        f.write(PREAMBLE.pack(MAGIC, VERSION, len(header)))
+        f.write(header)
+        for data in sections.values():
+            f.write(data)
+            f.write(b"\0" * (_aligned(len(data)) - len(data)))
+    os.replace(temporary, path)
+
+
+class RankResults():
+    """
+    Query API over a results file written by `write_results`.
+
+    The file is memory-mapped and its columns are used in place, so
+    opening it costs the same for any number of pages and queries only
+    touch the parts of the file they need:
+
+    - `top_k` slices the rank-sorted columns, or for a subset of pages
+      keeps a heap of the best k;
+    - `rank_of` finds a page by binary search over the name order;
+    - `percentile` indexes the sorted ranks directly.
+    """
+
+    def __init__(self, path):
+        with open(path, "rb") as f:
+            self.mapping = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, header_size = PREAMBLE.unpack_from(self.mapping)
+        if magic != MAGIC or version != VERSION:
+            self.mapping.close()
+            raise ValueError(f"{path} is not a version {VERSION} results file")
+        header = json.loads(bytes(self.mapping[PREAMBLE.size:PREAMBLE.size + header_size]))
+        self.metadata = header["metadata"]
+        base = PREAMBLE.size + header_size
+        for name, dtype in COLUMNS.items():
+            offset, length = header["columns"][name]
+            setattr(self, name, np.frombuffer(self.mapping, dtype=dtype,
+                                              count=length // np.dtype(dtype).itemsize,
+                                              offset=base + offset))
+
+    def __len__(self):
+        return len(self.ranks)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        # Drop the column views first, the mapping can't close under them
+        for name in COLUMNS:
+            setattr(self, name, None)
+        self.mapping.close()
+
+    def page(self, position):
+        """
+        Return the name of the page at `position` (0 is the highest
+        ranked page).
+        """
+        return self._encoded_name(position).decode("utf-8")
+
+    def _encoded_name(self, position):
+        first, last = self.name_offsets[position:position + 2].tolist()
+        return self.name_data[first:last].tobytes()
+
+    def _position(self, page):
+        """
+        Return the position of the page named `page`.
+        """
+        encoded = page.encode("utf-8")
+        i = bisect_left(self.name_order, encoded, key=self._encoded_name)
+        if i == len(self.name_order) or self._encoded_name(self.name_order[i]) != encoded:
+            raise KeyError(page)
+        return int(self.name_order[i])
+
+    def top_k(self, k, pages=None):
+        """
+        Return the `k` highest ranked pages as a list of (page, rank)
+        pairs, highest first, out of all pages or only those named in
+        `pages`.
+        """
+        if pages is None:
+            positions = range(min(k, len(self.ranks)))
+        else:
+            positions = heapq.nsmallest(k, (self._position(page) for page in pages))
+        return [(self.page(p), float(self.ranks[p])) for p in positions]
+
+    def rank_of(self, page):
+        """
+        Return (place, rank) for the page named `page`, where place 1
+        is the highest ranked page. Raise KeyError for unknown pages.
+        """
+        position = self._position(page)
+        return position + 1, float(self.ranks[position])
+
+    def percentile(self, q):
+        """
+        Return the rank at percentile `q` (0 to 100): at least `q`
+        percent of pages rank at or below it. Return None if there are
+        no pages.
+        """
+        if not 0 <= q <= 100:
+            raise ValueError("percentile must be between 0 and 100")
+        n = len(self.ranks)
+        if n == 0:
+            return None
+        below = max(1, math.ceil(q / 100 * n))
+        return float(self.ranks[n - below])
+
+    def percentile_of(self, page):
+        """
+        Return the percentage of pages ranked below the page named
+        `page`.
+        """
+        _, rank = self.rank_of(page)
+        n = len(self.ranks)
+        # Pages tied with it are not below it
+        last = bisect_right(self.ranks, -rank, key=lambda r: -r)
+        return 100 * (n - last) / n
+
+
+def _aligned(size):
+    return (size + 7) & ~7
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Query saved PageRank results")
+    parser.add_argument("results")
+    parser.add_argument("--top", type=int, default=10, help="show the top K pages")
+    parser.add_argument("--page", action="append", default=[],
+                        help="show the place, rank and percentile of a page")
+    parser.add_argument("--percentile", type=float, action="append", default=[])
+    args = parser.parse_args()
+
+    with RankResults(args.results) as results:
+        print(f"{len(results)} pages")
+        for place, (page, rank) in enumerate(results.top_k(args.top), 1):
+            print(f"  {place:>6}. {page}: {rank:.6f}")
+        for page in args.page:
+            try:
+                place, rank = results.rank_of(page)
+            except KeyError:
+                print(f"{page}: not found")
+                continue
+            print(f"{page}: place {place}, rank {rank:.6f}, "
+                  f"above {results.percentile_of(page):.2f}% of pages")
+        for q in args.percentile:
+            rank = results.percentile(q)
+            print(f"percentile {q:g}: " + ("no pages" if rank is None else f"{rank:.6f}"))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,145 @@
+import math
+import multiprocessing
+
+import numpy as np
+
+import sparse
+
+
+class OutLinks():
+    """
+    Per-page outgoing link arrays, in CSR form: the pages page `i`
+    links to are `targets[offsets[i]:offsets[i + 1]]`.
+
+    The random surfer's next page is a mix of two uniform choices (a
+    random outgoing link, or with probability 1 - damping any page at
+    all), so indexing into these arrays with a uniform random offset
+    samples it in O(1) without alias tables or per-page distributions.
+    """
+
+    def __init__(self, transition):
+        self.offsets, self.targets = transition.by_source()
+        self.degree = np.diff(self.offsets)
+        self.pages = transition.pages
+
+    def __len__(self):
+        return len(self.degree)
+
+
+def walk(links, damping_factor, surfers, steps, seed, burn_in=0):
+    """
+    Simulate `surfers` independent random surfers for `steps` steps
+    each, starting from uniformly random pages.
+
+    Return an array counting how many samples landed on each page.
+    Each surfer counts the page it is on before every step, like
+    `sample_pagerank`, after first taking `burn_in` uncounted steps.
+    """
+    rng = np.random.default_rng(seed)
+    n = len(links)
+    counts = np.zeros(n, dtype=np.int64)
+    pages = rng.integers(0, n, surfers)
+
+    # Visits are buffered and counted in blocks, since one bincount
+    # over all n pages per step would dominate when surfers << n
+    block = max(1, min(steps, (1 << 22) // surfers))
+    visits = np.empty((block, surfers), dtype=np.int64)
+    filled = 0
+    for step in range(burn_in + steps):
+        if step >= burn_in:
+            visits[filled] = pages
+            filled += 1
+            if filled == block:
+                counts += np.bincount(visits.ravel(), minlength=n)
+                filled = 0
+        degree = links.degree[pages]
+        follow = (rng.random(surfers) < damping_factor) & (degree > 0)
+        following = pages[follow]
+        offsets = links.offsets[following] + (rng.random(len(following))
+                                              * degree[follow]).astype(np.int64)
+        pages = rng.integers(0, n, surfers)
+        pages[follow] = links.targets[offsets]
+    counts += np.bincount(visits[:filled].ravel(), minlength=n)
+    return counts
+
+
+def default_burn_in(damping_factor, tolerance=1e-4):
+    """
+    Return how many steps it takes for the influence of a surfer's
+    uniformly random start to fall below `tolerance`.
+
+    Every step teleports with probability 1 - damping, so after k steps
+    a surfer has yet to teleport with probability damping ** k.
+    """
+    if damping_factor <= 0:
+        return 0
+    return math.ceil(math.log(tolerance) / math.log(damping_factor))
+
+
+# Link arrays shared with worker processes, set by _init_worker
+_links = None
+
+
+def _init_worker(links):
+    global _links
+    _links = links
+
+
+def _walk_worker(job):
+    return walk(_links, *job)
+
+
+def batched_sample(links, damping_factor, n, surfers=1000, processes=1, seed=None,
+                   burn_in=None):
+    """
+    Estimate PageRank from about `n` samples, taken by `surfers`
+    parallel surfers split over `processes` worker processes.
+
+    Unlike one long walk, many short walks would be biased towards
+    their uniformly random starting pages, so each surfer first takes
+    `burn_in` uncounted steps (`default_burn_in` if None).
+
+    `seed` makes the result reproducible for a given number of
+    surfers and processes. Return the rank vector.
+    """
+    if burn_in is None:
+        burn_in = default_burn_in(damping_factor)
+    surfers = max(1, min(surfers, n))
+    steps = max(1, n // surfers)
+    seeds = np.random.SeedSequence(seed).spawn(processes)
+    shares = [surfers // processes + (i < surfers % processes) for i in range(processes)]
+    jobs = [(damping_factor, share, steps, s, burn_in)
+            for share, s in zip(shares, seeds) if share]
+
+    if len(jobs) == 1:
+        counts = walk(links, *jobs[0])
+    else:
+        methods = multiprocessing.get_all_start_methods()
+        context = multiprocessing.get_context("fork" if "fork" in methods else None)
+        with context.Pool(len(jobs), initializer=_init_worker, initargs=(links,)) as pool:
+            counts = sum(pool.map(_walk_worker, jobs))
+    return counts / counts.sum()
+
+
+def convergence_error(transition, ranks, damping_factor, reference=None):
+    """
+    Compare sampled `ranks` with the iterative result (computed to a
+    tight threshold unless a `reference` vector is given).
+
+    Return a dict with the L1 and largest per-page absolute errors.
+    """
+    if reference is None:
+        reference, _ = sparse.power_iteration(transition, damping_factor, threshold=1e-12)
+    difference = np.abs(ranks - reference)
+    return {"l1": float(difference.sum()), "max": float(difference.max())}
+
+
+def fast_sample_pagerank(corpus, damping_factor, n, surfers=1000, processes=1, seed=None):
+    """
+    Return PageRank values for each page by sampling, like
+    `sample_pagerank`, but with many surfers simulated at once.
+    """
+    transition = sparse.TransitionMatrix.from_corpus(corpus)
+    ranks = batched_sample(OutLinks(transition), damping_factor, n,
+                           surfers=surfers, processes=processes, seed=seed)
+    return transition.to_dict(ranks)
@@ -0,0 +1,172 @@
+import multiprocessing
+
+import numpy as np
+import scipy.sparse
+import scipy.sparse.linalg
+
+import convergence
+import sparse
+
+SOLVERS = ("power", "gauss-seidel", "block")
+
+
+def sweep(lower, rest, ranks, constant, damping_factor):
+    """
+    Return one Gauss-Seidel sweep: solve the triangular system `lower`
+    for damping * (rest @ ranks) + constant, so every rank is updated
+    from the already updated ranks before it.
+    """
+    rhs = damping_factor * (rest @ ranks) + constant
+    return scipy.sparse.linalg.spsolve_triangular(lower, rhs, lower=True)
+
+
+def split(matrix, first, last, damping_factor):
+    """
+    Split rows `first` to `last` of a transition matrix into the
+    triangular system of their diagonal block (including the diagonal)
+    and the remaining links.
+    """
+    rows = matrix[first:last].tocoo()
+    size = last - first
+    inside = (rows.col >= first) & (rows.col < last) & (rows.col - first <= rows.row)
+    triangle = scipy.sparse.csr_matrix(
+        (rows.data[inside], (rows.row[inside], rows.col[inside] - first)), shape=(size, size))
+    lower = (scipy.sparse.identity(size, format="csr") - damping_factor * triangle).tocsr()
+    rest = scipy.sparse.csr_matrix(
+        (rows.data[~inside], (rows.row[~inside], rows.col[~inside])), shape=rows.shape)
+    return lower, rest
+
+
+class GaussSeidel():
+    """
+    Gauss-Seidel PageRank step: pages are updated in place in index
+    order, each from the newest ranks of the pages before it, which
+    usually takes far fewer iterations than power iteration (Jacobi).
+    Each sweep is one sparse triangular solve.
+    """
+
+    def __init__(self, transition, damping_factor):
+        self.transition = transition
+        self.damping_factor = damping_factor
+        self.lower, self.rest = split(transition.matrix, 0, len(transition), damping_factor)
+
+    def __call__(self, ranks):
+        n = len(self.transition)
+        d = self.damping_factor
+        constant = (d * ranks[self.transition.dangling].sum() + 1 - d) / n
+        ranks = sweep(self.lower, self.rest, ranks, constant, d)
+        return ranks / ranks.sum()
+
+
+# State shared with the block solver's worker processes, set before
+# they are forked
+_blocks = None
+_current = None
+_next = None
+
+
+def _init_worker(blocks, current, following):
+    global _blocks, _current, _next
+    _blocks = blocks
+    _current = np.frombuffer(current)
+    _next = np.frombuffer(following)
+
+
+def _solve_block(job):
+    index, constant, damping_factor = job
+    first, last, lower, rest = _blocks[index]
+    _next[first:last] = sweep(lower, rest, _current, constant, damping_factor)
+
+
+class BlockSolver():
+    """
+    Block-parallel PageRank step over `processes` worker processes.
+
+    The pages are split into contiguous blocks with about the same
+    number of links each. In every step each worker runs a Gauss-Seidel
+    sweep over its own block, reading the other blocks' ranks from the
+    previous step, so blocks never wait on each other. Rank vectors
+    live in shared memory and only block indices are sent to workers.
+
+    Use as a context manager, or call `close()` to stop the workers.
+    """
+
+    def __init__(self, transition, damping_factor, processes=None, blocks=None):
+        self.transition = transition
+        self.damping_factor = damping_factor
+        n = len(transition)
+        processes = processes or multiprocessing.cpu_count()
+        blocks = max(1, min(n, blocks or processes))
+
+        # Balance the blocks by number of links
+        indptr = transition.matrix.indptr
+        cuts = np.searchsorted(indptr, np.linspace(0, indptr[-1], blocks + 1)[1:-1])
+        bounds = np.unique(np.concatenate([[0], cuts, [n]]))
+        self.blocks = [(first, last) + split(transition.matrix, first, last, damping_factor)
+                       for first, last in zip(bounds[:-1].tolist(), bounds[1:].tolist())]
+
+        methods = multiprocessing.get_all_start_methods()
+        context = multiprocessing.get_context("fork" if "fork" in methods else None)
+        self.current = context.RawArray("d", n)
+        self.next = context.RawArray("d", n)
+        self.pool = context.Pool(processes, initializer=_init_worker,
+                                 initargs=(self.blocks, self.current, self.next))
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        self.pool.close()
+        self.pool.join()
+
+    def __call__(self, ranks):
+        n = len(self.transition)
+        d = self.damping_factor
+        np.frombuffer(self.current)[:] = ranks
+        constant = (d * ranks[self.transition.dangling].sum() + 1 - d) / n
+        self.pool.map(_solve_block, [(i, constant, d) for i in range(len(self.blocks))])
+        ranks = np.frombuffer(self.next).copy()
+        return ranks / ranks.sum()
+
+
+def solve(transition, damping_factor, solver="power", threshold=0.001, start=None,
+          processes=None, **options):
+    """
+    Run the PageRank `solver` ("power", "gauss-seidel" or "block",
+    with `processes` workers) on `transition` from `start` (uniform by
+    default) until no page's rank changes by `threshold` or more.
+
+    Other keyword arguments are passed on to `convergence.converge`.
+    Return (ranks, iterations).
+    """
+    if solver == "power":
+        return sparse.power_iteration(transition, damping_factor, threshold, start, **options)
+    if solver not in SOLVERS:
+        raise ValueError(f"unknown solver: {solver}")
+
+    n = len(transition)
+    if start is None:
+        start = np.full(n, 1 / n)
+    stats = options.pop("stats", None)
+    if stats is None:
+        stats = {}
+    if solver == "gauss-seidel":
+        ranks = convergence.converge(GaussSeidel(transition, damping_factor), start,
+                                     threshold, stats=stats, **options)
+    else:
+        with BlockSolver(transition, damping_factor, processes) as step:
+            ranks = convergence.converge(step, start, threshold, stats=stats, **options)
+    return ranks, stats["iterations"]
+
+
+def solver_pagerank(corpus, damping_factor, solver="power", threshold=0.001, processes=None):
+    """
+    Return PageRank values for each page, like `iterate_pagerank`,
+    using the given `solver`.
+    """
+    transition = sparse.TransitionMatrix.from_corpus(corpus)
+    ranks, _ = solve(transition, damping_factor, solver, threshold, processes=processes)
+    return transition.to_dict(ranks)
@@ -0,0 +1,121 @@
+import numpy as np
+import scipy.sparse
+
+import convergence
+
+
+class TransitionMatrix():
+    """
+    Link structure of a corpus as a sparse column-stochastic matrix.
+
+    `matrix[j, i]` is 1 / (number of links on page i) when page i
+    links to page j. Pages with no links ("dangling" pages) have an
+    all-zero column; a random surfer on one jumps to any page, which
+    is applied as a single rank-one correction per iteration instead
+    of filling in dense columns.
+    """
+
+    def __init__(self, pages, sources, targets):
+        """
+        Build from parallel arrays of link `sources` and `targets`,
+        given as indices into the list of page names `pages`.
+        """
+        self.pages = list(pages)
+        self.index = {page: i for i, page in enumerate(self.pages)}
+        n = len(self.pages)
+        sources = np.asarray(sources, dtype=np.int64)
+        targets = np.asarray(targets, dtype=np.int64)
+
+        self.out_degree = np.bincount(sources, minlength=n)
+        self.dangling = self.out_degree == 0
+        weights = 1.0 / self.out_degree[sources]
+        self.matrix = scipy.sparse.csr_matrix((weights, (targets, sources)), shape=(n, n))
+        self._by_source = None
+        if np.all(sources[1:] >= sources[:-1]):
+            offsets = np.zeros(n + 1, dtype=np.int64)
+            np.cumsum(self.out_degree, out=offsets[1:])
+            self._by_source = (offsets, targets)
+
+    @classmethod
+    def from_corpus(cls, corpus):
+        """
+        Build from a `crawl()` corpus dict mapping each page to the set
+        of pages it links to.
+        """
+        pages = sorted(corpus)
+        index = {page: i for i, page in enumerate(pages)}
+        sources = []
+        targets = []
+        # In page order, so the links come grouped by source
+        for page in pages:
+            for link in corpus[page]:
+                if link in index:
+                    sources.append(index[page])
+                    targets.append(index[link])
+        return cls(pages, sources, targets)
+
+    def __len__(self):
+        return len(self.pages)
+
+    def step(self, ranks, damping_factor):
+        """
+        Apply one PageRank update to the rank vector `ranks`.
+        """
+        n = len(self.pages)
+        dangling_mass = ranks[self.dangling].sum()
+        return (damping_factor * (self.matrix @ ranks)
+                + (damping_factor * dangling_mass + 1 - damping_factor) / n)
+
+    def by_source(self):
+        """
+        Return the links as (offsets, targets) arrays grouped by source:
+        page i links to `targets[offsets[i]:offsets[i + 1]]`.
+
+        When the links were given sorted by source, as `from_corpus`
+        gives them, these are the arrays passed in; otherwise they are
+        converted on first use and cached, since that costs about as
+        much as a few power iteration steps.
+        """
+        if self._by_source is None:
+            by_source = self.matrix.tocsc()
+            self._by_source = (by_source.indptr.astype(np.int64),
+                               by_source.indices.astype(np.int64))
+        return self._by_source
+
+    def to_dict(self, ranks):
+        """
+        Return a rank vector as a dict keyed by page name.
+        """
+        return dict(zip(self.pages, ranks.tolist()))
+
+
+def power_iteration(transition, damping_factor, threshold=0.001, start=None, **options):
+    """
+    Run power iteration from `start` (uniform by default) until no
+    page's rank changes by `threshold` or more, the same stopping rule
+    as `iterate_pagerank`.
+
+    Other keyword arguments (`norm`, `max_iterations`, `extrapolation`,
+    `callback`, `stats`) are passed on to `convergence.converge`.
+
+    Return (ranks, iterations).
+    """
+    n = len(transition)
+    if start is None:
+        start = np.full(n, 1 / n)
+    stats = options.pop("stats", None)
+    if stats is None:
+        stats = {}
+    ranks = convergence.converge(lambda ranks: transition.step(ranks, damping_factor),
+                                 start, threshold, stats=stats, **options)
+    return ranks, stats["iterations"]
+
+
+def sparse_pagerank(corpus, damping_factor):
+    """
+    Return PageRank values for each page, like `iterate_pagerank`,
+    using sparse matrix-vector products.
+    """
+    transition = TransitionMatrix.from_corpus(corpus)
+    ranks, _ = power_iteration(transition, damping_factor)
+    return transition.to_dict(ranks)